@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Measures Lambda cold starts: importing lambda_function, then the first and second invocation of each request type
+# Every sample runs in a fresh interpreter so that nothing is already imported
+# Run from the repository root: python -m Benchmarks.coldStartBenchmark
+# Invocations talk to DynamoDB, so point DYNAMODB_ENDPOINT_URL at DynamoDB Local (or use real credentials)
+# Without a database the invocations fail, but import times and the modules each route loads are still measured
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the fresh interpreter and prints its measurements as JSON
+CHILD_SCRIPT = """
+import json, sys, time
+event = json.loads(sys.argv[1])
+
+startTime = time.perf_counter()
+import lambda_function
+importSeconds = time.perf_counter() - startTime
+modulesAfterImport = len(sys.modules)
+
+def invoke():
+    startTime = time.perf_counter()
+    try:
+        statusCode = lambda_function.lambda_handler(event, None)["statusCode"]
+    except Exception as e:
+        statusCode = type(e).__name__
+    return time.perf_counter() - startTime, statusCode
+
+firstSeconds, statusCode = invoke()
+modulesAfterFirst = len(sys.modules)
+secondSeconds, _ = invoke()
+
+print(json.dumps({
+    "importSeconds": importSeconds,
+    "firstSeconds": firstSeconds,
+    "secondSeconds": secondSeconds,
+    "statusCode": statusCode,
+    "modulesAfterImport": modulesAfterImport,
+    "modulesAfterFirst": modulesAfterFirst
+}))
+"""
+
+def getEventBodies(playerTag, filterID):
+    trieRequest = {
+        "playerTag": playerTag,
+        "requestType": "regular",
+        "requestMode": None,
+        "requestMap": None,
+        "requestBrawler": None,
+        "targetAttribute": "brawler",
+        "isGlobal": False
+    }
+
+    return {
+        "getBrawlerList": {"type": "getBrawlerList"},
+        "getRecentGlobalScanInfo": {"type": "getRecentGlobalScanInfo"},
+        "getTrieData": {"type": "getTrieData", "filterID": filterID, **trieRequest},
+        "getRecentTrieData": {"type": "getRecentTrieData", "numItems": 20, **trieRequest},
+        "getPlayerInfo": {"type": "getPlayerInfo", "playerTag": playerTag},
+        "getPlayerOverview": {"type": "getPlayerOverview", "playerTag": playerTag},
+        "queryGames": {"type": "queryGames", "playerTag": playerTag, "datetime": "20250101T000000.000Z", "token": "invalid"},
+        "verifyPassword": {"type": "verifyPassword", "playerTag": playerTag, "password": "invalid"},
+    }
+
+def runSample(eventBody):
+    event = {"body": json.dumps(eventBody)}
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, json.dumps(event)],
+        cwd=REPOSITORY_ROOT,
+        capture_output=True,
+        text=True
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per request type; medians are reported")
+    parser.add_argument("--player-tag", default="2Y0PLJ8QC")
+    parser.add_argument("--filter-id", default="overall")
+    parser.add_argument("--types", nargs="*", help="Request types to measure, default all")
+    args = parser.parse_args()
+
+    eventBodies = getEventBodies(args.player_tag, args.filter_id)
+    requestTypes = args.types or list(eventBodies)
+
+    print(f"{'type':<26}{'import ms':>10}{'first ms':>10}{'warm ms':>10}{'modules':>9}  status")
+    for requestType in requestTypes:
+        samples = [runSample(eventBodies[requestType]) for _ in range(args.repeat)]
+
+        def median(key):
+            return statistics.median(sample[key] for sample in samples) * 1000
+
+        print(
+            f"{requestType:<26}{median('importSeconds'):>10.1f}{median('firstSeconds'):>10.1f}{median('secondSeconds'):>10.1f}"
+            f"{samples[-1]['modulesAfterFirst']:>9}  {samples[-1]['statusCode']}"
+        )
@@ -0,0 +1,111 @@
+import argparse
+import json
+import random
+import time
+from boto3.dynamodb.types import TypeDeserializer
+from DatabaseUtility.itemUtility import decimalAndSetSerializer, deserializeDynamoDbItem, prepareItemForDB
+
+# Compares boto3's TypeDeserializer (the previous deserializeDynamoDbItem) against the native decoder
+# Run from the repository root: python -m Benchmarks.deserializationBenchmark
+
+BRAWLERS = ["SHELLY", "COLT", "BULL", "BROCK", "RICO", "SPIKE", "BARLEY", "JESSIE", "NITA", "DYNAMIKE", "EL PRIMO", "MORTIS", "TARA", "GENE", "MAX", "MR. P"]
+EVENTS = [
+    ("gemGrab", "Hard Rock Mine"),
+    ("brawlBall", "Backyard Bowl"),
+    ("knockout", "Belle's Rock"),
+    ("heist", "Safe Zone"),
+    ("hotZone", "Ring of Fire"),
+    ("soloShowdown", "Skull Creek"),
+    ("duoShowdown", "Double Trouble"),
+    ("duels", "Hard Limits"),
+]
+
+def getRandomPlayer(rng, playerTag=None):
+    return {
+        "tag": playerTag or "#" + "".join(rng.choice("0289PYLQGRJCUV") for _ in range(9)),
+        "name": "Player" + str(rng.randint(0, 9999)),
+        "brawler": {
+            "id": 16000000 + rng.randint(0, 80),
+            "name": rng.choice(BRAWLERS),
+            "power": rng.randint(1, 11),
+            "trophies": rng.randint(0, 1250)
+        }
+    }
+
+# Shaped like the battlelog items saved by saveGamesFromApiToUncachedDB
+def getRandomBattle(rng, playerTag, battleTime):
+    mode, map = rng.choice(EVENTS)
+    game = {
+        "playerTag": playerTag,
+        "battleTime": battleTime,
+        "event": {"id": 15000000 + rng.randint(0, 500), "mode": mode, "map": map},
+    }
+
+    if mode.endswith("Showdown"):
+        players = [getRandomPlayer(rng, "#" + playerTag)] + [getRandomPlayer(rng) for _ in range(9)]
+        game["battle"] = {"mode": mode, "type": "ranked", "rank": rng.randint(1, 10), "trophyChange": rng.randint(-8, 10), "players": players}
+    elif mode == "duels":
+        players = []
+        for i in range(2):
+            player = getRandomPlayer(rng, "#" + playerTag if i == 0 else None)
+            brawler = player.pop("brawler")
+            player["brawlers"] = [dict(brawler, trophyChange=rng.randint(-4, 4)) for _ in range(3)]
+            players.append(player)
+        game["battle"] = {"mode": mode, "type": "ranked", "result": rng.choice(["victory", "defeat"]), "duration": rng.randint(60, 240), "players": players}
+    else:
+        teams = [[getRandomPlayer(rng, "#" + playerTag if (t == 0 and p == 0) else None) for p in range(3)] for t in range(2)]
+        game["battle"] = {
+            "mode": mode,
+            "type": rng.choice(["ranked", "soloRanked"]),
+            "result": rng.choice(["victory", "defeat", "draw"]),
+            "duration": rng.randint(60, 240),
+            "trophyChange": rng.randint(-8, 8),
+            "starPlayer": rng.choice(teams[rng.randint(0, 1)]),
+            "teams": teams
+        }
+
+    return game
+
+def getBattleItems(numItems, seed):
+    rng = random.Random(seed)
+    return [prepareItemForDB(getRandomBattle(rng, "ABC123", f"20250101T{i // 3600 % 24:02d}{i // 60 % 60:02d}{i % 60:02d}.000Z")) for i in range(numItems)]
+
+def timeBestOf(function, numRepeats):
+    bestSeconds = None
+    for _ in range(numRepeats):
+        startTime = time.perf_counter()
+        function()
+        elapsedSeconds = time.perf_counter() - startTime
+        bestSeconds = elapsedSeconds if bestSeconds is None else min(bestSeconds, elapsedSeconds)
+    return bestSeconds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    items = getBattleItems(args.items, args.seed)
+    typeDeserializer = TypeDeserializer()
+
+    def typeDeserializerPath():
+        games = [{key: typeDeserializer.deserialize(value) for key, value in item.items()} for item in items]
+        return json.dumps(games, default=lambda x: decimalAndSetSerializer(x))
+
+    def nativePath():
+        games = [deserializeDynamoDbItem(item) for item in items]
+        return json.dumps(games, default=lambda x: decimalAndSetSerializer(x))
+
+    # Both paths must produce the same response body
+    if json.loads(typeDeserializerPath()) != json.loads(nativePath()):
+        raise AssertionError("Decoders disagree")
+
+    decodeOnlyTypeSeconds = timeBestOf(lambda: [{key: typeDeserializer.deserialize(value) for key, value in item.items()} for item in items], args.repeats)
+    decodeOnlyNativeSeconds = timeBestOf(lambda: [deserializeDynamoDbItem(item) for item in items], args.repeats)
+    typeSeconds = timeBestOf(typeDeserializerPath, args.repeats)
+    nativeSeconds = timeBestOf(nativePath, args.repeats)
+
+    print(f"{args.items} battle items, best of {args.repeats}")
+    print(f"Decode:          TypeDeserializer {decodeOnlyTypeSeconds * 1000:.1f}ms, native {decodeOnlyNativeSeconds * 1000:.1f}ms ({decodeOnlyTypeSeconds / decodeOnlyNativeSeconds:.1f}x)")
+    print(f"Decode and JSON: TypeDeserializer {typeSeconds * 1000:.1f}ms, native {nativeSeconds * 1000:.1f}ms ({typeSeconds / nativeSeconds:.1f}x)")
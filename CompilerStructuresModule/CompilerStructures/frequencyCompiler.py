@@ -1,23 +1,76 @@
 from CompilerStructuresModule.CompilerStructures.serializable import Serializable
 
 
+# Histogram over non-negative integer buckets, stored as a list of counts indexed by bucket
+# to_dict keeps the {"frequencies": {"<bucket>": count}} shape that trie nodes and the web client use
+# The statistics are in buckets too: for duration_frequencies, multiply by ResultCompiler.duration_bucket_size for seconds
 class FrequencyCompiler(Serializable):
+    __slots__ = ("counts",)
+
     def __init__(self):
-        self.frequencies = {}
+        self.counts = []
+
+    @classmethod
+    def from_frequencies(cls, frequencies):
+        compiler = cls()
+        for bucket_str, freq in frequencies.items():
+            bucket = int(float(bucket_str))
+            compiler.add_entry(bucket, int(freq))
+        return compiler
+
+    @property
+    def frequencies(self):
+        return {str(bucket): count for bucket, count in enumerate(self.counts) if count}
+
+    # Negative buckets aren't counted, like entries without a value
+    # (older trie nodes can hold them from negative durations)
+    def add_entry(self, r, count=1):
+        r = int(r)
+        if r < 0:
+            return
+
+        if r >= len(self.counts):
+            self.counts.extend([0] * (r + 1 - len(self.counts)))
+        self.counts[r] += count
 
-    def add_entry(self, r):
-        self.frequencies[str(r)] = self.frequencies.get(str(r), 0) + 1
+    def get_total(self):
+        return sum(self.counts)
 
     def get_average_entry(self):
-        total = 0
-        count = 0
+        count = self.get_total()
+        if count == 0:
+            return 0
+        return sum(bucket * freq for bucket, freq in enumerate(self.counts)) / count
+
+    # Smallest bucket with at least percentile% of the entries at or below it, or 0 if there are none
+    def get_percentile_entry(self, percentile):
+        count = self.get_total()
+        if count == 0:
+            return 0
+
+        target = count * percentile / 100
+        cumulative = 0
+        for bucket, freq in enumerate(self.counts):
+            cumulative += freq
+            if freq and cumulative >= target:
+                return bucket
+
+        return len(self.counts) - 1
+
+    def get_median_entry(self):
+        return self.get_percentile_entry(50)
+
+    def merge(self, other):
+        merged = FrequencyCompiler()
+        if len(self.counts) < len(other.counts):
+            longer, shorter = other.counts, self.counts
+        else:
+            longer, shorter = self.counts, other.counts
+        merged.counts = [a + b for a, b in zip(shorter, longer)] + longer[len(shorter):]
+        return merged
 
-        for rank_str, freq in self.frequencies.items():
-            rank = float(rank_str)
-            total += rank * freq
-            count += freq
+    def to_dict(self):
+        return {"frequencies": self.frequencies}
 
-        return 0 if count == 0 else total / count
-    
     def __str__(self):
-        return str(self.frequencies)
\ No newline at end of file
+        return str(self.frequencies)
@@ -0,0 +1,91 @@
+import numpy as np
+from CompilerStructuresModule.CompilerStructures.resultCompiler import ResultCompiler
+
+# Columnar copy of a list of MatchData objects
+# Categorical attributes are stored as integer codes so that any combination of them can be grouped with NumPy
+class MatchColumns:
+    categorical_attributes = ("type", "mode", "map", "brawler")
+    result_types = ("wins", "losses", "draws")
+
+    def __init__(self, match_data_objects):
+        self.num_matches = len(match_data_objects)
+
+        self.categories = {}
+        self.codes = {}
+        for attribute in MatchColumns.categorical_attributes:
+            category_codes = {}
+            codes = [category_codes.setdefault(getattr(match_data, attribute), len(category_codes)) for match_data in match_data_objects]
+
+            self.categories[attribute] = list(category_codes)
+            self.codes[attribute] = np.array(codes, dtype=np.int64)
+
+        result_codes = {result_type: i for i, result_type in enumerate(MatchColumns.result_types)}
+        self.result = np.array([result_codes[match_data.result_type] for match_data in match_data_objects], dtype=np.int8)
+
+        self.star_player_exists = np.array([bool(match_data.star_player_exists) for match_data in match_data_objects], dtype=bool)
+        self.is_star_player = np.array([bool(match_data.is_star_player) for match_data in match_data_objects], dtype=bool)
+        self.trophy_change = np.array([match_data.trophy_change for match_data in match_data_objects], dtype=np.int64)
+
+        # Matches without a usable duration are left out of the duration frequencies, as in ResultCompiler.handle_battle_result
+        duration_buckets = [ResultCompiler.get_duration_bucket(match_data.duration) for match_data in match_data_objects]
+        self.duration_bucket = np.array([-1 if bucket is None else bucket for bucket in duration_buckets], dtype=np.int64)
+
+    # Groups the matches by the given attributes and adds each group's totals to pathIDUpdates[get_path_id(attribute values)]
+    def add_grouped_compilers(self, attributes, get_path_id, path_id_updates):
+        if self.num_matches == 0:
+            return
+
+        # Combine the attribute codes into a single mixed-radix key per match
+        group_keys = np.zeros(self.num_matches, dtype=np.int64)
+        for attribute in attributes:
+            group_keys = group_keys * len(self.categories[attribute]) + self.codes[attribute]
+
+        unique_keys, group_index = np.unique(group_keys, return_inverse=True)
+        num_groups = len(unique_keys)
+
+        def count(mask=None):
+            if mask is None:
+                return np.bincount(group_index, minlength=num_groups)
+            return np.bincount(group_index[mask], minlength=num_groups)
+
+        potential_totals = count()
+        result_counts = [count(self.result == i) for i in range(len(MatchColumns.result_types))]
+
+        star_potential_totals = count(self.star_player_exists)
+        star_mask = self.star_player_exists & self.is_star_player
+        star_counts = [count(star_mask & (self.result == i)) for i in range(len(MatchColumns.result_types))]
+
+        trophy_changes = np.zeros(num_groups, dtype=np.int64)
+        np.add.at(trophy_changes, group_index, self.trophy_change)
+
+        has_duration = self.duration_bucket >= 0
+        num_buckets = int(self.duration_bucket.max()) + 1 if has_duration.any() else 0
+        duration_counts = np.bincount(
+            group_index[has_duration] * num_buckets + self.duration_bucket[has_duration],
+            minlength=num_groups * num_buckets
+        ).reshape(num_groups, num_buckets)
+
+        # Decode each group's key back into its attribute values
+        group_values = [[] for _ in range(num_groups)]
+        remaining_keys = unique_keys.copy()
+        for attribute in reversed(attributes):
+            num_categories = len(self.categories[attribute])
+            for group, code in enumerate(remaining_keys % num_categories):
+                group_values[group].append(self.categories[attribute][code])
+            remaining_keys //= num_categories
+
+        for group in range(num_groups):
+            path_id = get_path_id(list(reversed(group_values[group])))
+
+            compiler = ResultCompiler()
+            compiler.player_result_data.potential_total = int(potential_totals[group])
+            compiler.player_star_data.potential_total = int(star_potential_totals[group])
+            for i, result_type in enumerate(MatchColumns.result_types):
+                setattr(compiler.player_result_data, result_type, int(result_counts[i][group]))
+                setattr(compiler.player_star_data, result_type, int(star_counts[i][group]))
+
+            compiler.player_trophy_change = int(trophy_changes[group])
+
+            compiler.duration_frequencies.counts = duration_counts[group].tolist()
+
+            path_id_updates[path_id] = path_id_updates[path_id].merge(compiler) if path_id in path_id_updates else compiler
@@ -3,6 +3,8 @@ from CompilerStructuresModule.CompilerStructures.serializable import Serializabl
 from DatabaseUtility.modeToMapOverrideUtility import getMode
 
 class MatchData(Serializable):
+    __slots__ = ("map", "mode", "brawler", "result_type", "is_star_player", "star_player_exists", "duration", "trophy_change", "type")
+
     def __init__(self, map, mode, brawler, result_type, is_star_player, star_player_exists, duration, trophy_change, type):
         if map == None:
             self.map = "unknown"
@@ -3,6 +3,8 @@ from CompilerStructuresModule.CompilerStructures.resultTracker import ResultTrac
 from CompilerStructuresModule.CompilerStructures.serializable import Serializable
 
 class ResultCompiler(Serializable):
+    __slots__ = ("player_result_data", "player_star_data", "duration_frequencies", "player_trophy_change")
+
     duration_bucket_size = 30
 
     def __init__(self):
@@ -12,6 +14,16 @@ class ResultCompiler(Serializable):
         self.duration_frequencies = FrequencyCompiler()
         self.player_trophy_change = 0
     
+    # Rebuilds a compiler from the to_dict shape stored in trie nodes
+    @classmethod
+    def from_dict(cls, data):
+        compiler = cls()
+        compiler.player_result_data = ResultTracker.from_dict(data["player_result_data"])
+        compiler.player_star_data = ResultTracker.from_dict(data["player_star_data"])
+        compiler.duration_frequencies = FrequencyCompiler.from_frequencies(data.get("duration_frequencies", {}).get("frequencies", {}))
+        compiler.player_trophy_change = int(data["player_trophy_change"])
+        return compiler
+
     def handle_battle_result(self, match_data):
         self.player_result_data.__incrementitem__(match_data.result_type)
         self.player_result_data.potential_total += 1
@@ -23,5 +35,26 @@ class ResultCompiler(Serializable):
                 self.player_star_data.__incrementitem__(match_data.result_type)
 
         self.player_trophy_change += match_data.trophy_change
-        if match_data.duration:
-            self.duration_frequencies.add_entry(match_data.duration // ResultCompiler.duration_bucket_size)
+
+        duration_bucket = ResultCompiler.get_duration_bucket(match_data.duration)
+        if duration_bucket is not None:
+            self.duration_frequencies.add_entry(duration_bucket)
+
+    # Bucket of a match duration in seconds, or None for matches without a usable one (missing, zero, negative or not a number)
+    @staticmethod
+    def get_duration_bucket(duration):
+        try:
+            duration = int(duration)
+        except (TypeError, ValueError):
+            return None
+        return duration // ResultCompiler.duration_bucket_size if duration > 0 else None
+
+    # Combines partial aggregates (from chunks, threads, processes or shards) without replaying their matches
+    # Returns a new compiler, and since every field is a sum, merge is associative and commutative
+    def merge(self, other):
+        merged = ResultCompiler()
+        merged.player_result_data = self.player_result_data.merge(other.player_result_data)
+        merged.player_star_data = self.player_star_data.merge(other.player_star_data)
+        merged.duration_frequencies = self.duration_frequencies.merge(other.duration_frequencies)
+        merged.player_trophy_change = self.player_trophy_change + other.player_trophy_change
+        return merged
@@ -1,14 +1,34 @@
 from CompilerStructuresModule.CompilerStructures.serializable import Serializable
 
 class ResultTracker(Serializable):
+    __slots__ = ("wins", "losses", "draws", "potential_total")
+
     def __init__(self):
         self.wins = 0
         self.losses = 0
         self.draws = 0
         self.potential_total = 0
     
+    @classmethod
+    def from_dict(cls, data):
+        tracker = cls()
+        tracker.wins = int(data["wins"])
+        tracker.losses = int(data["losses"])
+        tracker.draws = int(data["draws"])
+        tracker.potential_total = int(data["potential_total"])
+        return tracker
+
     def __str__(self):
         return f"\nwins: {self.wins}, losses: {self.losses}, draws: {self.draws}, potential_total: {self.potential_total}"
     
     def __incrementitem__(self, key):
         setattr(self, key, getattr(self, key) + 1)
+
+    # Returns a new tracker; addition keeps merging associative and commutative
+    def merge(self, other):
+        merged = ResultTracker()
+        merged.wins = self.wins + other.wins
+        merged.losses = self.losses + other.losses
+        merged.draws = self.draws + other.draws
+        merged.potential_total = self.potential_total + other.potential_total
+        return merged
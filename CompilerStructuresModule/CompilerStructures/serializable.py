@@ -3,6 +3,20 @@ from decimal import Decimal
 
 
 class Serializable:
+    # Subclasses declare __slots__, so no per-instance __dict__ is allocated
+    __slots__ = ()
+
+    def attribute_items(self):
+        if hasattr(self, '__dict__'):
+            return self.__dict__.items()
+
+        return [
+            (name, getattr(self, name))
+            for cls in reversed(type(self).__mro__)
+            for name in cls.__dict__.get('__slots__', ())
+            if hasattr(self, name)
+        ]
+
     def to_dict(self):
         result = {}
         excluded_attributes = []
@@ -11,7 +25,7 @@ class Serializable:
         if hasattr(self, 'exclude_attributes') and callable(getattr(self, 'exclude_attributes')):
             excluded_attributes = self.exclude_attributes()
         
-        for k, v in self.__dict__.items():
+        for k, v in self.attribute_items():
             if k in excluded_attributes:
                 continue  # Skip excluded attributes
             
@@ -1,8 +1,6 @@
 import uuid
 import time
-from passlib.hash import pbkdf2_sha256
 import random
-import jwt
 from DatabaseUtility.secretsUtility import getSecret
 from apiUtility import getApiProxyPlayerIconID
 
@@ -12,6 +10,8 @@ PLAYER_INFO_TABLE = "BrawlStarsPlayersInfo"
 NUM_VERIFICATIONS_REQUIRED = 2
 TOKEN_EXPIRY_SECONDS = 15 * 60
 
+# passlib and jwt are imported where they are used so that other Lambda routes don't load them
+
 BRAWLER_ICON_IDS = [
     28000003,  # Shelly
     28000007,  # Nita
@@ -148,6 +148,7 @@ def handleFinalize(playerTag, eventBody, dynamodb):
     if int(time.time()) - int(item["createdAt"]["N"]) > TOKEN_EXPIRY_SECONDS:
         return {"error": "Token expired"}
 
+    from passlib.hash import pbkdf2_sha256
     hashedPassword = pbkdf2_sha256.hash(password)
 
     # Store the password in the final table
@@ -183,6 +184,9 @@ def handleLogin(playerTag, password, dynamodb):
 
     hashedPassword = item["password"]["S"]
 
+    from passlib.hash import pbkdf2_sha256
+    import jwt
+
     # Verify password
     if not pbkdf2_sha256.verify(password, hashedPassword):
         return {"error": "Incorrect password"}
@@ -200,6 +204,8 @@ def handleLogin(playerTag, password, dynamodb):
     }
 
 def verifyToken(token):
+    import jwt
+
     try:
         payload = jwt.decode(token, getSecret("JWT_SECRET"), algorithms=["HS256"])
         return payload["playerTag"]
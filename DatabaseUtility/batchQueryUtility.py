@@ -0,0 +1,215 @@
+from DatabaseUtility.brawlerListUtility import BRAWLER_LIST_TABLE
+from DatabaseUtility.itemUtility import batchGetItemsConcurrently, deserializeDynamoDbItem
+from DatabaseUtility.overviewUtility import PLAYER_INFO_TABLE, formatPlayerOverview
+from DatabaseUtility.trieUtility import (
+    BRAWL_TRIE_TABLE, fetchChildrenNodesAcrossFilterIDs, getMapParentPath, getPathForFetchWithTypeAsParameter,
+    getPathForFetchWithTypeAsTarget, getPotentialTypes
+)
+
+# Resolves the sub-queries of a batch request together
+# Every item the sub-queries need is planned first, deduplicated, and read with concurrent batch_get_item calls;
+# children that parents don't summarize are then read for all sub-queries in one more batch
+
+MAX_BATCH_QUERIES = 25
+BATCH_QUERY_TYPES = ("getTrieData", "getPlayerOverview", "getBrawlerList")
+
+# One projection per table in a batch_get_item, so trie nodes are read with everything any sub-query uses
+TRIE_BATCH_PROJECTION = "pathID, filterID, resultCompiler, childrenPathIDs, childSummaries"
+PLAYER_INFO_BATCH_PROJECTION = "playerTag, overview"
+
+def getKeyAttributes(tableName):
+    if tableName == BRAWL_TRIE_TABLE:
+        return ("pathID", "filterID")
+    elif tableName == PLAYER_INFO_TABLE:
+        return ("playerTag",)
+    else:
+        return ("id",)
+
+def selectAttributes(node, attributeNames):
+    return {name: node[name] for name in attributeNames if name in node}
+
+# A plan lists the items a sub-query needs as (tableName, key values), the children listings it needs as (parentPathID, filterID),
+# and how to build its result once they are read
+def planTrieDataQuery(query):
+    basePath = query['playerTag']
+    filterID = query['filterID']
+    type = query.get('requestType')
+    mode = query.get('requestMode')
+    map = query.get('requestMap')
+    brawler = query.get('requestBrawler')
+    targetAttribute = query.get('targetAttribute')
+    isGlobal = query['isGlobal']
+
+    if targetAttribute is None:
+        path = f"{basePath}${getPathForFetchWithTypeAsTarget(type, mode, map, brawler, isGlobal)}"
+
+        def assemble(items, childrenNodes):
+            node = items[BRAWL_TRIE_TABLE].get((path, filterID))
+            return {
+                "trieData": [selectAttributes(node, ("pathID", "resultCompiler"))] if node else [],
+                "potentialMaps": []
+            }
+
+        return [(BRAWL_TRIE_TABLE, (path, filterID))], [], assemble
+
+    elif targetAttribute == "type":
+        paths = [f"{basePath}${getPathForFetchWithTypeAsTarget(potentialType, mode, map, brawler, isGlobal)}" for potentialType in getPotentialTypes()]
+
+        # If there is mode but no map, include children maps
+        childrenPathIDsNeededForMaps = mode is not None and map is None
+        attributeNames = ("pathID", "resultCompiler", "childrenPathIDs") if childrenPathIDsNeededForMaps else ("pathID", "resultCompiler")
+
+        def assemble(items, childrenNodes):
+            result = []
+            potentialMapsSet = set()
+            for path in paths:
+                node = items[BRAWL_TRIE_TABLE].get((path, filterID))
+                if node is None:
+                    continue
+
+                result.append(selectAttributes(node, attributeNames))
+                if childrenPathIDsNeededForMaps:
+                    for childPathID in node.get("childrenPathIDs", []):
+                        potentialMapsSet.add(childPathID.split('$')[-1])
+
+            return {
+                "trieData": result,
+                "potentialMaps": list(potentialMapsSet)
+            }
+
+        return [(BRAWL_TRIE_TABLE, (path, filterID)) for path in paths], [], assemble
+
+    else:
+        if type is None:
+            raise ValueError("Type must be provided if targetAttribute is not 'type'!")
+
+        fullPath = f"{basePath}${getPathForFetchWithTypeAsParameter(targetAttribute, type, mode, map, brawler, isGlobal)}"
+        mapParentPath = getMapParentPath(basePath, type, mode, map, brawler, isGlobal)
+
+        parentPaths = [fullPath] if mapParentPath is None else [fullPath, mapParentPath]
+
+        def assemble(items, childrenNodes):
+            potentialMaps = []
+            if mapParentPath is not None:
+                mapPaths = items[BRAWL_TRIE_TABLE].get((mapParentPath, filterID), {}).get("childrenPathIDs", [])
+                potentialMaps = [mp.split('$')[-1] for mp in mapPaths]
+
+            return {
+                "trieData": childrenNodes[(fullPath, filterID)],
+                "potentialMaps": potentialMaps
+            }
+
+        return [(BRAWL_TRIE_TABLE, (parentPath, filterID)) for parentPath in parentPaths], [(fullPath, filterID)], assemble
+
+def planPlayerOverviewQuery(query, dynamodb):
+    playerTag = query['playerTag'].upper()
+
+    def assemble(items, childrenNodes):
+        playerInfo = items[PLAYER_INFO_TABLE].get((playerTag,), {})
+        if "overview" in playerInfo:
+            return formatPlayerOverview(playerInfo["overview"])
+
+        # Players without a stored overview take the single-query path, which builds and stores one
+        from DatabaseUtility.playerUtility import getPlayerOverview
+        return getPlayerOverview(playerTag, dynamodb)
+
+    return [(PLAYER_INFO_TABLE, (playerTag,))], [], assemble
+
+def planBrawlerListQuery(query):
+    def assemble(items, childrenNodes):
+        brawlerNames = items[BRAWLER_LIST_TABLE].get(("main",), {}).get("brawlerNames")
+        if brawlerNames is None:
+            raise Exception("Failed to fetch brawler list.")
+        return {"brawlers": list(brawlerNames)}
+
+    return [(BRAWLER_LIST_TABLE, ("main",))], [], assemble
+
+def getQueryType(query):
+    return query.get('type') if isinstance(query, dict) else None
+
+def planBatchQuery(query, dynamodb):
+    queryType = getQueryType(query)
+
+    if queryType == "getTrieData":
+        return planTrieDataQuery(query)
+    elif queryType == "getPlayerOverview":
+        return planPlayerOverviewQuery(query, dynamodb)
+    elif queryType == "getBrawlerList":
+        return planBrawlerListQuery(query)
+    else:
+        raise ValueError(f"Unsupported batch query type: {queryType}, expected one of {', '.join(BATCH_QUERY_TYPES)}")
+
+# Reads the items and children listings that plans need, deduplicated, so a key that several queries need is read once
+# Returns (items, childrenNodes) for the plans' assemble functions
+def readPlannedItems(plans, dynamodb):
+    neededKeys = {}
+    neededParentKeys = {}
+    for keys, parentKeys, _ in plans:
+        for tableName, keyValues in keys:
+            neededKeys.setdefault(tableName, {})[keyValues] = None
+        for parentKey in parentKeys:
+            neededParentKeys[parentKey] = None
+
+    projections = {BRAWL_TRIE_TABLE: TRIE_BATCH_PROJECTION, PLAYER_INFO_TABLE: PLAYER_INFO_BATCH_PROJECTION}
+    tableRequests = {}
+    for tableName, keyValuesSet in neededKeys.items():
+        keyAttributes = getKeyAttributes(tableName)
+        tableRequests[tableName] = {
+            "Keys": [{attribute: {"S": value} for attribute, value in zip(keyAttributes, keyValues)} for keyValues in keyValuesSet]
+        }
+        if tableName in projections:
+            tableRequests[tableName]["ProjectionExpression"] = projections[tableName]
+
+    items = {tableName: {} for tableName in (BRAWL_TRIE_TABLE, PLAYER_INFO_TABLE, BRAWLER_LIST_TABLE)}
+    for tableName, tableItems in batchGetItemsConcurrently(tableRequests, dynamodb).items():
+        keyAttributes = getKeyAttributes(tableName)
+        for item in tableItems:
+            deserializedItem = deserializeDynamoDbItem(item)
+            items[tableName][tuple(deserializedItem[attribute] for attribute in keyAttributes)] = deserializedItem
+
+    childrenNodes = fetchChildrenNodesAcrossFilterIDs(items[BRAWL_TRIE_TABLE], list(neededParentKeys), dynamodb)
+
+    return items, childrenNodes
+
+# Returns one {"type", "statusCode", "body"} result per query, in order
+# A failing query gets an error result without failing the others:
+# if the shared read fails, each query's items are read on their own, so only the queries whose reads fail get a 502
+def resolveBatchQueries(queries, dynamodb):
+    plans = []
+    for query in queries:
+        try:
+            plans.append(planBatchQuery(query, dynamodb))
+        except Exception as e:
+            plans.append(e)
+
+    try:
+        sharedReadResult = readPlannedItems([plan for plan in plans if not isinstance(plan, Exception)], dynamodb)
+        readResults = [sharedReadResult] * len(plans)
+    except Exception as e:
+        print(f"Batch read of {len(queries)} queries failed, reading them one at a time: {e}")
+
+        readResults = []
+        for plan in plans:
+            try:
+                readResults.append(None if isinstance(plan, Exception) else readPlannedItems([plan], dynamodb))
+            except Exception as e:
+                readResults.append(e)
+
+    results = []
+    for query, plan, readResult in zip(queries, plans, readResults):
+        queryType = getQueryType(query)
+
+        if isinstance(plan, Exception):
+            results.append({"type": queryType, "statusCode": 400, "body": {"message": str(plan)}})
+            continue
+
+        if isinstance(readResult, Exception):
+            results.append({"type": queryType, "statusCode": 502, "body": {"message": str(readResult)}})
+            continue
+
+        try:
+            results.append({"type": queryType, "statusCode": 200, "body": plan[2](*readResult)})
+        except Exception as e:
+            results.append({"type": queryType, "statusCode": 502, "body": {"message": str(e)}})
+
+    return results
@@ -0,0 +1,192 @@
+import time
+from CompilerStructuresModule.CompilerStructures.matchData import getMatchDataObjectsFromGame
+from CompilerStructuresModule.CompilerStructures.resultCompiler import ResultCompiler
+from DatabaseUtility.gamesUtility import UNCACHED_GAMES_TABLE_NAME
+from DatabaseUtility.itemUtility import deserializeDynamoDbItem
+from DatabaseUtility.overviewUtility import getFavorites
+from DatabaseUtility.playerUtility import getCompileCheckpoints
+from DatabaseUtility.trieCacheUtility import fetchTrieDataCached, getTrieVersionCached
+from DatabaseUtility.trieUtility import (
+    getCompilersToUpdate, getMapParentPath, getParentPathID, getPathForFetchWithTypeAsParameter,
+    getPathForFetchWithTypeAsTarget, getPathIDsWithAncestors, getPotentialTypes
+)
+
+# Freshness mode: games in BrawlStarsUncachedGames aren't in the trie until the next compile
+# For requests that ask for it, the player's newest uncached games are compiled in memory and merged into the response,
+# within a cap on games and a time budget; nothing is written
+# The budget is checked before every DynamoDB call, so a slow read can overrun it by at most that one call
+
+# Uncached games are only ever compiled into a player's "overall" trie
+FRESH_FILTER_ID = "overall"
+
+FRESH_MAX_UNCACHED_GAMES = 200
+FRESH_TIME_BUDGET_SECONDS = 0.5
+
+def getFreshDeadline(timeBudgetSeconds=FRESH_TIME_BUDGET_SECONDS):
+    return time.monotonic() + timeBudgetSeconds
+
+# Folds the player's newest uncached games that aren't in the trie yet into pathID -> ResultCompiler deltas
+# Returns (pathIDUpdates, freshness), where freshness["complete"] is False if the cap or the deadline left games out,
+# or if a trie update was in progress
+# A complete result is the same for the same stored games, identified by the checkpoint, the newest game and the count
+def getFreshDeltas(playerTag, dynamodb, maxGames=FRESH_MAX_UNCACHED_GAMES, deadline=None):
+    if deadline is None:
+        deadline = getFreshDeadline()
+
+    if time.monotonic() >= deadline:
+        return {}, {"numGames": 0, "complete": False, "latestBattleTime": None, "compileCheckpoint": None}
+
+    # Uncached games at or before the checkpoint were already added to the trie by a compile that hasn't removed them yet
+    # While a trie update is in progress its games are partly in the trie, so they are left out and the result is incomplete
+    compileCheckpoint, pendingCompileCheckpoint = getCompileCheckpoints(playerTag, dynamodb)
+    if pendingCompileCheckpoint is not None:
+        compileCheckpoint = pendingCompileCheckpoint
+
+    queryKwargs = {
+        "TableName": UNCACHED_GAMES_TABLE_NAME,
+        "KeyConditionExpression": "playerTag = :playerTag",
+        "ExpressionAttributeValues": {":playerTag": {"S": playerTag}},
+        "ScanIndexForward": False,
+        "Limit": maxGames
+    }
+    if compileCheckpoint is not None:
+        queryKwargs["KeyConditionExpression"] += " AND battleTime > :compileCheckpoint"
+        queryKwargs["ExpressionAttributeValues"][":compileCheckpoint"] = {"S": compileCheckpoint}
+
+    pathIDUpdates = {}
+    numGames = 0
+    latestBattleTime = None
+    complete = True
+
+    # Newest first, so whatever is left out is the oldest
+    while complete:
+        if time.monotonic() >= deadline:
+            complete = False
+            break
+
+        response = dynamodb.query(**queryKwargs)
+
+        for item in response.get("Items", []):
+            if time.monotonic() >= deadline:
+                complete = False
+                break
+
+            game = deserializeDynamoDbItem(item)
+            getCompilersToUpdate(getMatchDataObjectsFromGame(game, "#" + playerTag, False), playerTag, False, pathIDUpdates)
+
+            numGames += 1
+            if latestBattleTime is None:
+                latestBattleTime = game["battleTime"]
+
+        if not complete or 'LastEvaluatedKey' not in response:
+            break
+
+        if numGames >= maxGames:
+            complete = False
+            break
+
+        queryKwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+        queryKwargs["Limit"] = maxGames - numGames
+
+    complete = complete and pendingCompileCheckpoint is None
+    return pathIDUpdates, {"numGames": numGames, "complete": complete, "latestBattleTime": latestBattleTime, "compileCheckpoint": compileCheckpoint}
+
+# Fetch results can be shared through the trie cache, so nodes are copied rather than modified
+# resultCompiler is None for ancestors that only exist to link the delta paths, which a compile creates with empty stats
+def getFreshNode(node, pathID, resultCompiler):
+    if node is None:
+        return {"pathID": pathID, "resultCompiler": (resultCompiler or ResultCompiler()).to_dict()}
+
+    freshNode = dict(node)
+    if resultCompiler is not None:
+        freshNode["resultCompiler"] = ResultCompiler.from_dict(node["resultCompiler"]).merge(resultCompiler).to_dict()
+    return freshNode
+
+# The delta pathIDs and their ancestors, grouped under their parent pathIDs
+def getDeltaChildren(deltaPathIDs):
+    deltaChildren = {}
+    for pathID in sorted(deltaPathIDs):
+        deltaChildren.setdefault(getParentPathID(pathID), []).append(pathID)
+    return deltaChildren
+
+# A copy of a fetchTrieData result for the player's "overall" trie with pathIDUpdates merged in
+# Follows fetchTrieData's branches, so nodes and maps that only exist in the deltas are added too
+def applyFreshDeltasToTrieData(fetchResult, pathIDUpdates, basePath, type, mode, map, brawler, targetAttribute):
+    if not pathIDUpdates:
+        return fetchResult
+
+    deltaPathIDs = getPathIDsWithAncestors(pathIDUpdates)
+    deltaChildren = getDeltaChildren(deltaPathIDs)
+    nodesByPathID = {node["pathID"]: node for node in fetchResult["trieData"]}
+
+    if targetAttribute is None:
+        paths = [f"{basePath}${getPathForFetchWithTypeAsTarget(type, mode, map, brawler, False)}"]
+        mapParentPaths = []
+    elif targetAttribute == "type":
+        paths = [f"{basePath}${getPathForFetchWithTypeAsTarget(potentialType, mode, map, brawler, False)}" for potentialType in getPotentialTypes()]
+        mapParentPaths = paths if mode is not None and map is None else []
+    else:
+        fullPath = f"{basePath}${getPathForFetchWithTypeAsParameter(targetAttribute, type, mode, map, brawler, False)}"
+        paths = list(nodesByPathID) + [pathID for pathID in deltaChildren.get(fullPath, []) if pathID not in nodesByPathID]
+
+        mapParentPath = getMapParentPath(basePath, type, mode, map, brawler, False)
+        mapParentPaths = [] if mapParentPath is None else [mapParentPath]
+
+    trieData = []
+    for path in paths:
+        node = nodesByPathID.get(path)
+        if path not in deltaPathIDs:
+            if node is not None:
+                trieData.append(node)
+            continue
+
+        freshNode = getFreshNode(node, path, pathIDUpdates.get(path))
+
+        # The type listing returns childrenPathIDs when they are used for potentialMaps
+        if targetAttribute == "type" and path in mapParentPaths:
+            freshNode["childrenPathIDs"] = set(freshNode.get("childrenPathIDs", set())) | set(deltaChildren.get(path, []))
+
+        trieData.append(freshNode)
+
+    potentialMaps = list(fetchResult["potentialMaps"])
+    for mapParentPath in mapParentPaths:
+        for childPathID in deltaChildren.get(mapParentPath, []):
+            if childPathID.split('$')[-1] not in potentialMaps:
+                potentialMaps.append(childPathID.split('$')[-1])
+
+    return {
+        "trieData": trieData,
+        "potentialMaps": potentialMaps
+    }
+
+# Same listings as overviewUtility.getFavoriteBrawlersAndModes, with pathIDUpdates merged in
+# Returns None if the deadline passes before both listings are read
+# The listings are cached by trie version, so a compile since they were cached isn't missed by them and the deltas both
+def getFreshFavoriteBrawlersAndModes(playerTag, pathIDUpdates, cache, deadline, dynamodb):
+    if time.monotonic() >= deadline:
+        return None
+    trieVersion = getTrieVersionCached(cache, playerTag, FRESH_FILTER_ID, dynamodb)
+
+    favorites = []
+    for attributeName in ("brawler", "mode"):
+        if time.monotonic() >= deadline:
+            return None
+
+        fetchResult = fetchTrieDataCached(cache, playerTag, FRESH_FILTER_ID, "regular", None, None, None, attributeName, False, dynamodb, trieVersion)
+        freshResult = applyFreshDeltasToTrieData(fetchResult, pathIDUpdates, playerTag, "regular", None, None, None, attributeName)
+        favorites.append(getFavorites(freshResult["trieData"], attributeName))
+
+    return favorites
+
+# overview is a getPlayerOverview response; its recent games are already kept current by the tracker
+# Returns (overview, freshness); if the deadline passes first, the overview is returned as stored and no games are counted
+def applyFreshDeltasToOverview(overview, playerTag, pathIDUpdates, freshness, cache, deadline, dynamodb):
+    if not pathIDUpdates:
+        return overview, freshness
+
+    favorites = getFreshFavoriteBrawlersAndModes(playerTag, pathIDUpdates, cache, deadline, dynamodb)
+    if favorites is None:
+        return overview, {**freshness, "numGames": 0, "complete": False, "latestBattleTime": None}
+
+    favoriteBrawlers, favoriteModes = favorites
+    return {**overview, "favoriteBrawlers": favoriteBrawlers, "favoriteModes": favoriteModes}, freshness
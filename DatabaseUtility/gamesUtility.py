@@ -1,38 +1,37 @@
+from datetime import datetime
 from apiUtility import getApiProxyRecentGames, getApiRecentGames
 from DatabaseUtility.itemUtility import batchWriteToDynamoDB, deserializeDynamoDbItem, prepareItemForDB
+from DatabaseUtility.overviewUtility import updateOverviewRecentGames
+from DatabaseUtility.pollScheduleUtility import getNextPollInterval, updateNextPollTime
+from DatabaseUtility.workQueueUtility import enqueueJob
 
 
 GAMES_TABLE_NAME = "BrawlStarsGames"
 UNCACHED_GAMES_TABLE_NAME = "BrawlStarsUncachedGames"
 
-def getAllUncachedGamesFromDB(playerTag, dynamodb):
-    games = []
+UNCACHED_GAMES_PAGE_SIZE = 100
 
-    response = dynamodb.query(
-        TableName=UNCACHED_GAMES_TABLE_NAME,
-        KeyConditionExpression="playerTag = :playerTag",
-        ExpressionAttributeValues={
+# Yields the player's uncached games a page at a time, oldest first
+def getUncachedGamePagesFromDB(playerTag, dynamodb, pageSize):
+    queryKwargs = {
+        "TableName": UNCACHED_GAMES_TABLE_NAME,
+        "KeyConditionExpression": "playerTag = :playerTag",
+        "ExpressionAttributeValues": {
             ":playerTag": {"S": playerTag}
         },
-    )
+        "Limit": pageSize
+    }
 
-    for item in response.get('Items', []):
-        games.append(deserializeDynamoDbItem(item))
+    while True:
+        response = dynamodb.query(**queryKwargs)
 
-    # Handle pagination
-    while 'LastEvaluatedKey' in response:
-        response = dynamodb.query(
-            TableName=UNCACHED_GAMES_TABLE_NAME,
-            KeyConditionExpression="playerTag = :playerTag",
-            ExpressionAttributeValues={
-                ":playerTag": {"S": playerTag}
-            },
-            ExclusiveStartKey=response['LastEvaluatedKey'],
-        )
-        for item in response.get('Items', []):
-            games.append(deserializeDynamoDbItem(item))
+        page = [deserializeDynamoDbItem(item) for item in response.get('Items', [])]
+        if page:
+            yield page
 
-    return games
+        if 'LastEvaluatedKey' not in response:
+            return
+        queryKwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
 
 def removeGamesFromUncachedTable(games, dynamodb):
     deleteRequests = []
@@ -69,6 +68,28 @@ def getMostRecentGamesFromDB(playerTag, numGames, useUncachedTable, dynamodb):
     else:
         return None
 
+# The player's cached games from fromBattleTime up to and including throughBattleTime, oldest first
+def getCachedGamesInRange(playerTag, fromBattleTime, throughBattleTime, dynamodb):
+    queryKwargs = {
+        "TableName": GAMES_TABLE_NAME,
+        "KeyConditionExpression": "playerTag = :playerTag AND battleTime BETWEEN :fromBattleTime AND :throughBattleTime",
+        "ExpressionAttributeValues": {
+            ":playerTag": {"S": playerTag},
+            ":fromBattleTime": {"S": fromBattleTime},
+            ":throughBattleTime": {"S": throughBattleTime}
+        },
+        "ConsistentRead": True
+    }
+
+    games = []
+    while True:
+        response = dynamodb.query(**queryKwargs)
+        games.extend(deserializeDynamoDbItem(item) for item in response.get('Items', []))
+
+        if 'LastEvaluatedKey' not in response:
+            return games
+        queryKwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+
 def getMostRecentSavedBattleTime(playerTag, dynamodb):
     mostRecentUncachedGame = getMostRecentGamesFromDB(playerTag, 1, True, dynamodb)
     if mostRecentUncachedGame and len(mostRecentUncachedGame) > 0:
@@ -80,39 +101,79 @@ def getMostRecentSavedBattleTime(playerTag, dynamodb):
     
     return None
 
-def saveGamesFromApiToUncachedDB(playerTag, useProxy, dynamodb):
+# A battlelog holds at most 25 games, so one job stays well under SQS's message size limit
+# Returns whether the games were queued
+def enqueueCompileGames(playerTag, games, dynamodb):
+    try:
+        enqueueJob("compile", {"job": "compileGames", "playerTag": playerTag, "games": games}, dynamodb, messageGroupId=playerTag)
+        return True
+    except Exception as e:
+        print(f"Error queueing games for {playerTag}: {e}")
+        return False
+
+# mostRecentSavedBattleTime is the player's lastSavedBattleTime watermark when the caller already has it
+# Without it, the most recent game is looked up in both games tables
+# With streamCompile, new games are queued for compileStreamedGames instead of being saved to the uncached table
+def saveGamesFromApiToUncachedDB(playerTag, useProxy, dynamodb, mostRecentSavedBattleTime=None, streamCompile=False):
     recentApiGames = getApiProxyRecentGames(playerTag) if useProxy else getApiRecentGames(playerTag, False)
     if recentApiGames is None:
         return 0
 
-    mostRecentSavedBattleTime = getMostRecentSavedBattleTime(playerTag, dynamodb)
+    # A looked-up battleTime is stored below so that later runs can skip the lookup
+    watermarkToStore = None
+    if mostRecentSavedBattleTime is None:
+        mostRecentSavedBattleTime = getMostRecentSavedBattleTime(playerTag, dynamodb)
+        watermarkToStore = mostRecentSavedBattleTime
 
     gamesYetToBeTracked = [
         game for game in recentApiGames
         if mostRecentSavedBattleTime is None or game["battleTime"] > mostRecentSavedBattleTime
     ]
 
-    if len(gamesYetToBeTracked) == 0:
-        return 0
-    
-    for game in gamesYetToBeTracked:
-        game["playerTag"] = playerTag
+    numSavedGames = 0
+
+    if len(gamesYetToBeTracked) > 0:
+        for game in gamesYetToBeTracked:
+            game["playerTag"] = playerTag
+
+        preparedGames = [prepareItemForDB(game) for game in gamesYetToBeTracked]
+
+        # Sort out ones with same battle times
+        seenBattleTimes = set()
+        uniqueGames = []
+        uniquePreparedGames = []
+        for game, item in zip(gamesYetToBeTracked, preparedGames):
+            battleTime = item["battleTime"]["S"]
+
+            if battleTime not in seenBattleTimes:
+                uniqueGames.append(game)
+                uniquePreparedGames.append(item)
+                seenBattleTimes.add(battleTime)
 
-    preparedGames = [prepareItemForDB(game) for game in gamesYetToBeTracked]
+        if streamCompile:
+            savedGames = enqueueCompileGames(playerTag, uniqueGames, dynamodb)
+        else:
+            savedGames = batchWriteToDynamoDB(uniquePreparedGames, UNCACHED_GAMES_TABLE_NAME, dynamodb)
 
-    # Sort out ones with same battle times
-    seenBattleTimes = set()
-    uniquePreparedGames = []
-    for item in preparedGames:
-        battleTime = item["battleTime"]["S"]
+        if savedGames:
+            numSavedGames = len(uniquePreparedGames)
+            watermarkToStore = max(seenBattleTimes)
 
-        if battleTime not in seenBattleTimes:
-            uniquePreparedGames.append(item)
-            seenBattleTimes.add(battleTime)
+            try:
+                updateOverviewRecentGames(playerTag, recentApiGames, dynamodb)
+            except Exception as e:
+                print(f"Failed to update overview for {playerTag}: {e}")
 
-    batchWriteToDynamoDB(uniquePreparedGames, UNCACHED_GAMES_TABLE_NAME, dynamodb)
+    # An empty battlelog is also what a failed request returns, so keep the current schedule
+    if len(recentApiGames) > 0:
+        now = datetime.utcnow()
+        nextPollInterval = getNextPollInterval(recentApiGames, len(gamesYetToBeTracked), mostRecentSavedBattleTime is not None, now)
+        try:
+            updateNextPollTime(playerTag, now + nextPollInterval, dynamodb, watermarkToStore)
+        except Exception as e:
+            print(f"Failed to update tracking state for {playerTag}: {e}")
 
-    return len(uniquePreparedGames)
+    return numSavedGames
 
 def queryGames(player_tag: str, battle_time: str, num_before: int, num_after: int, dynamodb):
     resultGames = []
@@ -150,27 +211,3 @@ def queryGames(player_tag: str, battle_time: str, num_before: int, num_after: in
             resultGames.append(deserializeDynamoDbItem(game))
 
     return resultGames
-
-def getBrawlers(game, playerTag):
-    tagWithHash = "#" + playerTag
-
-    targetPlayer = None
-    if "players" in game["battle"]:
-        for player in game["battle"]["players"]:
-            if player["tag"] == tagWithHash:
-                targetPlayer = player
-                break
-    elif "teams" in game["battle"]:
-        for team in game["battle"]["teams"]:
-            for player in team:
-                if player["tag"] == tagWithHash:
-                    targetPlayer = player
-                    break
-    
-    if targetPlayer is None:
-        return None
-    
-    if "brawler" in targetPlayer:
-        return [targetPlayer["brawler"]["name"]]
-    else:
-        return [brawler["name"] for brawler in targetPlayer["brawlers"]]
\ No newline at end of file
@@ -1,7 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from boto3.dynamodb.types import TypeDeserializer
-
-deserializer = TypeDeserializer()
 
 def prepareItemForDB(game):
     item = {}
@@ -42,6 +40,9 @@ def convertToDynamodbFormat(value):
         else:
             raise ValueError(f"Unsupported set element type for DynamoDB: {elem_type}")
 
+    elif hasattr(value, "to_dict"):
+        # Slotted compiler structures have no __dict__
+        return convertToDynamodbFormat(value.to_dict())
     elif hasattr(value, "__dict__"):
         return {"M": {
             k: convertToDynamodbFormat(v)
@@ -50,17 +51,51 @@ def convertToDynamodbFormat(value):
         }}
     else:
         raise ValueError(f"Unsupported value type: {type(value)}")
+# Decodes straight from DynamoDB's wire format to native types
+# Unlike boto3's TypeDeserializer, numbers become ints and floats instead of Decimals,
+# so results need no conversion before use or JSON encoding
 def deserializeDynamoDbItem(dynamodbItem):
-    return {key: deserializer.deserialize(value) for key, value in dynamodbItem.items()}
+    return {key: deserializeDynamoDbValue(value) for key, value in dynamodbItem.items()}
+
+def deserializeDynamoDbNumber(number):
+    if "." in number or "e" in number or "E" in number:
+        return float(number)
+    return int(number)
 
+def deserializeDynamoDbValue(value):
+    for valueType, rawValue in value.items():
+        if valueType == "S":
+            return rawValue
+        elif valueType == "N":
+            return deserializeDynamoDbNumber(rawValue)
+        elif valueType == "M":
+            return {key: deserializeDynamoDbValue(v) for key, v in rawValue.items()}
+        elif valueType == "L":
+            return [deserializeDynamoDbValue(v) for v in rawValue]
+        elif valueType == "BOOL":
+            return rawValue
+        elif valueType == "NULL":
+            return None
+        elif valueType == "SS":
+            return set(rawValue)
+        elif valueType == "NS":
+            return {deserializeDynamoDbNumber(number) for number in rawValue}
+        elif valueType == "B":
+            return bytes(rawValue)
+        elif valueType == "BS":
+            return {bytes(v) for v in rawValue}
+        else:
+            raise ValueError(f"Unsupported DynamoDB type: {valueType}")
+
+# Items are already decoded to native types, so sets (childrenPathIDs) are the common case
 def decimalAndSetSerializer(obj):
-    if isinstance(obj, Decimal):
+    if isinstance(obj, set):
+        return list(obj)
+    elif isinstance(obj, Decimal):
         ratio = obj.as_integer_ratio()
         if ratio[1] == 1:
             return int(obj)
         return float(obj)
-    elif isinstance(obj, set):
-        return list(obj)
     return obj
 
 def batchWriteToDynamoDB(items, tableName, dynamodb):
@@ -85,25 +120,71 @@ def batchWriteToDynamoDB(items, tableName, dynamodb):
                 response = dynamodb.batch_write_item(
                     RequestItems=response["UnprocessedItems"]
                 )
+        return True
     except Exception as e:
         print(f"Error writing batch to DynamoDB: {e.response['Error']['Message']}")
+        return False
+
+# DynamoDB limits batch get to 100 keys per request
+BATCH_GET_MAX_KEYS = 100
 
-def batchGetAllItems(table_name, keys, dynamodb, projection_expression=None):
+def batchGetAllItems(table_name, keys, dynamodb, projection_expression=None, consistent_read=False):
     # AI
-    request_items = {
-        table_name: {
-            'Keys': keys
+    results = []
+    for i in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request_items = {
+            table_name: {
+                'Keys': keys[i:i + BATCH_GET_MAX_KEYS]
+            }
         }
-    }
-    if projection_expression:
-        request_items[table_name]['ProjectionExpression'] = projection_expression
+        if projection_expression:
+            request_items[table_name]['ProjectionExpression'] = projection_expression
+        if consistent_read:
+            request_items[table_name]['ConsistentRead'] = True
 
-    results = []
-    while request_items:
-        response = dynamodb.batch_get_item(RequestItems=request_items)
-        results.extend(response['Responses'].get(table_name, []))
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            results.extend(response['Responses'].get(table_name, []))
+
+            unprocessed = response.get('UnprocessedKeys', {})
+            request_items = unprocessed if unprocessed else None
+
+    return results
+
+BATCH_GET_MAX_WORKERS = 8
+
+# Gets keys from several tables at once, as concurrent batch_get_item requests that each hold up to 100 keys from any of the tables
+# tableRequests is {tableName: {"Keys": [...], "ProjectionExpression": ...}} and the result is {tableName: [items]}
+def batchGetItemsConcurrently(tableRequests, dynamodb, maxWorkers=BATCH_GET_MAX_WORKERS):
+    tableKeys = [(tableName, key) for tableName, tableRequest in tableRequests.items() for key in tableRequest["Keys"]]
+
+    requests = []
+    for i in range(0, len(tableKeys), BATCH_GET_MAX_KEYS):
+        request_items = {}
+        for tableName, key in tableKeys[i:i + BATCH_GET_MAX_KEYS]:
+            if tableName not in request_items:
+                request_items[tableName] = {**tableRequests[tableName], "Keys": []}
+            request_items[tableName]["Keys"].append(key)
+        requests.append(request_items)
+
+    def getRequestItems(request_items):
+        responses = {}
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for tableName, items in response['Responses'].items():
+                responses.setdefault(tableName, []).extend(items)
+
+            unprocessed = response.get('UnprocessedKeys', {})
+            request_items = unprocessed if unprocessed else None
+        return responses
+
+    results = {tableName: [] for tableName in tableRequests}
+    if not requests:
+        return results
 
-        unprocessed = response.get('UnprocessedKeys', {})
-        request_items = unprocessed if unprocessed else None
+    with ThreadPoolExecutor(max_workers=min(len(requests), maxWorkers)) as executor:
+        for responses in executor.map(getRequestItems, requests):
+            for tableName, items in responses.items():
+                results[tableName].extend(items)
 
-    return results
\ No newline at end of file
+    return results
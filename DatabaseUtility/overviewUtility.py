@@ -0,0 +1,169 @@
+from datetime import datetime
+from DatabaseUtility.itemUtility import convertToDynamodbFormat, deserializeDynamoDbItem
+from DatabaseUtility.modeToMapOverrideUtility import getMode
+from DatabaseUtility.trieUtility import fetchTrieData
+
+# A player's overview is stored on their PlayersInfo item so that the website reads it with a single get_item
+# The compiler writes the favorites from the trie, and the tracker writes the recent games as it saves them
+
+PLAYER_INFO_TABLE = "BrawlStarsPlayersInfo"
+
+OVERVIEW_NUM_RECENT_GAMES = 10
+OVERVIEW_NUM_FAVORITES = 10
+
+BATTLE_TIME_FORMAT = "%Y%m%dT%H%M%S.%fZ"
+
+def getBrawlers(game, playerTag):
+    tagWithHash = "#" + playerTag
+
+    targetPlayer = None
+    if "players" in game["battle"]:
+        for player in game["battle"]["players"]:
+            if player["tag"] == tagWithHash:
+                targetPlayer = player
+                break
+    elif "teams" in game["battle"]:
+        for team in game["battle"]["teams"]:
+            for player in team:
+                if player["tag"] == tagWithHash:
+                    targetPlayer = player
+                    break
+
+    if targetPlayer is None:
+        return None
+
+    if "brawler" in targetPlayer:
+        return [targetPlayer["brawler"]["name"]]
+    else:
+        return [brawler["name"] for brawler in targetPlayer["brawlers"]]
+
+def getRecentGameSummary(game, playerTag):
+    parsedGame = {
+        "mode": getMode(game),
+        "type": game["battle"]["type"],
+        "brawlers": getBrawlers(game, playerTag)
+    }
+    if "result" in game["battle"]:
+        parsedGame["result"] = game["battle"]["result"]
+    if "rank" in game["battle"]:
+        parsedGame["rank"] = game["battle"]["rank"]
+
+    return parsedGame
+
+# Winrate, star rate and game count of each child of a brawler or mode listing, most played first
+def getFavorites(trieNodes, attributeName):
+    ratesList = []
+    for node in trieNodes:
+        resultData = node["resultCompiler"]["player_result_data"]
+        starData = node["resultCompiler"]["player_star_data"]
+
+        rateObject = {
+            attributeName: node["pathID"].split("$")[-1],
+            "winrate": float(resultData["wins"] / resultData["potential_total"]).__round__(3),
+            "numGames": float(resultData["potential_total"])
+        }
+        if starData["potential_total"] > 0:
+            rateObject["starRate"] = float((
+                starData["wins"] +
+                starData["draws"] +
+                starData["losses"]
+            ) / starData["potential_total"]).__round__(3)
+
+        ratesList.append(rateObject)
+
+    return sorted(ratesList, key=lambda x: x["numGames"], reverse=True)[:OVERVIEW_NUM_FAVORITES]
+
+def getFavoriteBrawlersAndModes(playerTag, dynamodb):
+    brawlerTrieResult = fetchTrieData(playerTag, "overall", "regular", None, None, None, "brawler", False, dynamodb)["trieData"]
+    modeTrieResult = fetchTrieData(playerTag, "overall", "regular", None, None, None, "mode", False, dynamodb)["trieData"]
+
+    return getFavorites(brawlerTrieResult, "brawler"), getFavorites(modeTrieResult, "mode")
+
+# recentGames are deserialized games, newest first
+def buildPlayerOverview(playerTag, recentGames, dynamodb):
+    favoriteBrawlers, favoriteModes = getFavoriteBrawlersAndModes(playerTag, dynamodb)
+
+    return {
+        "parsedRecentGames": [getRecentGameSummary(game, playerTag) for game in recentGames[:OVERVIEW_NUM_RECENT_GAMES]],
+        "favoriteBrawlers": favoriteBrawlers,
+        "favoriteModes": favoriteModes,
+        "lastSeen": recentGames[0]["battleTime"] if recentGames else None
+    }
+
+def storePlayerOverview(playerTag, overview, dynamodb):
+    dynamodb.update_item(
+        TableName=PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": playerTag}},
+        UpdateExpression="SET overview = :overview",
+        ConditionExpression="attribute_exists(playerTag)",
+        ExpressionAttributeValues={":overview": convertToDynamodbFormat(overview)}
+    )
+
+# After a compile only the favorites change; the tracker's recent games are newer than the cached games table
+# Returns False if the player has no overview yet
+def updateOverviewFavorites(playerTag, dynamodb):
+    favoriteBrawlers, favoriteModes = getFavoriteBrawlersAndModes(playerTag, dynamodb)
+
+    try:
+        dynamodb.update_item(
+            TableName=PLAYER_INFO_TABLE,
+            Key={"playerTag": {"S": playerTag}},
+            UpdateExpression="SET overview.favoriteBrawlers = :favoriteBrawlers, overview.favoriteModes = :favoriteModes",
+            ConditionExpression="attribute_exists(overview)",
+            ExpressionAttributeValues={
+                ":favoriteBrawlers": convertToDynamodbFormat(favoriteBrawlers),
+                ":favoriteModes": convertToDynamodbFormat(favoriteModes)
+            }
+        )
+        return True
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        return False
+
+# recentApiGames is the player's battlelog, newest first
+# Players without an overview get one from their next compile
+def updateOverviewRecentGames(playerTag, recentApiGames, dynamodb):
+    if not recentApiGames:
+        return
+
+    lastSeen = recentApiGames[0]["battleTime"]
+    parsedRecentGames = [getRecentGameSummary(game, playerTag) for game in recentApiGames[:OVERVIEW_NUM_RECENT_GAMES]]
+
+    try:
+        dynamodb.update_item(
+            TableName=PLAYER_INFO_TABLE,
+            Key={"playerTag": {"S": playerTag}},
+            UpdateExpression="SET overview.parsedRecentGames = :parsedRecentGames, overview.lastSeen = :lastSeen",
+            ConditionExpression="attribute_exists(overview) AND (attribute_not_exists(overview.lastSeen) OR overview.lastSeen <= :lastSeen)",
+            ExpressionAttributeValues={
+                ":parsedRecentGames": convertToDynamodbFormat(parsedRecentGames),
+                ":lastSeen": {"S": lastSeen}
+            }
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        pass
+
+def getStoredPlayerOverview(playerTag, dynamodb):
+    response = dynamodb.get_item(
+        TableName=PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": playerTag}},
+        ProjectionExpression="overview"
+    )
+
+    if "overview" not in response.get("Item", {}):
+        return None
+
+    return deserializeDynamoDbItem(response["Item"])["overview"]
+
+# The response shape of getPlayerOverview, with daysSinceLastSeen measured from now
+def formatPlayerOverview(overview):
+    daysSinceLastSeen = None
+    if overview.get("lastSeen") is not None:
+        lastSeen = datetime.strptime(overview["lastSeen"], BATTLE_TIME_FORMAT)
+        daysSinceLastSeen = max(0, int((datetime.now() - lastSeen).days))
+
+    return {
+        "parsedRecentGames": overview["parsedRecentGames"],
+        "favoriteBrawlers": overview["favoriteBrawlers"],
+        "favoriteModes": overview["favoriteModes"],
+        "daysSinceLastSeen": daysSinceLastSeen
+    }
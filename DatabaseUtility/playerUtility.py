@@ -1,96 +1,385 @@
-from datetime import datetime, timedelta
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from CompilerStructuresModule.CompilerStructures.matchData import getMatchDataObjectsFromGame
-from DatabaseUtility.modeToMapOverrideUtility import getMode
-from DatabaseUtility.trieUtility import fetchTrieData, updateDatabaseTrie
+from DatabaseUtility.trieUtility import getCompilersToUpdate, updateDatabaseTrie
 from apiUtility import getApiProxyPlayerInfo
-from DatabaseUtility.gamesUtility import GAMES_TABLE_NAME, getAllUncachedGamesFromDB, getBrawlers, getMostRecentGamesFromDB, removeGamesFromUncachedTable, saveGamesFromApiToUncachedDB
+from DatabaseUtility.gamesUtility import GAMES_TABLE_NAME, UNCACHED_GAMES_PAGE_SIZE, getCachedGamesInRange, getUncachedGamePagesFromDB, getMostRecentGamesFromDB, removeGamesFromUncachedTable, saveGamesFromApiToUncachedDB
 from DatabaseUtility.itemUtility import batchWriteToDynamoDB, deserializeDynamoDbItem, prepareItemForDB
+from DatabaseUtility.overviewUtility import OVERVIEW_NUM_RECENT_GAMES, buildPlayerOverview, formatPlayerOverview, getStoredPlayerOverview, storePlayerOverview, updateOverviewFavorites
+from DatabaseUtility.pollScheduleUtility import isDueForPoll
+from DatabaseUtility.workQueueUtility import enqueueJob
 
 PLAYER_INFO_TABLE = 'BrawlStarsPlayersInfo'
 
+# Sparse GSI: only players that have been accessed carry activityDay, so listing recent players never reads the whole table
+# Partition key activityDay (S), sort key playerTag (S), projecting statsLastAccessed, nextPollTime and lastSavedBattleTime
+ACTIVE_PLAYERS_INDEX = 'ActivePlayersIndex'
+
+DEFAULT_SCAN_SEGMENTS = 8
+
+# statsLastAccessed and activityDay are UTC, like the window queryActivePlayers reads them in
+def getActivityDay(accessedAt):
+    return accessedAt.strftime("%Y-%m-%d")
+
+# Naive UTC; values written with an offset are converted
+def parseStatsLastAccessed(statsLastAccessed):
+    accessedAt = datetime.fromisoformat(statsLastAccessed)
+    if accessedAt.tzinfo is not None:
+        accessedAt = accessedAt.astimezone(timezone.utc).replace(tzinfo=None)
+    return accessedAt
+
+# Parallel segmented scan of the players table, returning raw items
+def scanPlayersInfo(dynamodb, projectionExpression, totalSegments=DEFAULT_SCAN_SEGMENTS):
+
+    def scanSegment(segment):
+        items = []
+        scanKwargs = {
+            "TableName": PLAYER_INFO_TABLE,
+            "ProjectionExpression": projectionExpression,
+            "Segment": segment,
+            "TotalSegments": totalSegments
+        }
+
+        while True:
+            response = dynamodb.scan(**scanKwargs)
+            items.extend(response.get('Items', []))
+
+            if 'LastEvaluatedKey' not in response:
+                return items
+            scanKwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+
+    with ThreadPoolExecutor(max_workers=totalSegments) as executor:
+        segmentItems = executor.map(scanSegment, range(totalSegments))
+
+    return [item for items in segmentItems for item in items]
+
+# Raw index items of every player accessed within the last numDays, one query per activityDay partition
+def queryActivePlayers(dynamodb, numDays, projectionExpression):
+    now = datetime.utcnow()
+    cutoffDate = now - timedelta(days=numDays)
+    activityDays = [getActivityDay(now - timedelta(days=i)) for i in range(numDays + 1)]
+
+    def queryActivityDay(activityDay):
+        items = []
+        queryKwargs = {
+            "TableName": PLAYER_INFO_TABLE,
+            "IndexName": ACTIVE_PLAYERS_INDEX,
+            "KeyConditionExpression": "activityDay = :activityDay",
+            "ExpressionAttributeValues": {":activityDay": {"S": activityDay}},
+            "ProjectionExpression": projectionExpression
+        }
+
+        while True:
+            response = dynamodb.query(**queryKwargs)
+            items.extend(response.get('Items', []))
+
+            if 'LastEvaluatedKey' not in response:
+                return items
+            queryKwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+
+    with ThreadPoolExecutor(max_workers=min(len(activityDays), DEFAULT_SCAN_SEGMENTS)) as executor:
+        dayItems = executor.map(queryActivityDay, activityDays)
+
+    # The oldest day partition is only partly inside the window
+    return [
+        item for items in dayItems for item in items
+        if parseStatsLastAccessed(item['statsLastAccessed']['S']) >= cutoffDate
+    ]
+
 def getAllPlayerTagsSet(dynamodb):
+    return {item['playerTag']['S'] for item in scanPlayersInfo(dynamodb, 'playerTag')}
 
-    playersInfo = []
+def getAllPlayerTagsSetInRecentDays(dynamodb, numDays=30):
+    return {item['playerTag']['S'] for item in queryActivePlayers(dynamodb, numDays, 'playerTag, statsLastAccessed')}
 
-    response = dynamodb.scan(
-        TableName=PLAYER_INFO_TABLE,
-    )
+# Recently active players whose nextPollTime has passed, mapped to their lastSavedBattleTime watermark
+# Players saved before the watermark existed map to None
+def getPlayersDueForPoll(dynamodb, numDays=30):
+    now = datetime.utcnow()
+
+    players = {}
+    for item in queryActivePlayers(dynamodb, numDays, 'playerTag, statsLastAccessed, nextPollTime, lastSavedBattleTime'):
+        if isDueForPoll(item.get('nextPollTime', {}).get('S'), now):
+            players[item['playerTag']['S']] = item.get('lastSavedBattleTime', {}).get('S')
+
+    return players
+
+# One-off: give players accessed before ACTIVE_PLAYERS_INDEX existed their activityDay
+def backfillActivityDays(dynamodb):
+    numUpdated = 0
+    for item in scanPlayersInfo(dynamodb, 'playerTag, statsLastAccessed, activityDay'):
+        statsLastAccessed = item.get('statsLastAccessed', {}).get('S')
+        if not statsLastAccessed:
+            continue
 
-    # Collect playerTags from the response
-    for item in response.get('Items', []):
-        playersInfo.append(deserializeDynamoDbItem(item))
+        activityDay = getActivityDay(parseStatsLastAccessed(statsLastAccessed))
+        if item.get('activityDay', {}).get('S') == activityDay:
+            continue
 
-    # If there are more items to retrieve (pagination), keep scanning
-    while 'LastEvaluatedKey' in response:
-        response = dynamodb.scan(
+        dynamodb.update_item(
             TableName=PLAYER_INFO_TABLE,
-            ExclusiveStartKey=response['LastEvaluatedKey'],
+            Key={"playerTag": item['playerTag']},
+            UpdateExpression="SET activityDay = :activityDay",
+            ExpressionAttributeValues={":activityDay": {"S": activityDay}}
         )
-        for item in response.get('Items', []):
-            playersInfo.append(deserializeDynamoDbItem(item))
-    
-    playerTagSet = set()
-    for info in playersInfo:
-        playerTagSet.add(info['playerTag'])
+        numUpdated += 1
 
-    return playerTagSet
+    return numUpdated
 
-def getAllPlayerTagsSetInRecentDays(dynamodb, numDays=30):
-    cutoffDate = datetime.utcnow() - timedelta(days=numDays)
+# Games folded into trie deltas before they are flushed to the database
+# Bounds memory for large backlogs, and a crash leaves at most one chunk for the next compile to finish
+COMPILE_CHUNK_SIZE = 500
+
+# Only one compile of a player runs at a time, whether from compiler.py, onboarding or the compile queue
+# Each holds a lease on the player item, renewed with every chunk, which lapses if its holder dies
+COMPILE_LEASE_DURATION = timedelta(minutes=5)
 
-    tags = set()
-    response = dynamodb.scan(
+# Returns (compileCheckpoint, pendingCompileCheckpoint); the second is None unless a trie update is in progress or was interrupted
+def getCompileCheckpoints(playerTag, dynamodb):
+    response = dynamodb.get_item(
         TableName=PLAYER_INFO_TABLE,
-        ProjectionExpression='playerTag, statsLastAccessed'
+        Key={"playerTag": {"S": playerTag}},
+        ProjectionExpression="compileCheckpoint, pendingCompileCheckpoint"
     )
+    item = response.get("Item", {})
+    return item.get("compileCheckpoint", {}).get("S"), item.get("pendingCompileCheckpoint", {}).get("S")
+
+# Takes the lease, or renews it when leaseOwner is the ID of the lease already held
+# Returns the lease's owner ID, or None if another compile holds it
+def acquireCompileLease(playerTag, dynamodb, leaseOwner=None):
+    leaseOwner = leaseOwner or uuid.uuid4().hex
+    now = datetime.utcnow()
 
-    while True:
-        for item in response.get('Items', []):
-            player_tag = item['playerTag']['S']
-            stats_last_accessed = item.get('statsLastAccessed', {}).get('S')
-            if stats_last_accessed:
-                last_accessed_date = datetime.fromisoformat(stats_last_accessed)
-                if last_accessed_date >= cutoffDate:
-                    tags.add(player_tag)
-
-        # Check for more items to scan
-        if 'LastEvaluatedKey' not in response:
-            break
-        response = dynamodb.scan(
+    try:
+        dynamodb.update_item(
             TableName=PLAYER_INFO_TABLE,
-            ExclusiveStartKey=response['LastEvaluatedKey'],
-            ProjectionExpression='playerTag, statsLastAccessed'
+            Key={"playerTag": {"S": playerTag}},
+            UpdateExpression="SET compilingUntil = :compilingUntil, compileLeaseOwner = :leaseOwner",
+            ConditionExpression="attribute_exists(playerTag) AND (attribute_not_exists(compilingUntil) OR compilingUntil < :now OR compileLeaseOwner = :leaseOwner)",
+            ExpressionAttributeValues={
+                ":compilingUntil": {"S": (now + COMPILE_LEASE_DURATION).isoformat()},
+                ":now": {"S": now.isoformat()},
+                ":leaseOwner": {"S": leaseOwner}
+            }
         )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        return None
 
-    return tags
+    return leaseOwner
+
+def renewCompileLease(playerTag, leaseOwner, dynamodb):
+    if acquireCompileLease(playerTag, dynamodb, leaseOwner) is None:
+        raise RuntimeError(f"{playerTag}: lost the compile lease")
+
+def releaseCompileLease(playerTag, leaseOwner, dynamodb):
+    try:
+        dynamodb.update_item(
+            TableName=PLAYER_INFO_TABLE,
+            Key={"playerTag": {"S": playerTag}},
+            UpdateExpression="REMOVE compilingUntil, compileLeaseOwner",
+            ConditionExpression="compileLeaseOwner = :leaseOwner",
+            ExpressionAttributeValues={":leaseOwner": {"S": leaseOwner}}
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        pass
+
+# Runs compile(leaseOwner) while holding the player's compile lease
+# Raises if another compile holds it, so that queued jobs are retried later
+def runWithCompileLease(playerTag, compile, dynamodb):
+    leaseOwner = acquireCompileLease(playerTag, dynamodb)
+    if leaseOwner is None:
+        raise RuntimeError(f"{playerTag}: another compile is in progress")
+
+    try:
+        return compile(leaseOwner)
+    finally:
+        releaseCompileLease(playerTag, leaseOwner, dynamodb)
+
+# The trie and the checkpoint can't be written together, so pendingCompileCheckpoint marks a trie update in progress
+# pendingCompileFrom is the oldest of its games, so that finishing it reads back only those games
+# The trie update uses the new checkpoint as its compileID, so finishing an interrupted one applies each path once
+# Returns the number of paths updated
+def updateTrieThroughCheckpoint(playerTag, compileFrom, compileCheckpoint, pathIDUpdates, dynamodb):
+    dynamodb.update_item(
+        TableName=PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": playerTag}},
+        UpdateExpression="SET pendingCompileCheckpoint = :compileCheckpoint, pendingCompileFrom = :compileFrom",
+        ExpressionAttributeValues={
+            ":compileCheckpoint": {"S": compileCheckpoint},
+            ":compileFrom": {"S": compileFrom}
+        }
+    )
 
+    numPathsUpdated = updateDatabaseTrie(playerTag, None, "overall", dynamodb, False, pathIDUpdates, False, compileCheckpoint)
+
+    dynamodb.update_item(
+        TableName=PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": playerTag}},
+        UpdateExpression="SET compileCheckpoint = :compileCheckpoint REMOVE pendingCompileCheckpoint, pendingCompileFrom",
+        ExpressionAttributeValues={":compileCheckpoint": {"S": compileCheckpoint}}
+    )
+
+    return numPathsUpdated
+
+# Copies games to the cached table, adds their pathIDUpdates to the trie, and only then advances the checkpoint
+# Raises on any failure; the next compile of the player finishes an interrupted trie update with finishPendingCompile
+# Returns the number of paths updated
+def compileGamesIntoTrie(playerTag, games, pathIDUpdates, dynamodb):
+    if not batchWriteToDynamoDB([prepareItemForDB(game) for game in games], GAMES_TABLE_NAME, dynamodb):
+        raise RuntimeError(f"{playerTag}: failed to write {len(games)} games to {GAMES_TABLE_NAME}")
+
+    battleTimes = [game["battleTime"] for game in games]
+    return updateTrieThroughCheckpoint(playerTag, min(battleTimes), max(battleTimes), pathIDUpdates, dynamodb)
+
+# An interrupted compile's games are already in the cached table, from pendingCompileFrom through pendingCompileCheckpoint
+# They are read back from there and the trie update is repeated, which skips the paths it already reached
+# Players compiled before the checkpoint existed have none, so the range never reaches into their older cached games
+# Returns the compile checkpoint
+def finishPendingCompile(playerTag, dynamodb):
+    response = dynamodb.get_item(
+        TableName=PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": playerTag}},
+        ProjectionExpression="compileCheckpoint, pendingCompileCheckpoint, pendingCompileFrom",
+        ConsistentRead=True
+    )
+    item = response.get("Item", {})
+    compileCheckpoint = item.get("compileCheckpoint", {}).get("S")
+    pendingCompileCheckpoint = item.get("pendingCompileCheckpoint", {}).get("S")
+    pendingCompileFrom = item.get("pendingCompileFrom", {}).get("S")
+
+    if pendingCompileCheckpoint is None:
+        return compileCheckpoint
+
+    # Updates interrupted before pendingCompileFrom was recorded start after the checkpoint, or at the newest game without one
+    if pendingCompileFrom is None:
+        pendingCompileFrom = compileCheckpoint or pendingCompileCheckpoint
+
+    games = [
+        game for game in getCachedGamesInRange(playerTag, pendingCompileFrom, pendingCompileCheckpoint, dynamodb)
+        if compileCheckpoint is None or game["battleTime"] > compileCheckpoint
+    ]
+
+    pathIDUpdates = {}
+    for game in games:
+        getCompilersToUpdate(getMatchDataObjectsFromGame(game, "#" + playerTag, False), playerTag, False, pathIDUpdates)
+
+    numPathsUpdated = updateTrieThroughCheckpoint(playerTag, pendingCompileFrom, pendingCompileCheckpoint, pathIDUpdates, dynamodb)
+    updateStatsLastCompiled(playerTag, dynamodb)
+    updateOverviewAfterCompile(playerTag, dynamodb)
+
+    print(f"{playerTag}: finished an interrupted compile of {len(games)} games, {numPathsUpdated} paths updated")
+
+    return pendingCompileCheckpoint
+
+def updateOverviewAfterCompile(playerTag, dynamodb):
+    try:
+        if not updateOverviewFavorites(playerTag, dynamodb):
+            storePlayerOverview(playerTag, computePlayerOverview(playerTag, dynamodb), dynamodb)
+    except Exception as e:
+        print(f"{playerTag}: failed to update overview: {e}")
+
+# Returns the number of games compiled
+# Progress is printed as a single line so that concurrent compiles don't interleave
 def compileUncachedStats(playerTag, dynamodb):
-    print(playerTag + ": ", end="")
+    return runWithCompileLease(playerTag, lambda leaseOwner: compileUncachedStatsWithLease(playerTag, leaseOwner, dynamodb), dynamodb)
+
+def compileUncachedStatsWithLease(playerTag, leaseOwner, dynamodb):
+
+    # Uncached games at or before the checkpoint were already added to the trie by a compile that didn't remove them
+    compileCheckpoint = finishPendingCompile(playerTag, dynamodb)
+
+    numGamesCompiled = 0
+    numPathsUpdated = 0
+    numChunks = 0
+
+    chunkGames = []
+    alreadyCompiledGames = []
+    pathIDUpdates = {}
 
-    #Retrieve Games:
-    games = getAllUncachedGamesFromDB(playerTag, dynamodb)
-    print(str(len(games)) + " uncached games, ", end="")
+    # Each chunk is compiled into the trie and only then removed from the uncached table
+    def flushChunk():
+        nonlocal numGamesCompiled, numPathsUpdated, numChunks
 
-    if(len(games) == 0):
-        print()
-        return
+        renewCompileLease(playerTag, leaseOwner, dynamodb)
+        numPathsUpdated += compileGamesIntoTrie(playerTag, chunkGames, pathIDUpdates, dynamodb)
 
-    matchDataObjects = []
+        removeGamesFromUncachedTable(chunkGames, dynamodb)
+
+        numGamesCompiled += len(chunkGames)
+        numChunks += 1
+        chunkGames.clear()
+        pathIDUpdates.clear()
+
+    for page in getUncachedGamePagesFromDB(playerTag, dynamodb, UNCACHED_GAMES_PAGE_SIZE):
+        for game in page:
+            if compileCheckpoint is not None and game["battleTime"] <= compileCheckpoint:
+                alreadyCompiledGames.append(game)
+                continue
+
+            chunkGames.append(game)
+            getCompilersToUpdate(getMatchDataObjectsFromGame(game, "#" + playerTag, False), playerTag, False, pathIDUpdates)
+
+        if len(chunkGames) >= COMPILE_CHUNK_SIZE:
+            flushChunk()
+
+    if chunkGames:
+        flushChunk()
+
+    # These are already in the cached table
+    if alreadyCompiledGames:
+        removeGamesFromUncachedTable(alreadyCompiledGames, dynamodb)
+
+    if numGamesCompiled == 0:
+        print(f"{playerTag}: 0 uncached games")
+        return 0
+
+    updateStatsLastCompiled(playerTag, dynamodb)
+    updateOverviewAfterCompile(playerTag, dynamodb)
+
+    print(f"{playerTag}: {numGamesCompiled} uncached games in {numChunks} chunks, {numPathsUpdated} paths updated, finished")
+
+    return numGamesCompiled
+
+# Streaming compile: the tracker queues each player's new games, which go straight to the cached table and the trie
+# Queued jobs can be delivered more than once, so games at or before the compile checkpoint are skipped
+# Returns the number of games compiled
+def compileStreamedGames(playerTag, games, dynamodb):
+    return runWithCompileLease(playerTag, lambda leaseOwner: compileStreamedGamesWithLease(playerTag, games, leaseOwner, dynamodb), dynamodb)
+
+def compileStreamedGamesWithLease(playerTag, games, leaseOwner, dynamodb):
+
+    # Games saved to the uncached table (before streaming, or by onboarding) are older, and the checkpoint is about to pass them
+    # They are compiled under the same lease, so compiler.py or onboarding can't compile them at the same time
+    if getMostRecentGamesFromDB(playerTag, 1, True, dynamodb):
+        compileUncachedStatsWithLease(playerTag, leaseOwner, dynamodb)
+
+    compileCheckpoint = finishPendingCompile(playerTag, dynamodb)
+
+    # Keyed by battleTime like the games tables, so repeated games are compiled once
+    newGames = {}
     for game in games:
-        matchDataObjects.extend(getMatchDataObjectsFromGame(game, "#" + playerTag, False))
+        if compileCheckpoint is None or game["battleTime"] > compileCheckpoint:
+            game["playerTag"] = playerTag
+            newGames[game["battleTime"]] = game
 
-    updateDatabaseTrie(playerTag, matchDataObjects, "overall", dynamodb, False, None, False)
+    if not newGames:
+        print(f"{playerTag}: 0 new streamed games")
+        return 0
 
-    # Remove from uncached table, add to cached table:
-    removeGamesFromUncachedTable(games, dynamodb)
+    pathIDUpdates = {}
+    for game in newGames.values():
+        getCompilersToUpdate(getMatchDataObjectsFromGame(game, "#" + playerTag, False), playerTag, False, pathIDUpdates)
 
-    preparedGames = [prepareItemForDB(game) for game in games]
-    batchWriteToDynamoDB(preparedGames, GAMES_TABLE_NAME, dynamodb)
-    # print(f"cached {len(preparedGames)} games, ", end="")
+    numPathsUpdated = compileGamesIntoTrie(playerTag, list(newGames.values()), pathIDUpdates, dynamodb)
 
     updateStatsLastCompiled(playerTag, dynamodb)
+    updateOverviewAfterCompile(playerTag, dynamodb)
 
-    print("finished")
+    print(f"{playerTag}: {len(newGames)} streamed games, {numPathsUpdated} paths updated, finished")
+
+    return len(newGames)
 
 def updateStatsLastCompiled(playerTag, dynamodb):
     dynamodb.update_item(
@@ -100,37 +389,176 @@ def updateStatsLastCompiled(playerTag, dynamodb):
         ExpressionAttributeValues={":statsLastCompiled": {"S": datetime.now().isoformat()}}
     )
 
-def updateStatsLastAccessed(playerTag, dynamodb):
-    dynamodb.update_item(
-        TableName=PLAYER_INFO_TABLE,
-        Key={"playerTag": {"S": playerTag}},
-        UpdateExpression="SET statsLastAccessed = :statsLastAccessed",
-        ExpressionAttributeValues={":statsLastAccessed": {"S": datetime.now().isoformat()}}
-    )
+# statsLastAccessed only feeds the 30-day activity window, so it needn't change on every page view
+# Touches within this granularity of the stored value (and on the same activityDay) are skipped
+STATS_LAST_ACCESSED_GRANULARITY = timedelta(minutes=int(os.environ.get("STATS_LAST_ACCESSED_GRANULARITY_MINUTES", 60)))
+
+def isStatsLastAccessedFresh(statsLastAccessed, accessedAt):
+    if not statsLastAccessed:
+        return False
+
+    storedAt = parseStatsLastAccessed(statsLastAccessed)
+    return accessedAt - storedAt < STATS_LAST_ACCESSED_GRANULARITY and getActivityDay(storedAt) == getActivityDay(accessedAt)
+
+# storedStatsLastAccessed is the value from a player item the caller already read, if any
+# A rejected conditional write still consumes write capacity, so a fresh stored value skips the request entirely;
+# the condition only covers concurrent requests and callers without the item
+# Returns whether the write happened
+def updateStatsLastAccessed(playerTag, dynamodb, storedStatsLastAccessed=None):
+    accessedAt = datetime.utcnow()
+    if isStatsLastAccessedFresh(storedStatsLastAccessed, accessedAt):
+        return False
+
+    activityDay = getActivityDay(accessedAt)
+    try:
+        dynamodb.update_item(
+            TableName=PLAYER_INFO_TABLE,
+            Key={"playerTag": {"S": playerTag}},
+            UpdateExpression="SET statsLastAccessed = :statsLastAccessed, activityDay = :activityDay",
+            ConditionExpression="attribute_not_exists(statsLastAccessed) OR statsLastAccessed < :staleBefore OR activityDay <> :activityDay",
+            ExpressionAttributeValues={
+                ":statsLastAccessed": {"S": accessedAt.isoformat()},
+                ":activityDay": {"S": activityDay},
+                ":staleBefore": {"S": (accessedAt - STATS_LAST_ACCESSED_GRANULARITY).isoformat()}
+            }
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        return False
+
+    return True
+
+def getNewPlayerItem(playerTag, username):
+    accessedAt = datetime.utcnow()
+    return {
+        'playerTag': {'S': playerTag},
+        'currentlyTrackingGames': {'BOOL': True},
+        'regularlyCompileStats': {'BOOL': False},
+        'username': {'S': username},
+        'statsLastCompiled': {'S': datetime.min.isoformat()},
+        'statsLastAccessed': {'S': accessedAt.isoformat()},
+        'activityDay': {'S': getActivityDay(accessedAt)}
+    }
+
+# Onboarding:
+# A new player is added right away with onboardingStatus "compiling", and a background job saves and compiles their games
+# The website polls getOnboardingStatus until the job marks them "ready"
+ONBOARDING_COMPILING = "compiling"
+ONBOARDING_READY = "ready"
+ONBOARDING_FAILED = "failed"
+
+# A job that hasn't finished in this long is assumed lost, and is queued again the next time the status is checked
+ONBOARDING_TIMEOUT = timedelta(minutes=10)
+
+# A failed job is queued again the next time the status is checked after this long, doubling with each retry
+ONBOARDING_RETRY_BACKOFF = timedelta(minutes=5)
+ONBOARDING_MAX_RETRY_BACKOFF = timedelta(days=1)
+
+def enqueueOnboarding(playerTag, dynamodb):
+    enqueueJob("onboarding", {"job": "onboardPlayer", "playerTag": playerTag}, dynamodb)
+
+# Returns the player's item, or None if the player doesn't exist
+def beginOnboardingPlayer(playerTag, dynamodb):
 
-def beginTrackingPlayer(playerTag, dynamodb):
-    
     #Check that this is a valid playerTag:
     apiPlayerInfo = getApiProxyPlayerInfo(playerTag)
 
     if apiPlayerInfo is None:
-        return False
+        return None
+
+    item = getNewPlayerItem(playerTag, apiPlayerInfo['name'])
+    item['onboardingStatus'] = {'S': ONBOARDING_COMPILING}
+    item['onboardingStartedAt'] = {'S': datetime.utcnow().isoformat()}
+
+    try:
+        dynamodb.put_item(
+            TableName=PLAYER_INFO_TABLE,
+            Item=item,
+            ConditionExpression="attribute_not_exists(playerTag)"
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        # A concurrent request added this player first and queued their job
+        return dynamodb.get_item(TableName=PLAYER_INFO_TABLE, Key={"playerTag": {"S": playerTag}}, ConsistentRead=True).get("Item")
+
+    enqueueOnboarding(playerTag, dynamodb)
+
+    return item
 
-    dynamodb.put_item(
+def setOnboardingStatus(playerTag, onboardingStatus, dynamodb):
+    dynamodb.update_item(
         TableName=PLAYER_INFO_TABLE,
-        Item={
-            'playerTag': {'S': playerTag},
-            'currentlyTrackingGames': {'BOOL': True},
-            'regularlyCompileStats': {'BOOL': False},
-            'username': {'S': apiPlayerInfo['name']},
-            'statsLastCompiled': {'S': datetime.min.isoformat()},
-            'statsLastAccessed': {'S': datetime.now().isoformat()}
-        },
+        Key={"playerTag": {"S": playerTag}},
+        UpdateExpression="SET onboardingStatus = :onboardingStatus",
+        ExpressionAttributeValues={":onboardingStatus": {"S": onboardingStatus}}
     )
 
-    saveGamesFromApiToUncachedDB(playerTag, True, dynamodb)
+# The onboarding job; failures are raised again so that the work queue retries them
+# The status stays "compiling" while the queue has retries left, and is only "failed" after the final attempt
+def onboardPlayer(playerTag, dynamodb, isFinalAttempt=True):
+    try:
+        saveGamesFromApiToUncachedDB(playerTag, True, dynamodb)
+        compileUncachedStats(playerTag, dynamodb)
+    except Exception as e:
+        print(f"{playerTag}: onboarding failed{' for the last time' if isFinalAttempt else ''}: {e}")
+        if isFinalAttempt:
+            setOnboardingStatus(playerTag, ONBOARDING_FAILED, dynamodb)
+        raise
+
+    setOnboardingStatus(playerTag, ONBOARDING_READY, dynamodb)
+
+# Players added before onboarding was asynchronous have no status and are ready
+def getOnboardingStatusFromItem(item):
+    return item.get("onboardingStatus", {}).get("S", ONBOARDING_READY)
+
+def getOnboardingRetryBackoff(numRetries):
+    return min(ONBOARDING_RETRY_BACKOFF * 2 ** numRetries, ONBOARDING_MAX_RETRY_BACKOFF)
+
+# Returns None if the player doesn't exist
+# Lost jobs and, after a backoff, failed ones are queued again
+def getOnboardingStatus(playerTag, dynamodb):
+    response = dynamodb.get_item(
+        TableName=PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": playerTag}},
+        ProjectionExpression="onboardingStatus, onboardingStartedAt, onboardingRetries"
+    )
 
-    return True
+    if 'Item' not in response:
+        return None
+
+    item = response['Item']
+    onboardingStatus = getOnboardingStatusFromItem(item)
+
+    startedAt = item.get("onboardingStartedAt", {}).get("S")
+    if not startedAt:
+        return onboardingStatus
+
+    if onboardingStatus == ONBOARDING_COMPILING:
+        retryAfter = ONBOARDING_TIMEOUT
+    elif onboardingStatus == ONBOARDING_FAILED:
+        retryAfter = getOnboardingRetryBackoff(int(item.get("onboardingRetries", {}).get("N", 0)))
+    else:
+        return onboardingStatus
+
+    if datetime.fromisoformat(startedAt) < datetime.utcnow() - retryAfter:
+        # Only the request that moves onboardingStartedAt forward queues the job again
+        try:
+            dynamodb.update_item(
+                TableName=PLAYER_INFO_TABLE,
+                Key={"playerTag": {"S": playerTag}},
+                UpdateExpression="SET onboardingStartedAt = :now, onboardingStatus = :compiling ADD onboardingRetries :one",
+                ConditionExpression="onboardingStartedAt = :startedAt",
+                ExpressionAttributeValues={
+                    ":now": {"S": datetime.utcnow().isoformat()},
+                    ":startedAt": {"S": startedAt},
+                    ":compiling": {"S": ONBOARDING_COMPILING},
+                    ":one": {"N": "1"}
+                }
+            )
+            enqueueOnboarding(playerTag, dynamodb)
+            onboardingStatus = ONBOARDING_COMPILING
+        except dynamodb.exceptions.ConditionalCheckFailedException:
+            pass
+
+    return onboardingStatus
 
 def getPlayerInfo(playerTag, dynamodb):
     return dynamodb.query(
@@ -141,80 +569,21 @@ def getPlayerInfo(playerTag, dynamodb):
         },
     )
 
+# Builds the overview from the cached games table and the trie, for players that don't have one stored yet
+def computePlayerOverview(playerTag, dynamodb):
+    rawRecentGames = getMostRecentGamesFromDB(playerTag, OVERVIEW_NUM_RECENT_GAMES, False, dynamodb) or []
+    return buildPlayerOverview(playerTag, [deserializeDynamoDbItem(game) for game in rawRecentGames], dynamodb)
+
 def getPlayerOverview(playerTag, dynamodb):
-    
-    # Get most recent 10 games
-    rawRecentGames = getMostRecentGamesFromDB(playerTag, 10, False, dynamodb)
-
-    lastSeenString = rawRecentGames[0]["battleTime"]["S"]
-    lastSeen = datetime.strptime(lastSeenString, "%Y%m%dT%H%M%S.%fZ")
-    daysSinceLastSeen = max(0, int((datetime.now() - lastSeen).days))
-
-    parsedRecentGames = []
-    for game in rawRecentGames:
-        deserializedGame = deserializeDynamoDbItem(game)
-
-        parsedGame = {
-            "mode": getMode(deserializedGame),
-            "type": deserializedGame["battle"]["type"],
-            "brawlers": getBrawlers(deserializedGame, playerTag)
-        }
-        if "result" in deserializedGame["battle"]:
-            parsedGame["result"] = deserializedGame["battle"]["result"]
-        if "rank" in deserializedGame["battle"]:
-            parsedGame["rank"] = deserializedGame["battle"]["rank"]
-        
-        parsedRecentGames.append(parsedGame)
-
-    # Get favorite brawlers + winrates
-    brawlerTrieResult = fetchTrieData(playerTag, "overall", "regular", None, None, None, "brawler", False, dynamodb)["trieData"]
-    
-    brawlerRatesList = []
-    for brawlerNode in brawlerTrieResult:
-        brawler = brawlerNode["pathID"].split("$")[-1]
-
-        rateObject = {
-            "brawler": brawler,
-            "winrate": float(brawlerNode["resultCompiler"]["player_result_data"]["wins"] / brawlerNode["resultCompiler"]["player_result_data"]["potential_total"]).__round__(3),       
-            "numGames": float(brawlerNode["resultCompiler"]["player_result_data"]["potential_total"])
-        }
-        if brawlerNode["resultCompiler"]["player_star_data"]["potential_total"] > 0:
-            rateObject["starRate"] = float((
-                brawlerNode["resultCompiler"]["player_star_data"]["wins"] + 
-                brawlerNode["resultCompiler"]["player_star_data"]["draws"] + 
-                brawlerNode["resultCompiler"]["player_star_data"]["losses"]
-            ) / brawlerNode["resultCompiler"]["player_star_data"]["potential_total"]).__round__(3)
-
-        brawlerRatesList.append(rateObject)
-    
-    favoriteBrawlers = sorted(brawlerRatesList, key=lambda x: x["numGames"], reverse=True)[:10]
-
-    # Get favorite modes + winrates
-    modeTrieResult = fetchTrieData(playerTag, "overall", "regular", None, None, None, "mode", False, dynamodb)["trieData"]
-    
-    modeRatesList = []
-    for modeNode in modeTrieResult:
-        mode = modeNode["pathID"].split("$")[-1]
-
-        rateObject = {
-            "mode": mode,
-            "winrate": float(modeNode["resultCompiler"]["player_result_data"]["wins"] / modeNode["resultCompiler"]["player_result_data"]["potential_total"]).__round__(3),       
-            "numGames": float(modeNode["resultCompiler"]["player_result_data"]["potential_total"])
-        }
-        if modeNode["resultCompiler"]["player_star_data"]["potential_total"] > 0:
-            rateObject["starRate"] = float((
-                modeNode["resultCompiler"]["player_star_data"]["wins"] + 
-                modeNode["resultCompiler"]["player_star_data"]["draws"] + 
-                modeNode["resultCompiler"]["player_star_data"]["losses"]
-            ) / modeNode["resultCompiler"]["player_star_data"]["potential_total"]).__round__(3)
+    overview = getStoredPlayerOverview(playerTag, dynamodb)
 
-        modeRatesList.append(rateObject)
-    
-    favoriteModes = sorted(modeRatesList, key=lambda x: x["numGames"], reverse=True)[:10]
+    # Players compiled before overviews were stored
+    if overview is None:
+        overview = computePlayerOverview(playerTag, dynamodb)
 
-    return {
-        "parsedRecentGames": parsedRecentGames,
-        "favoriteBrawlers": favoriteBrawlers,
-        "favoriteModes": favoriteModes,
-        "daysSinceLastSeen": daysSinceLastSeen
-    }
\ No newline at end of file
+        try:
+            storePlayerOverview(playerTag, overview, dynamodb)
+        except Exception as e:
+            print(f"{playerTag}: failed to store overview: {e}")
+
+    return formatPlayerOverview(overview)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+PLAYER_INFO_TABLE = "BrawlStarsPlayersInfo"
+
+BATTLE_TIME_FORMAT = "%Y%m%dT%H%M%S.%fZ"
+
+# The API only returns a player's most recent 25 games
+BATTLELOG_SIZE = 25
+
+# Aim to poll again after about half a battlelog of games, leaving room for bursts of play
+TARGET_NEW_GAMES_PER_POLL = 12
+
+MIN_POLL_INTERVAL = timedelta(minutes=5)
+MAX_POLL_INTERVAL = timedelta(days=1)
+
+# Only games from this window count towards a player's play rate
+PLAY_RATE_WINDOW = timedelta(hours=24)
+
+def parseBattleTime(battleTime):
+    return datetime.strptime(battleTime, BATTLE_TIME_FORMAT)
+
+# Every game in a full battlelog being new means games were probably missed, so poll as soon as possible
+def isBattlelogGap(recentApiGames, numNewGames, hadSavedGames):
+    return hadSavedGames and len(recentApiGames) >= BATTLELOG_SIZE and numNewGames >= len(recentApiGames)
+
+def getNextPollInterval(recentApiGames, numNewGames, hadSavedGames, now):
+    if isBattlelogGap(recentApiGames, numNewGames, hadSavedGames):
+        return MIN_POLL_INTERVAL
+
+    windowStart = now - PLAY_RATE_WINDOW
+    recentBattleTimes = [
+        battleTime for battleTime in (parseBattleTime(game["battleTime"]) for game in recentApiGames)
+        if battleTime >= windowStart
+    ]
+
+    if len(recentBattleTimes) == 0:
+        return MAX_POLL_INTERVAL
+
+    # Games per second over the time since the oldest game in the window
+    # Measuring up to now (rather than to the newest game) lets the rate decay once a player stops playing
+    elapsedSeconds = max((now - min(recentBattleTimes)).total_seconds(), MIN_POLL_INTERVAL.total_seconds())
+    playRate = len(recentBattleTimes) / elapsedSeconds
+
+    interval = timedelta(seconds=TARGET_NEW_GAMES_PER_POLL / playRate)
+
+    return max(MIN_POLL_INTERVAL, min(MAX_POLL_INTERVAL, interval))
+
+# When new games were saved, the player's lastSavedBattleTime watermark is advanced in the same write
+# The watermark only ever moves forward, so an older battleTime falls back to updating the schedule alone
+def updateNextPollTime(playerTag, nextPollTime, dynamodb, lastSavedBattleTime=None):
+    if lastSavedBattleTime is not None:
+        try:
+            dynamodb.update_item(
+                TableName=PLAYER_INFO_TABLE,
+                Key={"playerTag": {"S": playerTag}},
+                UpdateExpression="SET nextPollTime = :nextPollTime, lastSavedBattleTime = :battleTime",
+                ConditionExpression="attribute_exists(playerTag) AND (attribute_not_exists(lastSavedBattleTime) OR lastSavedBattleTime < :battleTime)",
+                ExpressionAttributeValues={
+                    ":nextPollTime": {"S": nextPollTime.isoformat()},
+                    ":battleTime": {"S": lastSavedBattleTime}
+                }
+            )
+            return
+        except dynamodb.exceptions.ConditionalCheckFailedException:
+            pass
+
+    dynamodb.update_item(
+        TableName=PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": playerTag}},
+        UpdateExpression="SET nextPollTime = :nextPollTime",
+        ConditionExpression="attribute_exists(playerTag)",
+        ExpressionAttributeValues={":nextPollTime": {"S": nextPollTime.isoformat()}}
+    )
+
+def isDueForPoll(nextPollTimeString, now):
+    if not nextPollTimeString:
+        return True
+    return datetime.fromisoformat(nextPollTimeString) <= now
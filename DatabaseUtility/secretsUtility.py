@@ -1,14 +1,26 @@
-import os
-from dotenv import load_dotenv
-
-def getSecret(secretName):
-    value = os.environ.get(secretName)
-    if value is not None:
-        return value
-
-    load_dotenv()
-    value = os.environ.get(secretName)
-    if value is not None:
-        return value
-    
-    raise KeyError(f"Secret '{secretName}' not found in environment or .env file")
\ No newline at end of file
+import os
+
+# Secrets are looked up once per process; warm Lambda containers reuse them
+secretsCache = {}
+dotenvLoaded = False
+
+def getSecret(secretName):
+    global dotenvLoaded
+
+    if secretName in secretsCache:
+        return secretsCache[secretName]
+
+    value = os.environ.get(secretName)
+
+    # The .env file is only needed locally, so dotenv isn't imported when the environment has every secret
+    if value is None and not dotenvLoaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        dotenvLoaded = True
+        value = os.environ.get(secretName)
+
+    if value is None:
+        raise KeyError(f"Secret '{secretName}' not found in environment or .env file")
+
+    secretsCache[secretName] = value
+    return value
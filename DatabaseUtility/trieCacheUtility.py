@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from DatabaseUtility.trieUtility import fetchRecentTrieData, fetchTrieData, getTrieVersion
+
+# Warm Lambda containers serve many requests, so trie reads are cached in process
+# Historical filterIDs are never rewritten once published, so they can be kept until evicted
+# "overall" is recompiled continuously and recent reads can gain a newly published filterID, so they expire quickly
+
+TRIE_CACHE_MAX_ENTRIES = 2048
+MUTABLE_TRIE_DATA_TTL_SECONDS = 60
+MUTABLE_FILTER_IDS = {"overall"}
+
+# Size-bounded LRU cache whose entries each carry their own expiry
+class TrieReadCache:
+    def __init__(self, maxEntries=TRIE_CACHE_MAX_ENTRIES):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expiresAt = entry
+            if time.monotonic() >= expiresAt:
+                del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttlSeconds):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttlSeconds)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries)
+            }
+
+def getTrieDataTTL(filterID, fetchResult):
+    # An empty historical result may just be a filterID that is still being published
+    if filterID in MUTABLE_FILTER_IDS or not fetchResult["trieData"]:
+        return MUTABLE_TRIE_DATA_TTL_SECONDS
+    return float("inf")
+
+# A published historical filterID keeps its version, so it is cached as long as its data and a hit needs no read
+# "overall" is read every time, and version 0 may be a filterID that is still being published
+def getTrieVersionCached(cache, basePath, filterID, dynamodb):
+    if filterID in MUTABLE_FILTER_IDS:
+        return getTrieVersion(basePath, filterID, dynamodb)
+
+    key = ("trieVersion", basePath, filterID)
+
+    trieVersion = cache.get(key)
+    if trieVersion is None:
+        trieVersion = getTrieVersion(basePath, filterID, dynamodb)
+        cache.put(key, trieVersion, float("inf") if trieVersion else MUTABLE_TRIE_DATA_TTL_SECONDS)
+
+    return trieVersion
+
+# Results are shared between requests, so callers must not modify them
+# Callers that read the trie's version first pass it in, so that a newer version is never answered from an older entry
+def fetchTrieDataCached(cache, basePath, filterID, type, mode, map, brawler, targetAttribute, isGlobal, dynamodb, trieVersion=None):
+    key = ("trieData", basePath, filterID, type, mode, map, brawler, targetAttribute, isGlobal, trieVersion)
+
+    fetchResult = cache.get(key)
+    if fetchResult is None:
+        fetchResult = fetchTrieData(basePath, filterID, type, mode, map, brawler, targetAttribute, isGlobal, dynamodb)
+        cache.put(key, fetchResult, getTrieDataTTL(filterID, fetchResult))
+
+    return fetchResult
+
+# trieVersions is the [(filterID, trieVersion)] list from getRecentTrieVersions, when the caller has it
+def fetchRecentTrieDataCached(cache, basePath, numItems, isGlobal, type, mode, map, brawler, targetAttribute, dynamodb, trieVersions=None):
+    key = ("recentTrieData", basePath, numItems, type, mode, map, brawler, targetAttribute, isGlobal, tuple(trieVersions or ()))
+
+    fetchResult = cache.get(key)
+    if fetchResult is None:
+        fetchResult = fetchRecentTrieData(basePath, numItems, isGlobal, type, mode, map, brawler, targetAttribute, dynamodb)
+        cache.put(key, fetchResult, MUTABLE_TRIE_DATA_TTL_SECONDS)
+
+    return fetchResult
@@ -1,5 +1,7 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from CompilerStructuresModule.CompilerStructures.resultCompiler import ResultCompiler
-from DatabaseUtility.itemUtility import batchGetAllItems, deserializeDynamoDbItem, prepareItemForDB
+from DatabaseUtility.itemUtility import batchGetAllItems, batchWriteToDynamoDB, deserializeDynamoDbItem, prepareItemForDB
 
 BRAWL_TRIE_TABLE = "BrawlStarsTrieData3"
     
@@ -16,94 +18,382 @@ def getTrieNodeItem(resultCompilerJSON, pathID, filterID, childrenPathIDs):
     return item
 
 # Updating with game data:
-def updateDatabaseTrie(basePath, matchDataObjects, filterID, dynamodb, isGlobal, pathIDUpdates, skipToAddImmediately=False):
-    # print(f"pathIDUpdates: {pathIDUpdates}, ", end="")
-    if pathIDUpdates is None:
-        pathIDUpdates = getCompilersToUpdate(matchDataObjects, basePath, isGlobal, {})
 
-    def updatePath(pathID, resultCompiler, dynamodb):
-        try:
-            # Base ADD update expression for fixed fields
-            update_expr_parts = [
-                "resultCompiler.player_result_data.wins :wins",
-                "resultCompiler.player_result_data.losses :losses",
-                "resultCompiler.player_result_data.draws :draws",
-                "resultCompiler.player_result_data.potential_total :ptotal",
-
-                "resultCompiler.player_star_data.wins :swins",
-                "resultCompiler.player_star_data.losses :slosses",
-                "resultCompiler.player_star_data.draws :sdraws",
-                "resultCompiler.player_star_data.potential_total :sptotal"
-            ]
+# TransactWriteItems accepts at most 100 actions, each on a different item
+TRIE_TRANSACTION_SIZE = 100
+MAX_TRANSACTION_ATTEMPTS = 5
+
+MAX_PARENT_LINK_WORKERS = 16
+
+# Parents with at most this many children also store a copy of each child's resultCompiler in childSummaries
+# so that listing them is a single read; larger parents are listed by fetching the children
+MAX_CHILD_SUMMARIES = 128
+
+# ADD parameters that merge resultCompiler into the stored node's resultCompiler
+# Usable both as update_item kwargs and as a TransactWriteItems Update action
+# compileID makes the update idempotent: a node that already applied that compile (or a later one) rejects it
+# It must increase with every compile of the trie, which a player's compile checkpoint does
+def getPathUpdate(pathID, filterID, resultCompiler, compileID=None):
+    # Base ADD update expression for fixed fields
+    update_expr_parts = [
+        "resultCompiler.player_result_data.wins :wins",
+        "resultCompiler.player_result_data.losses :losses",
+        "resultCompiler.player_result_data.draws :draws",
+        "resultCompiler.player_result_data.potential_total :ptotal",
+
+        "resultCompiler.player_star_data.wins :swins",
+        "resultCompiler.player_star_data.losses :slosses",
+        "resultCompiler.player_star_data.draws :sdraws",
+        "resultCompiler.player_star_data.potential_total :sptotal"
+    ]
+
+    # ExpressionAttributeValues for the fixed fields
+    expr_attr_values = {
+        ":wins": {"N": str(resultCompiler.player_result_data.wins)},
+        ":losses": {"N": str(resultCompiler.player_result_data.losses)},
+        ":draws": {"N": str(resultCompiler.player_result_data.draws)},
+        ":ptotal": {"N": str(resultCompiler.player_result_data.potential_total)},
+        ":swins": {"N": str(resultCompiler.player_star_data.wins)},
+        ":slosses": {"N": str(resultCompiler.player_star_data.losses)},
+        ":sdraws": {"N": str(resultCompiler.player_star_data.draws)},
+        ":sptotal": {"N": str(resultCompiler.player_star_data.potential_total)}
+    }
 
-            # ExpressionAttributeValues for the fixed fields
-            expr_attr_values = {
-                ":wins": {"N": str(resultCompiler.player_result_data.wins)},
-                ":losses": {"N": str(resultCompiler.player_result_data.losses)},
-                ":draws": {"N": str(resultCompiler.player_result_data.draws)},
-                ":ptotal": {"N": str(resultCompiler.player_result_data.potential_total)},
-                ":swins": {"N": str(resultCompiler.player_star_data.wins)},
-                ":slosses": {"N": str(resultCompiler.player_star_data.losses)},
-                ":sdraws": {"N": str(resultCompiler.player_star_data.draws)},
-                ":sptotal": {"N": str(resultCompiler.player_star_data.potential_total)}
-            }
+    update_expr_parts.append("resultCompiler.player_trophy_change :trophy")
+    expr_attr_values[":trophy"] = {"N": str(resultCompiler.player_trophy_change)}
 
-            # if not isGlobal:
+    expr_attr_names = {}
 
-            update_expr_parts.append("resultCompiler.player_trophy_change :trophy")
-            expr_attr_values[":trophy"] = {"N": str(resultCompiler.player_trophy_change)}
+    # Add merging for resultCompiler.duration_frequencies.frequencies
+    # Only non-empty buckets are sent, and buckets with the same count share one value placeholder
+    for bucket, delta in enumerate(resultCompiler.duration_frequencies.counts):
+        if delta == 0:
+            continue
 
-            expr_attr_names = {}
+        name_key = f"#k{bucket}"      # for attribute name placeholder
+        value_key = f":inc{delta}"    # for value placeholder
 
-            # Add merging for resultCompiler.duration_frequencies.frequencies
-            frequencies_to_add = resultCompiler.duration_frequencies.frequencies
+        expr_attr_names[name_key] = str(bucket)
+        expr_attr_values[value_key] = {"N": str(delta)}
+        update_expr_parts.append(f"resultCompiler.duration_frequencies.frequencies.{name_key} {value_key}")
 
-            for key, delta in frequencies_to_add.items():
+    update = {
+        "TableName": BRAWL_TRIE_TABLE,
+        "Key": {
+            "pathID": {"S": pathID},
+            "filterID": {"S": filterID}
+        },
+        "UpdateExpression": "ADD " + ",\n    ".join(update_expr_parts),
+        "ExpressionAttributeValues": expr_attr_values,
+    }
 
-                sanitizedKey = key.replace("-", "_")
+    if len(expr_attr_names) > 0:
+        update["ExpressionAttributeNames"] = expr_attr_names
 
-                name_key = f"#k{sanitizedKey}"      # for attribute name placeholder
-                value_key = f":inc{sanitizedKey}"   # for value placeholder
+    if compileID is not None:
+        update["UpdateExpression"] = "SET compiledThrough = :compileID\n" + update["UpdateExpression"]
+        update["ConditionExpression"] = "attribute_not_exists(compiledThrough) OR compiledThrough < :compileID"
+        expr_attr_values[":compileID"] = {"S": compileID}
 
-                expr_attr_names[name_key] = key
-                expr_attr_values[value_key] = {"N": str(delta)}
-                update_expr_parts.append(f"resultCompiler.duration_frequencies.frequencies.{name_key} {value_key}")
+    return update
 
-            update_expr = "ADD " + ",\n    ".join(update_expr_parts)
+def getParentPathID(pathID):
+    if '$' not in pathID:
+        return None
+    return pathID[:pathID.rfind('$')]
 
-            if len(expr_attr_names) > 0:
-                dynamodb.update_item(
-                    TableName=BRAWL_TRIE_TABLE,
-                    Key={
-                        "pathID": {"S": pathID},
-                        "filterID": {"S": filterID}
-                    },
-                    UpdateExpression=update_expr,
-                    ExpressionAttributeValues=expr_attr_values,
-                    ExpressionAttributeNames=expr_attr_names
-                )
+# Attempt to add these as children of the parent in a single set ADD
+# If it fails, the parent doesn't exist
+# If childrenPathIDs doesn't exist, it is created
+def addChildrenPathIDs(parentPathID, childPathIDs, filterID, dynamodb):
+    try:
+        dynamodb.update_item(
+            TableName=BRAWL_TRIE_TABLE,
+            Key={"pathID": {"S": parentPathID}, "filterID": {"S": filterID}},
+            UpdateExpression="ADD childrenPathIDs :new_children",
+            ConditionExpression="attribute_exists(pathID)",
+            ExpressionAttributeValues={
+                ":new_children": {"SS": list(childPathIDs)},
+            },
+        )
+        return True
+    except Exception as e:
+        return False
+
+def addChildPathID(parentPathID, childPathID, filterID, dynamodb):
+    return addChildrenPathIDs(parentPathID, [childPathID], filterID, dynamodb)
+
+# Existence index for one update: which of pathIDs already have a node for this filterID
+# Read in batches of keys-only gets instead of discovering missing nodes through failed updates
+# The reads are consistent, so a node created moments ago by another compile is never reported missing
+def fetchExistingPathIDs(pathIDs, filterID, dynamodb):
+    keys = [{"pathID": {"S": pathID}, "filterID": {"S": filterID}} for pathID in pathIDs]
+    existingItems = batchGetAllItems(BRAWL_TRIE_TABLE, keys, dynamodb, projection_expression="pathID", consistent_read=True)
+    return {item["pathID"]["S"] for item in existingItems}
+
+# Every updated path plus all of its ancestors, since each new node must be linked from its parent
+def getPathIDsWithAncestors(pathIDs):
+    result = set()
+    for pathID in pathIDs:
+        while pathID is not None and pathID not in result:
+            result.add(pathID)
+            pathID = getParentPathID(pathID)
+    return result
+
+# Links childPathIDs to a parent that the existence index found
+# If the link fails because the parent has since disappeared, the parent is created with them and linked upward in turn
+# A link that still fails raises, since a new subtree that isn't linked is never linked by later compiles
+def linkChildrenToParent(parentPathID, childPathIDs, filterID, dynamodb):
+    if addChildrenPathIDs(parentPathID, childPathIDs, filterID, dynamodb):
+        return
+
+    newItem = getTrieNodeItem(ResultCompiler().to_dict(), parentPathID, filterID, set(childPathIDs))
+    try:
+        dynamodb.put_item(
+            TableName=BRAWL_TRIE_TABLE,
+            Item=prepareItemForDB(newItem),
+            ConditionExpression="attribute_not_exists(pathID)"
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        # The parent exists, so the failure was the write itself
+        if addChildrenPathIDs(parentPathID, childPathIDs, filterID, dynamodb):
+            return
+        raise RuntimeError(f"Failed to link {len(childPathIDs)} new children to {parentPathID} ({filterID})")
+
+    grandparentPathID = getParentPathID(parentPathID)
+    if grandparentPathID is not None:
+        linkChildrenToParent(grandparentPathID, {parentPathID}, filterID, dynamodb)
+
+# Creates a node with its new children already linked, unless it exists
+# A node that another compile created since the existence check is kept, and the children are linked to it instead
+def addTrieNode(pathID, childrenPathIDs, filterID, dynamodb, overwrite=False):
+    newItem = getTrieNodeItem(ResultCompiler().to_dict(), pathID, filterID, childrenPathIDs)
+    conditionKwargs = {} if overwrite else {"ConditionExpression": "attribute_not_exists(pathID)"}
+    try:
+        dynamodb.put_item(TableName=BRAWL_TRIE_TABLE, Item=prepareItemForDB(newItem), **conditionKwargs)
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        if childrenPathIDs and not addChildrenPathIDs(pathID, childrenPathIDs, filterID, dynamodb):
+            raise RuntimeError(f"Failed to link {len(childrenPathIDs)} new children to {pathID} ({filterID})")
+
+# Creates the missing nodes with their new children already linked, then links each new subtree to its existing parent
+# Nodes are only created where none exists, so a concurrent compile's node and its counts are never replaced
+# resetPathIDs are replaced with empty nodes whether or not they exist
+def addMissingTrieNodes(missingPathIDs, filterID, dynamodb, resetPathIDs=frozenset()):
+    newChildrenPathIDs = {pathID: set() for pathID in missingPathIDs}
+    existingParentLinks = {}
+
+    for pathID in missingPathIDs:
+        parentPathID = getParentPathID(pathID)
+        if parentPathID is None:
+            continue
+
+        if parentPathID in newChildrenPathIDs:
+            newChildrenPathIDs[parentPathID].add(pathID)
+        else:
+            existingParentLinks.setdefault(parentPathID, set()).add(pathID)
+
+    # Conditional puts can't be batched, so the nodes are created in parallel
+    if newChildrenPathIDs:
+        with ThreadPoolExecutor(max_workers=min(len(newChildrenPathIDs), MAX_PARENT_LINK_WORKERS)) as executor:
+            addFutures = [
+                executor.submit(addTrieNode, pathID, childrenPathIDs, filterID, dynamodb, pathID in resetPathIDs)
+                for pathID, childrenPathIDs in newChildrenPathIDs.items()
+            ]
+
+        # Raises the first failed node
+        for addFuture in addFutures:
+            addFuture.result()
+
+    # One write per existing parent, however many new children it gets, with the parents updated in parallel
+    if existingParentLinks:
+        with ThreadPoolExecutor(max_workers=min(len(existingParentLinks), MAX_PARENT_LINK_WORKERS)) as executor:
+            linkFutures = [
+                executor.submit(linkChildrenToParent, parentPathID, childPathIDs, filterID, dynamodb)
+                for parentPathID, childPathIDs in existingParentLinks.items()
+            ]
+
+        # Raises the first failed link
+        for linkFuture in linkFutures:
+            linkFuture.result()
+
+CHILD_SUMMARIES_PROJECTION = "pathID, childrenPathIDs, childSummaries, childSummariesTicket"
+
+def fetchChildSummariesParent(parentPathID, filterID, dynamodb):
+    response = dynamodb.get_item(
+        TableName=BRAWL_TRIE_TABLE,
+        Key={"pathID": {"S": parentPathID}, "filterID": {"S": filterID}},
+        ProjectionExpression=CHILD_SUMMARIES_PROJECTION,
+        ConsistentRead=True
+    )
+    return response.get("Item", {"pathID": {"S": parentPathID}})
+
+def fetchChildCompilers(childPathIDs, filterID, dynamodb):
+    childKeys = [{"pathID": {"S": childPathID}, "filterID": {"S": filterID}} for childPathID in childPathIDs]
+    childItems = batchGetAllItems(BRAWL_TRIE_TABLE, childKeys, dynamodb, projection_expression="pathID, resultCompiler", consistent_read=True)
+    return {item["pathID"]["S"]: item["resultCompiler"] for item in childItems}
+
+# The children whose summaries must be read: the ones this update changed, and any the summaries don't have yet
+def getChildPathIDsToSummarize(parentItem, updatedChildPathIDs):
+    childrenPathIDs = set(parentItem.get("childrenPathIDs", {}).get("SS", []))
+    summarizedPathIDs = set(parentItem.get("childSummaries", {}).get("M", {}))
+    return childrenPathIDs & (updatedChildPathIDs | (childrenPathIDs - summarizedPathIDs))
+
+# Updates the childSummaries of each parent of updatedPathIDs to the updated children's current resultCompilers
+# Runs after the children are updated, with consistent reads so that the summaries include this update
+# Only the updated children are read, plus any children a parent has no summary for yet (once, when its summaries are first written)
+# so an update reads each parent it touches and each path it updated once more, however many children the parents have
+# Each parent's childSummariesTicket increases with every write, and a write only succeeds if the ticket is still the one read,
+# so an update working from outdated summaries re-reads and retries instead of overwriting a concurrent update's counts
+# If a parent's summaries can't be written, they are removed rather than left stale; raises if neither works
+def refreshChildSummaries(updatedPathIDs, filterID, dynamodb):
+    updatedChildPathIDs = {}
+    for pathID in updatedPathIDs:
+        parentPathID = getParentPathID(pathID)
+        if parentPathID is not None:
+            updatedChildPathIDs.setdefault(parentPathID, set()).add(pathID)
+
+    if not updatedChildPathIDs:
+        return
+
+    parentKeys = [{"pathID": {"S": pathID}, "filterID": {"S": filterID}} for pathID in updatedChildPathIDs]
+    parentItems = batchGetAllItems(BRAWL_TRIE_TABLE, parentKeys, dynamodb, projection_expression=CHILD_SUMMARIES_PROJECTION, consistent_read=True)
+
+    childPathIDsToRead = set()
+    for parentItem in parentItems:
+        childPathIDsToRead |= getChildPathIDsToSummarize(parentItem, updatedChildPathIDs[parentItem["pathID"]["S"]])
+    childCompilers = fetchChildCompilers(childPathIDsToRead, filterID, dynamodb)
+
+    # Removing them is always safe, since readers then list the children; the next update to touch the parent writes them again
+    # The ticket still increases, so that a write based on the removed summaries fails
+    def removeChildSummaries(parentPathID):
+        dynamodb.update_item(
+            TableName=BRAWL_TRIE_TABLE,
+            Key={"pathID": {"S": parentPathID}, "filterID": {"S": filterID}},
+            UpdateExpression="REMOVE childSummaries ADD childSummariesTicket :one",
+            ConditionExpression="attribute_exists(pathID)",
+            ExpressionAttributeValues={":one": {"N": "1"}}
+        )
+
+    def setChildSummaries(parentItem, childCompilers):
+        parentPathID = parentItem["pathID"]["S"]
+
+        for attempt in range(MAX_TRANSACTION_ATTEMPTS):
+            childrenPathIDs = set(parentItem.get("childrenPathIDs", {}).get("SS", []))
+
+            # A parent that outgrew its summaries is listed from its children instead
+            if len(childrenPathIDs) > MAX_CHILD_SUMMARIES:
+                if "childSummaries" in parentItem:
+                    removeChildSummaries(parentPathID)
+                return
+            if not childrenPathIDs:
+                return
+
+            summaries = {childPathID: summary for childPathID, summary in parentItem.get("childSummaries", {}).get("M", {}).items() if childPathID in childrenPathIDs}
+            for childPathID in getChildPathIDsToSummarize(parentItem, updatedChildPathIDs[parentPathID]):
+                if childPathID in childCompilers:
+                    summaries[childPathID] = childCompilers[childPathID]
+
+            ticketValues = {":summaries": {"M": summaries}}
+            if "childSummariesTicket" in parentItem:
+                ticketCondition = "childSummariesTicket = :ticket"
+                ticketValues[":ticket"] = parentItem["childSummariesTicket"]
+                ticketValues[":newTicket"] = {"N": str(int(parentItem["childSummariesTicket"]["N"]) + 1)}
             else:
+                ticketCondition = "attribute_exists(pathID) AND attribute_not_exists(childSummariesTicket)"
+                ticketValues[":newTicket"] = {"N": "1"}
+
+            try:
                 dynamodb.update_item(
                     TableName=BRAWL_TRIE_TABLE,
-                    Key={
-                        "pathID": {"S": pathID},
-                        "filterID": {"S": filterID}
-                    },
-                    UpdateExpression=update_expr,
-                    ExpressionAttributeValues=expr_attr_values,
+                    Key={"pathID": {"S": parentPathID}, "filterID": {"S": filterID}},
+                    UpdateExpression="SET childSummaries = :summaries, childSummariesTicket = :newTicket",
+                    ConditionExpression=ticketCondition,
+                    ExpressionAttributeValues=ticketValues
                 )
+                return
+            except dynamodb.exceptions.ConditionalCheckFailedException:
+                # Another update wrote them since they were read
+                parentItem = fetchChildSummariesParent(parentPathID, filterID, dynamodb)
+                childCompilers = fetchChildCompilers(getChildPathIDsToSummarize(parentItem, updatedChildPathIDs[parentPathID]), filterID, dynamodb)
+            except Exception as e:
+                print(f"Failed to update child summaries of {parentPathID}: {e}")
+                break
+
+        print(f"Removing the child summaries of {parentPathID}")
+        removeChildSummaries(parentPathID)
+
+    with ThreadPoolExecutor(max_workers=min(len(parentItems) or 1, MAX_PARENT_LINK_WORKERS)) as executor:
+        summaryFutures = [executor.submit(setChildSummaries, parentItem, childCompilers) for parentItem in parentItems]
+
+    # Raises if a parent was left with summaries that are neither current nor removed
+    for summaryFuture in summaryFutures:
+        summaryFuture.result()
+
+# Versions:
+# The root node of each (basePath, filterID) trie carries trieVersion, which increases after every update to that trie
+# It is bumped only once the update is written, so data read after reading a version is at least that new
+
+# Readers key their caches and ETags on the version, so a missed bump would serve the old data indefinitely
+# Failures are retried with backoff and then raised
+def bumpTrieVersion(basePath, filterID, dynamodb):
+    for attempt in range(MAX_TRANSACTION_ATTEMPTS):
+        try:
+            dynamodb.update_item(
+                TableName=BRAWL_TRIE_TABLE,
+                Key={"pathID": {"S": basePath}, "filterID": {"S": filterID}},
+                UpdateExpression="ADD trieVersion :one",
+                ConditionExpression="attribute_exists(pathID)",
+                ExpressionAttributeValues={":one": {"N": "1"}}
+            )
+            return
+        except dynamodb.exceptions.ConditionalCheckFailedException:
+            raise RuntimeError(f"Can't bump the trie version of {basePath} {filterID}: its root node doesn't exist")
+        except Exception as e:
+            if attempt == MAX_TRANSACTION_ATTEMPTS - 1:
+                raise
+            print(f"Failed to bump trie version of {basePath} {filterID}, retrying: {e}")
+            time.sleep(0.1 * 2 ** attempt)
+
+# Tries written before versions were added, and tries that don't exist, are version 0
+def getTrieVersion(basePath, filterID, dynamodb):
+    response = dynamodb.get_item(
+        TableName=BRAWL_TRIE_TABLE,
+        Key={"pathID": {"S": basePath}, "filterID": {"S": filterID}},
+        ProjectionExpression="trieVersion"
+    )
+    return int(response.get("Item", {}).get("trieVersion", {}).get("N", 0))
+
+# [(filterID, trieVersion)] of basePath's most recent numItems filterIDs, newest first
+def getRecentTrieVersions(basePath, numItems, dynamodb):
+    return [
+        (node["filterID"], node.get("trieVersion", 0))
+        for node in queryRecentNodeItems(basePath, numItems, "filterID, trieVersion", dynamodb)
+    ]
+
+# With a compileID (see getPathUpdate), repeating an update that was interrupted applies only the paths it didn't reach
+# Raises if any path couldn't be updated
+def updateDatabaseTrie(basePath, matchDataObjects, filterID, dynamodb, isGlobal, pathIDUpdates, skipToAddImmediately=False, compileID=None):
+    # print(f"pathIDUpdates: {pathIDUpdates}, ", end="")
+    if pathIDUpdates is None:
+        pathIDUpdates = getCompilersToUpdate(matchDataObjects, basePath, isGlobal, {})
+
+    def updatePath(pathID, resultCompiler, dynamodb):
+        try:
+            dynamodb.update_item(**getPathUpdate(pathID, filterID, resultCompiler, compileID))
+            return True
+        except dynamodb.exceptions.ConditionalCheckFailedException:
+            # Already applied by an earlier attempt at this compile
             return True
         except Exception as e:
-            # print("Error during update:")
-            # print(e)
-            # print(pathID)
-            # print(filterID)
-            # print(update_expr)
-            # print(expr_attr_names)
-            # print(expr_attr_values)
             return False
 
+    # Nodes created during this update, including parents created on behalf of their children
+    # Adding one of these again would overwrite the childrenPathIDs it was created with
+    addedPathIDs = set()
+
+    # Only used if a node disappears between the existence check and the update
     def addPath(pathID, childrenPathIDs, dynamodb):
+        addedPathIDs.add(pathID)
 
         baseCompiler = ResultCompiler().to_dict()
 
@@ -114,119 +404,157 @@ def updateDatabaseTrie(basePath, matchDataObjects, filterID, dynamodb, isGlobal,
 
         newItem = getTrieNodeItem(baseCompiler, pathID, filterID, childrenPathIDs)
 
-        dynamodb.put_item(
-            TableName=BRAWL_TRIE_TABLE,
-            Item=prepareItemForDB(newItem)
-        )
-
-        # Reference what the parent should be
-        def getParentPath(pathID):
-            if '$' not in pathID:
-                return None
-            return pathID[:pathID.rfind('$')]
+        # Another compile may have created it since, along with children and counts that must be kept
+        try:
+            dynamodb.put_item(
+                TableName=BRAWL_TRIE_TABLE,
+                Item=prepareItemForDB(newItem),
+                ConditionExpression="attribute_not_exists(pathID)"
+            )
+        except dynamodb.exceptions.ConditionalCheckFailedException:
+            if childrenPathIDs:
+                addChildrenPathIDs(pathID, childrenPathIDs, filterID, dynamodb)
+            return
 
-        parentPath = getParentPath(pathID)
+        parentPath = getParentPathID(pathID)
 
         if not parentPath:
             return
 
-
-        # Attempt to add this as a child to the parent
-        # If it fails, the parent doesn't exist, so create the parent
-        # If childrenPathIDs doesn't exist, it is created (i think)
-        def addChildPathID(parentPathID, childPathID, dynamodb):
-            try:
-                response = dynamodb.update_item(
-                    TableName=BRAWL_TRIE_TABLE,
-                    Key={"pathID": {"S": parentPathID}, "filterID": {"S": filterID}},
-                    UpdateExpression="ADD childrenPathIDs :new_child",
-                    ConditionExpression="attribute_exists(pathID)",
-                    ExpressionAttributeValues={
-                        ":new_child": {"SS": [childPathID]},
-                    },
-                    ReturnValues="UPDATED_NEW"
-                )
-                # print("Successfully updated:", response["Attributes"]["childrenPathIDs"])
-                return True
-            except Exception as e:
-                # print("Error add child path: ")
-                # print(e)
-                # print(parentPathID)
-                # print(childPathID)
-                return False
-
-        # print("Attempting to add this as a child to parent")
-        if addChildPathID(parentPathID=parentPath, childPathID=pathID, dynamodb=dynamodb):
+        if addChildPathID(parentPath, pathID, filterID, dynamodb):
             pass
         else:
             addPath(parentPath, {pathID}, dynamodb)
 
-    # print(f"{len(pathIDUpdates)} paths to update")
+    # Apply the updates in transactions of up to TRIE_TRANSACTION_SIZE paths
+    # A path whose node doesn't exist yet cancels its transaction with a ValidationError,
+    # so that node is added and the whole transaction is retried
+    # A path that already applied this compile cancels it with ConditionalCheckFailed, so it is left out of the retry
+    def transactUpdatePaths(pathUpdates, dynamodb):
+        pathUpdates = list(pathUpdates)
 
-    # startTime = time.time()
-    # print("Starting update...")
+        for attempt in range(MAX_TRANSACTION_ATTEMPTS):
+            if not pathUpdates:
+                return True
 
-    count = 0
+            try:
+                dynamodb.transact_write_items(
+                    TransactItems=[{"Update": getPathUpdate(pathID, filterID, resultCompiler, compileID)} for pathID, resultCompiler in pathUpdates]
+                )
+                return True
+            except dynamodb.exceptions.TransactionCanceledException as e:
+                cancellationReasons = e.response.get("CancellationReasons", [])
+
+                missingPathIDs = [
+                    pathUpdates[i][0] for i, reason in enumerate(cancellationReasons)
+                    if reason.get("Code") == "ValidationError"
+                ]
+                appliedPathIDs = {
+                    pathUpdates[i][0] for i, reason in enumerate(cancellationReasons)
+                    if reason.get("Code") == "ConditionalCheckFailed"
+                }
 
-    print(f"updating {len(pathIDUpdates)} paths, ")#, end="")
-    for pathID, resultCompiler in pathIDUpdates.items():
-        if updatePath(pathID, resultCompiler, dynamodb) and not skipToAddImmediately:
-            pass
-        else:
-            addPath(pathID, set(), dynamodb)
-            newUpdateResult = updatePath(pathID, resultCompiler, dynamodb)
+                for pathID in missingPathIDs:
+                    if pathID not in addedPathIDs:
+                        addPath(pathID, set(), dynamodb)
 
-            if not newUpdateResult:
-                print()
-                print("Failed to update after adding, this is a HUGE problem!")
-                print()
-        
-        count += 1
-    
-    # endTime = time.time()
-    # print(f"Update completed in {endTime - startTime:.2f} seconds.")
-    # if endTime - startTime > 0:
-        # Print the rate of paths updated per second
-        # print(f"Updated {count} paths at a rate of {count / (endTime - startTime):.2f} paths/second.")
-    
-def getPathIDsToUpdate(matchData, basePath, isGlobal):
-    result = []
-    def addPathID(path):
-        result.append(basePath + path)
+                pathUpdates = [pathUpdate for pathUpdate in pathUpdates if pathUpdate[0] not in appliedPathIDs]
 
-    addPathID("")
+                # Conflicts with other writers are retried after a short backoff
+                if not missingPathIDs and not appliedPathIDs:
+                    time.sleep(0.1 * 2 ** attempt)
 
-    #type.mode.brawler
-    # addPathID(f"${type}")
-    # addPathID(f"${type}${mode}")
-    #This IS needed: find out what brawlers you have played soloShowdown with
-    addPathID(f"$modeBrawler${matchData.type}${matchData.mode}${matchData.brawler}")
-
-    if not isGlobal:
-        #type.brawler.mode.map:
-        addPathID(f"$brawlerModeMap${matchData.type}")
-        addPathID(f"$brawlerModeMap${matchData.type}${matchData.brawler}")
-        addPathID(f"$brawlerModeMap${matchData.type}${matchData.brawler}${matchData.mode}")
-        addPathID(f"$brawlerModeMap${matchData.type}${matchData.brawler}${matchData.mode}${matchData.map}")
-
-        #type.mode.map.brawler:
-        addPathID(f"$modeMapBrawler${matchData.type}")
-        addPathID(f"$modeMapBrawler${matchData.type}${matchData.mode}")
-        addPathID(f"$modeMapBrawler${matchData.type}${matchData.mode}${matchData.map}")
-        addPathID(f"$modeMapBrawler${matchData.type}${matchData.mode}${matchData.map}${matchData.brawler}")
+        return False
+
+    pathUpdates = list(pathIDUpdates.items())
+
+    # Create every missing node up front so that no update fails
+    # skipToAddImmediately resets the updated nodes themselves, so only their ancestors are checked
+    neededPathIDs = getPathIDsWithAncestors(pathIDUpdates.keys())
+    if skipToAddImmediately:
+        ancestorPathIDs = neededPathIDs - pathIDUpdates.keys()
+        resetPathIDs = set(pathIDUpdates.keys())
+        missingPathIDs = resetPathIDs | (ancestorPathIDs - fetchExistingPathIDs(ancestorPathIDs, filterID, dynamodb))
     else:
+        resetPathIDs = set()
+        missingPathIDs = neededPathIDs - fetchExistingPathIDs(neededPathIDs, filterID, dynamodb)
+
+    addMissingTrieNodes(missingPathIDs, filterID, dynamodb, resetPathIDs)
+    addedPathIDs.update(missingPathIDs)
+
+    failedPathIDs = []
+    for i in range(0, len(pathUpdates), TRIE_TRANSACTION_SIZE):
+        transactionPathUpdates = pathUpdates[i:i + TRIE_TRANSACTION_SIZE]
+
+        if not transactUpdatePaths(transactionPathUpdates, dynamodb):
+            # Fall back to updating each path on its own
+            for pathID, resultCompiler in transactionPathUpdates:
+                if not updatePath(pathID, resultCompiler, dynamodb):
+                    addPath(pathID, set(), dynamodb)
+                    if not updatePath(pathID, resultCompiler, dynamodb):
+                        print()
+                        print("Failed to update after adding, this is a HUGE problem!")
+                        print()
+                        failedPathIDs.append(pathID)
+
+    # The version is bumped even if the summaries fail, since the children have changed either way
+    try:
+        refreshChildSummaries(pathIDUpdates.keys(), filterID, dynamodb)
+    finally:
+        if pathUpdates:
+            bumpTrieVersion(basePath, filterID, dynamodb)
 
-        # Extension of modeBrawler
-        # These are specifically global because they already exist in players' modemapbrawler
-        addPathID(f"$modeBrawler${matchData.type}")
-        addPathID(f"$modeBrawler${matchData.type}${matchData.mode}")
+    if failedPathIDs:
+        raise RuntimeError(f"Failed to update {len(failedPathIDs)} paths of {basePath} {filterID}, including {failedPathIDs[0]}")
 
-        # Brawler
-        addPathID(f"$brawlerMode${matchData.type}")
-        addPathID(f"$brawlerMode${matchData.type}${matchData.brawler}")
-        addPathID(f"$brawlerMode${matchData.type}${matchData.brawler}${matchData.mode}")
+    return len(pathUpdates)
 
-    return result
+# Every path a match is compiled into, as (path prefix, MatchData attributes appended to it in order)
+PLAYER_PATH_TEMPLATES = [
+    ("", ()),
+
+    #This IS needed: find out what brawlers you have played soloShowdown with
+    ("$modeBrawler", ("type", "mode", "brawler")),
+
+    #type.brawler.mode.map:
+    ("$brawlerModeMap", ("type",)),
+    ("$brawlerModeMap", ("type", "brawler")),
+    ("$brawlerModeMap", ("type", "brawler", "mode")),
+    ("$brawlerModeMap", ("type", "brawler", "mode", "map")),
+
+    #type.mode.map.brawler:
+    ("$modeMapBrawler", ("type",)),
+    ("$modeMapBrawler", ("type", "mode")),
+    ("$modeMapBrawler", ("type", "mode", "map")),
+    ("$modeMapBrawler", ("type", "mode", "map", "brawler")),
+]
+
+GLOBAL_PATH_TEMPLATES = [
+    ("", ()),
+    ("$modeBrawler", ("type", "mode", "brawler")),
+
+    # Extension of modeBrawler
+    # These are specifically global because they already exist in players' modemapbrawler
+    ("$modeBrawler", ("type",)),
+    ("$modeBrawler", ("type", "mode")),
+
+    # Brawler
+    ("$brawlerMode", ("type",)),
+    ("$brawlerMode", ("type", "brawler")),
+    ("$brawlerMode", ("type", "brawler", "mode")),
+]
+
+def getPathTemplates(isGlobal):
+    return GLOBAL_PATH_TEMPLATES if isGlobal else PLAYER_PATH_TEMPLATES
+
+def getPathIDFromTemplate(basePath, prefix, attributeValues):
+    return basePath + prefix + "".join(f"${value}" for value in attributeValues)
+
+def getPathIDsToUpdate(matchData, basePath, isGlobal):
+    return [
+        getPathIDFromTemplate(basePath, prefix, [matchData[attribute] for attribute in attributes])
+        for prefix, attributes in getPathTemplates(isGlobal)
+    ]
 
 def getCompilersToUpdate(matchDataObjects, basePath, isGlobal, pathIDUpdates):
     # Compile all of the matchDataObjects into a list of ResultCompilers that correspond to pathIDs
@@ -241,136 +569,140 @@ def getCompilersToUpdate(matchDataObjects, basePath, isGlobal, pathIDUpdates):
     
     return pathIDUpdates
 
+# Combines two pathID -> ResultCompiler dicts built from different matches into a new one
+# Partial results from threads, processes or shards can be reduced in any order or grouping
+def mergeCompilersToUpdate(pathIDUpdates, otherPathIDUpdates):
+    merged = dict(pathIDUpdates)
+    for pathID, resultCompiler in otherPathIDUpdates.items():
+        merged[pathID] = merged[pathID].merge(resultCompiler) if pathID in merged else resultCompiler
+    return merged
+
+# Same result as getCompilersToUpdate, computed with NumPy group-by reductions over columns of match data
+# Meant for global compiles over millions of matches; needs numpy, which the Lambda deployment doesn't install
+def getCompilersToUpdateColumnar(matchDataObjects, basePath, isGlobal, pathIDUpdates):
+    from CompilerStructuresModule.CompilerStructures.matchColumns import MatchColumns
+
+    matchColumns = MatchColumns(matchDataObjects)
+
+    for prefix, attributes in getPathTemplates(isGlobal):
+        matchColumns.add_grouped_compilers(
+            attributes,
+            lambda attributeValues: getPathIDFromTemplate(basePath, prefix, attributeValues),
+            pathIDUpdates
+        )
+
+    return pathIDUpdates
+
 # Fetching:
+def getPotentialTypes():
+    # For now, there's only 2 types
+    # If there are custom types in the future, somehow get all this player's types from $mapType$.children
+    return ["regular", "ranked"]
+
+# Path of the node whose children are the values of targetAttribute
+def getPathForFetchWithTypeAsParameter(targetAttribute, type, mode, map, brawler, isGlobal):
+    if targetAttribute == "brawler":
+        if map is not None:
+            #typeModeMapBrawler type + mode + map -> brawlers
+            return f"modeMapBrawler${type}${mode}${map}"
+        elif mode is not None:
+            #typeModeBrawler type + mode -> brawlers
+            return f"modeBrawler${type}${mode}"
+        else:
+            #typeBrawlerModeMap type -> brawlers
+            if isGlobal:
+                return f"brawlerMode${type}"
+            else:
+                return f"brawlerModeMap${type}"
+    elif targetAttribute == "mode":
+        if brawler is not None:
+            #typeBrawlerModeMap type + brawler -> modes
+            if isGlobal:
+                return f"brawlerMode${type}${brawler}"
+            else:
+                return f"brawlerModeMap${type}${brawler}"
+        else:
+            #typeModeMapBrawler type -> modes
+            if isGlobal:
+                return f"modeBrawler${type}"
+            else:
+                return f"modeMapBrawler${type}"
+    elif targetAttribute == "map":
+        if brawler is not None:
+            #typeBrawlerModeMap type + brawler + mode -> maps
+            return f"brawlerModeMap${type}${brawler}${mode}"
+        else:
+            #typeModeMapBrawler type + mode -> maps
+            return f"modeMapBrawler${type}${mode}"
+    else:
+        raise Exception("Invalid targetAttribute!")
+
+# Path of the node holding the stats for exactly these parameters
+def getPathForFetchWithTypeAsTarget(type, mode, map, brawler, isGlobal):
+    if brawler is not None:
+        if map is not None:
+            return f"brawlerModeMap${type}${brawler}${mode}${map}"
+        elif mode is not None:
+            if isGlobal:
+                return f"modeBrawler${type}${mode}${brawler}"
+            else:
+                return f"brawlerModeMap${type}${brawler}${mode}"
+        else:
+            if isGlobal:
+                return f"brawlerMode${type}${brawler}"
+            else:
+                return f"brawlerModeMap${type}${brawler}"
+    elif mode is not None:
+        if map is not None:
+            return f"modeMapBrawler${type}${mode}${map}"
+        else:
+            if isGlobal:
+                return f"modeBrawler${type}${mode}"
+            else:
+                return f"modeMapBrawler${type}${mode}"
+    else:
+        return f"modeBrawler${type}" # Any of the base maps could go here, because they all begin with type
+        # Need to implement a way to actually assign the right stats here when transitioning from old format
+
+def getMapParentPath(basePath, type, mode, map, brawler, isGlobal):
+    if isGlobal or mode is None:
+        return None
+    return f"{basePath}${getPathForFetchWithTypeAsParameter('map', type, mode, map, brawler, isGlobal)}"
+
 def fetchTrieData(basePath, filterID, type, mode, map, brawler, targetAttribute, isGlobal, dynamodb):    
 
     if targetAttribute != "type" and targetAttribute is not None:
 
         if type is None:
-            raise Exception("Type must be provided if targetAttribute is not 'type'!")
+            raise ValueError("Type must be provided if targetAttribute is not 'type'!")
 
         # For these, get the object with the corresponding id
         # For the first outcome, this would be modeMapBrawler$type$mode$map
         # Get the children of this object and return them
 
-        def fetchChildrenPaths(pathID, dynamodb):
-            response = dynamodb.get_item(
-                TableName=BRAWL_TRIE_TABLE,
-                Key={"pathID": {"S": pathID}, "filterID": {"S": filterID}},
-                ProjectionExpression="childrenPathIDs"
-            )
-
-            if 'Item' not in response:
-                return []
-            
-            if 'childrenPathIDs' not in response['Item']:
-                return []
-            
-            childrenPathIDs = deserializeDynamoDbItem(response['Item'])['childrenPathIDs']
-
-            return childrenPathIDs
-
-        def fetchChildrenNodes(pathID, dynamodb):
-            childrenPathIDs = fetchChildrenPaths(pathID, dynamodb)
-
-            childrenPathIDKeys = [{"pathID": {"S": childPathID}, "filterID": {"S": filterID}} for childPathID in childrenPathIDs]
-            childrenItems = batchGetAllItems(BRAWL_TRIE_TABLE, childrenPathIDKeys, dynamodb, projection_expression="pathID, resultCompiler")
-
-            deserializedResult = [deserializeDynamoDbItem(childItem) for childItem in childrenItems]
-            return deserializedResult
-
-        def getPathForFetchWithTypeAsParameter(targetAttribute, type, mode, map, brawler, isGlobal):
-            if targetAttribute == "brawler":
-                if map is not None:
-                    #typeModeMapBrawler type + mode + map -> brawlers
-                    return f"modeMapBrawler${type}${mode}${map}"
-                elif mode is not None:
-                    #typeModeBrawler type + mode -> brawlers
-                    return f"modeBrawler${type}${mode}"
-                else:
-                    #typeBrawlerModeMap type -> brawlers
-                    if isGlobal:
-                        return f"brawlerMode${type}"
-                    else:
-                        return f"brawlerModeMap${type}"
-            elif targetAttribute == "mode":
-                if brawler is not None:
-                    #typeBrawlerModeMap type + brawler -> modes
-                    if isGlobal:
-                        return f"brawlerMode${type}${brawler}"
-                    else:
-                        return f"brawlerModeMap${type}${brawler}"
-                else:
-                    #typeModeMapBrawler type -> modes
-                    if isGlobal:
-                        return f"modeBrawler${type}"
-                    else:
-                        return f"modeMapBrawler${type}"
-            elif targetAttribute == "map":
-                if brawler is not None:
-                    #typeBrawlerModeMap type + brawler + mode -> maps
-                    return f"brawlerModeMap${type}${brawler}${mode}"
-                else:
-                    #typeModeMapBrawler type + mode -> maps
-                    return f"modeMapBrawler${type}${mode}"
-            else:
-                raise Exception("Invalid targetAttribute!")
-
         fullPath = f"{basePath}${getPathForFetchWithTypeAsParameter(targetAttribute, type, mode, map, brawler, isGlobal)}"
+        mapParentPath = getMapParentPath(basePath, type, mode, map, brawler, isGlobal)
+
+        parentPaths = [fullPath] if mapParentPath is None else [fullPath, mapParentPath]
+        parents = batchGetNodesAcrossFilterIDs([(parentPath, filterID) for parentPath in parentPaths], CHILD_LISTING_PROJECTION, dynamodb)
 
         potentialMaps = []
-        if not isGlobal and mode is not None:
-            mapParentPath = f"{basePath}${getPathForFetchWithTypeAsParameter('map', type, mode, map, brawler, isGlobal)}"
-            mapPaths = fetchChildrenPaths(mapParentPath, dynamodb)
+        if mapParentPath is not None:
+            mapPaths = parents.get((mapParentPath, filterID), {}).get("childrenPathIDs", [])
             potentialMaps = [mp.split('$')[-1] for mp in mapPaths]
 
         return {
-            "trieData": fetchChildrenNodes(fullPath, dynamodb),
+            "trieData": fetchChildrenNodesAcrossFilterIDs(parents, [(fullPath, filterID)], dynamodb)[(fullPath, filterID)],
             "potentialMaps": potentialMaps
         }
 
     else:
         # targetAttribute == "type"
-        # This can probably be merged with the above large targetAttribute elif blocks by adding elif targetAttribute == "type"
 
         # For these, requests are harder since type is always the root of the path
-        # Somehow get all types, for now, this can be stored in a variable potentialTypes = ["regular", "ranked"]
         # For each type, fetch it along with the parameters
         # These objects are what are returned
 
-        # For now, there's only 2 types
-        # If there are custom types in the future, somehow get all this player's types from $mapType$.children
-        # For the first outcome, fetch baseTag$typeBrawlerModeMap$.children to get all of the types
-
-        def getPotentialTypes():
-            return ["regular", "ranked"]
-
-        def getPathForFetchWithTypeAsTarget(type, mode, map, brawler, isGlobal):
-            if brawler is not None:
-                if map is not None:
-                    return f"brawlerModeMap${type}${brawler}${mode}${map}"
-                elif mode is not None:
-                    if isGlobal:
-                        return f"modeBrawler${type}${mode}${brawler}"
-                    else:
-                        return f"brawlerModeMap${type}${brawler}${mode}"
-                else:
-                    if isGlobal:
-                        return f"brawlerMode${type}${brawler}"
-                    else:
-                        return f"brawlerModeMap${type}${brawler}"
-            elif mode is not None:
-                if map is not None:
-                    return f"modeMapBrawler${type}${mode}${map}"
-                else:
-                    if isGlobal:
-                        return f"modeBrawler${type}${mode}"
-                    else:
-                        return f"modeMapBrawler${type}${mode}"
-            else:
-                return f"modeBrawler${type}" # Any of the base maps could go here, because they all begin with type
-                # Need to implement a way to actually assign the right stats here when transitioning from old format
-
         if targetAttribute is None:
             path = f"{basePath}${getPathForFetchWithTypeAsTarget(type, mode, map, brawler, isGlobal)}"
 
@@ -423,41 +755,158 @@ def fetchTrieData(basePath, filterID, type, mode, map, brawler, targetAttribute,
             "potentialMaps": list(potentialMapsSet)
         }
 
+# Time series reads:
+# Every filterID of a node lives in the node's pathID partition, so its history is a single query
+
+# Most recent numItems filterIDs of pathID, newest first
+def queryRecentNodeItems(pathID, numItems, projectionExpression, dynamodb):
+    response = dynamodb.query(
+        TableName=BRAWL_TRIE_TABLE,
+        KeyConditionExpression="pathID = :pathID",
+        ExpressionAttributeValues={
+            ":pathID": {"S": pathID}
+        },
+        ScanIndexForward=False,
+        Limit=numItems,
+        ProjectionExpression=projectionExpression
+    )
+
+    return [deserializeDynamoDbItem(item) for item in response.get('Items', [])]
+
+# Batch gets every (pathID, filterID) pair in as few batch_get_item calls as possible
+# Returns {(pathID, filterID): item}
+def batchGetNodesAcrossFilterIDs(pathFilterIDPairs, projectionExpression, dynamodb):
+    keys = [{"pathID": {"S": pathID}, "filterID": {"S": filterID}} for pathID, filterID in dict.fromkeys(pathFilterIDPairs)]
+    if not keys:
+        return {}
+
+    items = batchGetAllItems(BRAWL_TRIE_TABLE, keys, dynamodb, projection_expression=projectionExpression)
+
+    nodes = {}
+    for item in items:
+        node = deserializeDynamoDbItem(item)
+        nodes[(node["pathID"], node["filterID"])] = node
+    return nodes
+
+def stripFilterID(node):
+    return {key: value for key, value in node.items() if key != "filterID"}
+
+# Listing a parent's children reads its childrenPathIDs, and its childSummaries when it has them
+CHILD_LISTING_PROJECTION = "pathID, filterID, childrenPathIDs, childSummaries"
+
+# Children from the parent's summaries, or None if they don't cover exactly its current children
+def getSummarizedChildren(parent):
+    childrenPathIDs = parent.get("childrenPathIDs", set())
+    childSummaries = parent.get("childSummaries")
+
+    if childSummaries is None or set(childSummaries) != set(childrenPathIDs):
+        return None
+
+    return [{"pathID": childPathID, "resultCompiler": resultCompiler} for childPathID, resultCompiler in childSummaries.items()]
+
+# Children of each (parentPathID, filterID) in parentKeys, given the parents read with CHILD_LISTING_PROJECTION
+# Only parents without usable summaries have their children read, all in one batch
+def fetchChildrenNodesAcrossFilterIDs(parents, parentKeys, dynamodb):
+    childrenNodes = {}
+    unsummarizedChildKeys = []
+
+    for parentKey in parentKeys:
+        parent = parents.get(parentKey, {})
+        childrenNodes[parentKey] = [] if not parent.get("childrenPathIDs") else getSummarizedChildren(parent)
+
+        if childrenNodes[parentKey] is None:
+            unsummarizedChildKeys.extend((childPathID, parentKey[1]) for childPathID in parent["childrenPathIDs"])
+
+    children = batchGetNodesAcrossFilterIDs(unsummarizedChildKeys, "pathID, filterID, resultCompiler", dynamodb)
+
+    for (parentPathID, filterID), nodes in childrenNodes.items():
+        if nodes is None:
+            childrenNodes[(parentPathID, filterID)] = [
+                stripFilterID(children[(childPathID, filterID)])
+                for childPathID in parents[(parentPathID, filterID)]["childrenPathIDs"] if (childPathID, filterID) in children
+            ]
+
+    return childrenNodes
+
+# One fetchTrieData-shaped entry per filterID, newest first, with datetime set to the filterID
+# Children listings cover the latest numItems filterIDs of basePath, with an empty entry where the parent is missing
+# Node and type histories cover the latest numItems filterIDs of the requested node(s) themselves, so filterIDs without them are left out
+# Raises ValueError for invalid requests; DynamoDB errors are raised as they are, so that nothing empty is cached or returned
 def fetchRecentTrieData(basePath, numItems, isGlobal, type, mode, map, brawler, targetAttribute, dynamodb):
-    filterIDs = []
+    if targetAttribute is None:
+        return fetchRecentNodeHistory(basePath, numItems, isGlobal, type, mode, map, brawler, dynamodb)
+    elif targetAttribute == "type":
+        return fetchRecentTypeHistory(basePath, numItems, isGlobal, mode, map, brawler, dynamodb)
+    else:
+        return fetchRecentChildrenHistory(basePath, numItems, isGlobal, type, mode, map, brawler, targetAttribute, dynamodb)
 
-    try:
-        response = dynamodb.query(
-            TableName=BRAWL_TRIE_TABLE,
-            KeyConditionExpression="pathID = :pathID",
-            ExpressionAttributeValues={
-                ":pathID": {"S": basePath}
-            },
-            ScanIndexForward=False,
-            Limit=numItems,
-            ProjectionExpression="filterID"
-        )
+def fetchRecentNodeHistory(basePath, numItems, isGlobal, type, mode, map, brawler, dynamodb):
+    path = f"{basePath}${getPathForFetchWithTypeAsTarget(type, mode, map, brawler, isGlobal)}"
 
-        if 'Items' not in response or len(response['Items']) == 0:
-            return []
+    return [
+        {"trieData": [stripFilterID(node)], "potentialMaps": [], "datetime": node["filterID"]}
+        for node in queryRecentNodeItems(path, numItems, "pathID, filterID, resultCompiler", dynamodb)
+    ]
 
-        for item in response['Items']:
-            filterID = item['filterID']['S']
-            filterIDs.append(filterID)
+def fetchRecentTypeHistory(basePath, numItems, isGlobal, mode, map, brawler, dynamodb):
+    childrenPathIDsNeededForMaps = mode is not None and map is None
+    projectionExpression = "pathID, filterID, resultCompiler, childrenPathIDs" if childrenPathIDsNeededForMaps else "pathID, filterID, resultCompiler"
 
-    except Exception as e:
-        print(f"Error fetching trie data: {e}")
-        return []
+    # One query per type; the newest numItems filterIDs overall are all within each type's newest numItems
+    nodesByFilterID = {}
+    for potentialType in getPotentialTypes():
+        fullPath = f"{basePath}${getPathForFetchWithTypeAsTarget(potentialType, mode, map, brawler, isGlobal)}"
+        for node in queryRecentNodeItems(fullPath, numItems, projectionExpression, dynamodb):
+            nodesByFilterID.setdefault(node["filterID"], []).append(stripFilterID(node))
 
     fetchResults = []
+    for filterID in sorted(nodesByFilterID, reverse=True)[:numItems]:
+        potentialMapsSet = set()
+        for node in nodesByFilterID[filterID]:
+            for childPathID in node.get("childrenPathIDs", []):
+                potentialMapsSet.add(childPathID.split('$')[-1])
+
+        fetchResults.append({
+            "trieData": nodesByFilterID[filterID],
+            "potentialMaps": list(potentialMapsSet),
+            "datetime": filterID
+        })
+
+    return fetchResults
+
+def fetchRecentChildrenHistory(basePath, numItems, isGlobal, type, mode, map, brawler, targetAttribute, dynamodb):
+    if type is None:
+        raise ValueError("Type must be provided if targetAttribute is not 'type'!")
+
+    filterIDs = [node["filterID"] for node in queryRecentNodeItems(basePath, numItems, "filterID", dynamodb)]
+    if not filterIDs:
+        return []
 
+    fullPath = f"{basePath}${getPathForFetchWithTypeAsParameter(targetAttribute, type, mode, map, brawler, isGlobal)}"
+    mapParentPath = getMapParentPath(basePath, type, mode, map, brawler, isGlobal)
+
+    # Parents for every filterID in one batch, then the children that aren't summarized for every filterID in another
+    parentPaths = [fullPath] if mapParentPath is None else [fullPath, mapParentPath]
+    parents = batchGetNodesAcrossFilterIDs(
+        [(parentPath, filterID) for filterID in filterIDs for parentPath in parentPaths],
+        CHILD_LISTING_PROJECTION,
+        dynamodb
+    )
+
+    childrenNodes = fetchChildrenNodesAcrossFilterIDs(parents, [(fullPath, filterID) for filterID in filterIDs], dynamodb)
+
+    fetchResults = []
     for filterID in filterIDs:
-        fetchResult = fetchTrieData(
-            basePath, filterID, type, mode, map, brawler, targetAttribute, isGlobal, dynamodb
-        )
-        fetchResult['datetime'] = filterID
-        fetchResults.append(fetchResult)
-    
+        potentialMaps = []
+        if mapParentPath is not None:
+            potentialMaps = [mp.split('$')[-1] for mp in parents.get((mapParentPath, filterID), {}).get("childrenPathIDs", [])]
+
+        fetchResults.append({
+            "trieData": childrenNodes[(fullPath, filterID)],
+            "potentialMaps": potentialMaps,
+            "datetime": filterID
+        })
+
     return fetchResults
 
 # Removing
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+
+# Background jobs for work that shouldn't happen inside a website request
+# A queue whose URL environment variable is set is an SQS queue, consumed by lambda_function when subscribed to it
+# Otherwise jobs run on a worker thread in this process, which is enough for local testing but not for Lambda,
+# since a Lambda container is frozen between requests
+
+WORK_QUEUE_REGION = os.environ.get("AWS_REGION", "us-west-1")
+
+# The maxReceiveCount of the queues' redrive policy; a job received this many times isn't retried again
+WORK_QUEUE_MAX_RECEIVE_COUNT = int(os.environ.get("WORK_QUEUE_MAX_RECEIVE_COUNT", "5"))
+
+QUEUE_URL_ENVIRONMENT_VARIABLES = {
+    "onboarding": "ONBOARDING_QUEUE_URL",
+    "compile": "COMPILE_QUEUE_URL",
+}
+
+# The compile queue must be FIFO so that each player's games are compiled in the order they were tracked
+FIFO_QUEUE_NAMES = {"compile"}
+
+sqsClient = None
+localQueue = None
+localQueueLock = threading.Lock()
+
+def getQueueUrl(queueName):
+    queueUrl = os.environ.get(QUEUE_URL_ENVIRONMENT_VARIABLES[queueName])
+    if queueUrl and queueName in FIFO_QUEUE_NAMES and not queueUrl.endswith(".fifo"):
+        raise RuntimeError(f"{QUEUE_URL_ENVIRONMENT_VARIABLES[queueName]} must be an SQS FIFO queue (.fifo)")
+    return queueUrl
+
+def getSqsClient():
+    global sqsClient
+    if sqsClient is None:
+        import boto3
+        sqsClient = boto3.client("sqs", region_name=WORK_QUEUE_REGION)
+    return sqsClient
+
+# Runs a job described by a JSON-compatible dict with a "job" name
+# isFinalAttempt is False when the queue will retry the job if it fails
+def processJob(job, dynamodb, isFinalAttempt=True):
+    if job["job"] == "onboardPlayer":
+        from DatabaseUtility.playerUtility import onboardPlayer
+        onboardPlayer(job["playerTag"], dynamodb, isFinalAttempt)
+    elif job["job"] == "compileGames":
+        from DatabaseUtility.playerUtility import compileStreamedGames
+        compileStreamedGames(job["playerTag"], job["games"], dynamodb)
+    else:
+        raise ValueError(f"Unknown job: {job['job']}")
+
+def runLocalWorker():
+    while True:
+        job, dynamodb = localQueue.get()
+        try:
+            processJob(job, dynamodb)
+        except Exception as e:
+            print(f"Job {job} failed: {e}")
+        finally:
+            localQueue.task_done()
+
+def getLocalQueue():
+    global localQueue
+    with localQueueLock:
+        if localQueue is None:
+            localQueue = queue.Queue()
+            threading.Thread(target=runLocalWorker, daemon=True).start()
+    return localQueue
+
+# dynamodb is only used by the local worker; SQS consumers use their own client
+# On a FIFO queue, jobs with the same messageGroupId are delivered in order, and identical jobs are only delivered once
+def enqueueJob(queueName, job, dynamodb, messageGroupId=None):
+    queueUrl = getQueueUrl(queueName)
+
+    # A local job queued by a Lambda would be frozen with the container and might never run
+    if not queueUrl and os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        raise RuntimeError(f"{QUEUE_URL_ENVIRONMENT_VARIABLES[queueName]} must be set to queue {queueName} jobs from a Lambda")
+
+    if queueUrl:
+        messageBody = json.dumps(job)
+        messageKwargs = {"QueueUrl": queueUrl, "MessageBody": messageBody}
+        if queueUrl.endswith(".fifo"):
+            messageKwargs["MessageGroupId"] = messageGroupId or queueName
+            messageKwargs["MessageDeduplicationId"] = hashlib.sha256(messageBody.encode("utf-8")).hexdigest()
+
+        getSqsClient().send_message(**messageKwargs)
+    else:
+        getLocalQueue().put((job, dynamodb))
+
+# Blocks until every locally queued job has run
+def waitForLocalJobs():
+    if localQueue is not None:
+        localQueue.join()
+
+# For an SQS event source mapping with ReportBatchItemFailures: failed messages are returned so that only they are retried
+# compileGames jobs in the same batch are merged per player, so each player's trie is updated once per batch
+def handleWorkQueueRecords(records, dynamodb):
+    batchItemFailures = []
+    compileRecords = {}
+
+    for record in records:
+        try:
+            job = json.loads(record["body"])
+            if job["job"] == "compileGames":
+                compileRecords.setdefault(job["playerTag"], []).append((record, job))
+            else:
+                isFinalAttempt = int(record.get("attributes", {}).get("ApproximateReceiveCount", WORK_QUEUE_MAX_RECEIVE_COUNT)) >= WORK_QUEUE_MAX_RECEIVE_COUNT
+                processJob(job, dynamodb, isFinalAttempt)
+        except Exception as e:
+            print(f"Job {record.get('messageId')} failed: {e}")
+            batchItemFailures.append({"itemIdentifier": record["messageId"]})
+
+    for playerTag, playerRecords in compileRecords.items():
+        try:
+            processJob({"job": "compileGames", "playerTag": playerTag, "games": [game for _, job in playerRecords for game in job["games"]]}, dynamodb)
+        except Exception as e:
+            # All of the player's messages are retried, which keeps them in order on a FIFO queue
+            print(f"Compiling {len(playerRecords)} jobs for {playerTag} failed: {e}")
+            batchItemFailures.extend({"itemIdentifier": record["messageId"]} for record, _ in playerRecords)
+
+    return {"batchItemFailures": batchItemFailures}
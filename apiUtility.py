@@ -1,4 +1,6 @@
-import requests
+import os
+import threading
+import time
 from DatabaseUtility.secretsUtility import getSecret
 
 # The Brawl Stars API requires you to associate an ip address with an API key
@@ -6,6 +8,43 @@ from DatabaseUtility.secretsUtility import getSecret
 # ApiProxy functions access BrawlBolt's API proxy that mimics the API from a static IP
 # Pure Api functions assume that the code is being run from the ip that is associated with the API key
 
+# requests is imported by the functions that use it, since most Lambda requests never call the API
+
+# Can be pointed at a local stub of the API for testing
+BRAWL_API_DEFAULT_BASE_URL = "https://api.brawlstars.com/v1"
+BRAWL_API_BASE_URL = os.environ.get("BRAWL_API_BASE_URL", BRAWL_API_DEFAULT_BASE_URL)
+
+# A local stub doesn't check the key, so BRAWL_API_KEY is only required for the real API
+def getApiHeaders():
+    if BRAWL_API_BASE_URL != BRAWL_API_DEFAULT_BASE_URL:
+        return {}
+    return {"Authorization": f"Bearer {getSecret('BRAWL_API_KEY')}"}
+
+# Token bucket shared by every thread that calls the API
+# The Brawl Stars API rejects requests with a 429 once a key's quota is exceeded
+class ApiRateLimiter:
+    def __init__(self, requestsPerSecond, burstSize=None):
+        self.requestsPerSecond = requestsPerSecond
+        self.burstSize = burstSize if burstSize is not None else requestsPerSecond
+        self.tokens = self.burstSize
+        self.lastRefill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burstSize, self.tokens + (now - self.lastRefill) * self.requestsPerSecond)
+                self.lastRefill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                waitTime = (1 - self.tokens) / self.requestsPerSecond
+
+            time.sleep(waitTime)
+
 # ApiProxy Functions:
 def requestApiProxy(endpoint):
 
@@ -14,6 +53,8 @@ def requestApiProxy(endpoint):
         "params": {}
     }
 
+    import requests
+
     API_PROXY_URL = getSecret("BRAWL_STARS_API_PROXY_URL")
 
     try:
@@ -44,11 +85,11 @@ def getApiProxyPlayerIconID(playerTag):
 # Only used for local testing
 def getApiRecentGames(playerTag, doErrorPrinting=True):
 
-    BRAWL_API_KEY = getSecret("BRAWL_API_KEY")
+    import requests
 
     response = requests.get(
-            f"https://api.brawlstars.com/v1/players/%23{playerTag}/battlelog",
-            headers={"Authorization": f"Bearer {BRAWL_API_KEY}"}
+            f"{BRAWL_API_BASE_URL}/players/%23{playerTag}/battlelog",
+            headers=getApiHeaders()
         )
     if response.status_code == 200:
         return response.json().get("items", [])
@@ -60,11 +101,11 @@ def getApiRecentGames(playerTag, doErrorPrinting=True):
 
 def getApiPlayerInfo(playerTag):
 
-    BRAWL_API_KEY = getSecret("BRAWL_API_KEY")
+    import requests
 
     response = requests.get(
-            f"https://api.brawlstars.com/v1/players/%23{playerTag}",
-            headers={"Authorization": f"Bearer {BRAWL_API_KEY}"}
+            f"{BRAWL_API_BASE_URL}/players/%23{playerTag}",
+            headers=getApiHeaders()
         )
     if response.status_code == 200:
         return response.json()
@@ -79,11 +120,11 @@ def getApiPlayerIconID(playerTag):
     return playerInfo["icon"]["id"]
 
 def getApiBrawlersList():
-    BRAWL_API_KEY = getSecret("BRAWL_API_KEY")
+    import requests
 
     response = requests.get(
-            "https://api.brawlstars.com/v1/brawlers",
-            headers={"Authorization": f"Bearer {BRAWL_API_KEY}"}
+            f"{BRAWL_API_BASE_URL}/brawlers",
+            headers=getApiHeaders()
         )
     
     if response.status_code == 200:
@@ -1,18 +1,93 @@
+import argparse
+import os
+import time
 import boto3
+from botocore.config import Config
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-from DatabaseUtility.playerUtility import compileUncachedStats, getAllPlayerTagsSet
+from DatabaseUtility.playerUtility import DEFAULT_SCAN_SEGMENTS, compileUncachedStats, getAllPlayerTagsSet
+from DatabaseUtility.trieUtility import MAX_PARENT_LINK_WORKERS
 
 
 DYNAMODB_REGION = 'us-west-1'
-dynamodb = boto3.client("dynamodb", region_name=DYNAMODB_REGION)
+
+DEFAULT_THREADS_PER_SHARD = 8
+SHARD_PROGRESS_INTERVAL = 100
+
+# Each of the numThreads compiles also writes up to MAX_PARENT_LINK_WORKERS trie nodes at once,
+# and the player listing scans DEFAULT_SCAN_SEGMENTS segments at once
+def getDynamoDBClient(numThreads):
+    maxPoolConnections = max(10, DEFAULT_SCAN_SEGMENTS, numThreads * (1 + MAX_PARENT_LINK_WORKERS))
+    return boto3.client("dynamodb", region_name=DYNAMODB_REGION, config=Config(max_pool_connections=maxPoolConnections))
+
+# Runs in its own process: compiles one shard of players with a pool of I/O threads
+def compileShard(shardIndex, playerTags, numThreads):
+    dynamodb = getDynamoDBClient(numThreads)
+
+    startTime = time.monotonic()
+    numGamesCompiled = 0
+    numPlayersFailed = 0
+
+    def compilePlayer(playerTag):
+        try:
+            return compileUncachedStats(playerTag, dynamodb)
+        except Exception as e:
+            print(f"{playerTag}: compile failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=numThreads) as executor:
+        futures = [executor.submit(compilePlayer, playerTag) for playerTag in playerTags]
+
+        for numCompleted, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            if result is None:
+                numPlayersFailed += 1
+            else:
+                numGamesCompiled += result
+
+            if numCompleted % SHARD_PROGRESS_INTERVAL == 0:
+                print(f"Shard {shardIndex}: {numCompleted}/{len(playerTags)} players, {time.monotonic() - startTime:.1f}s")
+
+    return {
+        "shardIndex": shardIndex,
+        "numPlayers": len(playerTags),
+        "numPlayersFailed": numPlayersFailed,
+        "numGamesCompiled": numGamesCompiled,
+        "elapsedSeconds": time.monotonic() - startTime
+    }
+
+def compileAllShards(playerTags, numProcesses, numThreads):
+    # Sorting first keeps shard membership stable between runs
+    sortedTags = sorted(playerTags)
+    shards = [sortedTags[i::numProcesses] for i in range(numProcesses)]
+
+    if numProcesses <= 1:
+        return [compileShard(0, shards[0], numThreads)]
+
+    with ProcessPoolExecutor(max_workers=numProcesses) as executor:
+        futures = [executor.submit(compileShard, i, shard, numThreads) for i, shard in enumerate(shards)]
+        return sorted((future.result() for future in futures), key=lambda summary: summary["shardIndex"])
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS_PER_SHARD, help="Concurrent player compiles per process")
+    args = parser.parse_args()
+
     print("Beginning Compilation at " + str(datetime.now()))
+    startTime = time.monotonic()
 
+    dynamodb = getDynamoDBClient(args.threads)
+    # Every player, not just recently active ones: a player's uncached games can outlast their activity window,
+    # e.g. after a failed compile or when they stop playing right after the tracker saved their games
     playerTagSet = getAllPlayerTagsSet(dynamodb)
 
-    for player in playerTagSet:
-        compileUncachedStats(player, dynamodb)
+    shardSummaries = compileAllShards(playerTagSet, max(1, args.processes), max(1, args.threads))
+
+    print()
+    for summary in shardSummaries:
+        print(f"Shard {summary['shardIndex']}: {summary['numPlayers']} players ({summary['numPlayersFailed']} failed), {summary['numGamesCompiled']} games in {summary['elapsedSeconds']:.1f}s")
 
-    print()
\ No newline at end of file
+    totalGames = sum(summary["numGamesCompiled"] for summary in shardSummaries)
+    print(f"Compiled {totalGames} games for {len(playerTagSet)} players in {time.monotonic() - startTime:.1f}s")
@@ -1,24 +1,58 @@
 import json
-import boto3
-from DatabaseUtility.accountVerificationUtility import handleAccountVerificationRequest, handleLogin, verifyToken
-from DatabaseUtility.brawlerListUtility import getCachedBrawlerList
-from DatabaseUtility.gamesUtility import queryGames
-from DatabaseUtility.itemUtility import decimalAndSetSerializer, deserializeDynamoDbItem
-from DatabaseUtility.playerUtility import beginTrackingPlayer, compileUncachedStats, getPlayerInfo, getPlayerOverview, updateStatsLastAccessed
-from DatabaseUtility.trieUtility import BRAWL_TRIE_TABLE, fetchTrieData, fetchRecentTrieData
+import os
+from responseUtility import buildJsonResponse, buildNotModifiedResponse, getETag, requestMatchesETag
+
+# Cold starts: boto3, requests, passlib and jwt are slow to import, and most routes only need some of them
+# Each route imports its own modules, and the DynamoDB client is created on first use and reused while the container is warm
 
 CORS_HEADERS = {
   'Content-Type': 'application/json',
   'Access-Control-Allow-Origin': '*',
   'Access-Control-Allow-Methods': 'OPTIONS,POST',
-  'Access-Control-Allow-Headers': 'Content-Type',
+  'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+  'Access-Control-Expose-Headers': 'ETag',
 }
 
-# Initialize DynamoDB client
 DYNAMODB_REGION = 'us-west-1'
-dynamodb = boto3.client("dynamodb", region_name=DYNAMODB_REGION)
+
+# Can be pointed at DynamoDB Local, e.g. for Benchmarks/coldStartBenchmark.py
+DYNAMODB_ENDPOINT_URL = os.environ.get("DYNAMODB_ENDPOINT_URL")
+
+dynamodbClient = None
+trieCache = None
+
+def getDynamoDBClient():
+    global dynamodbClient
+    if dynamodbClient is None:
+        import boto3
+        dynamodbClient = boto3.client("dynamodb", region_name=DYNAMODB_REGION, endpoint_url=DYNAMODB_ENDPOINT_URL)
+    return dynamodbClient
+
+# Lives as long as the container, so warm invocations share it
+def getTrieCache():
+    global trieCache
+    if trieCache is None:
+        from DatabaseUtility.trieCacheUtility import TrieReadCache
+        trieCache = TrieReadCache()
+    return trieCache
+
+# Stats are cumulative for the container, and are logged after every invocation that has created the cache
+def logTrieCacheStats():
+    if trieCache is not None:
+        print(f"Trie cache: {json.dumps(trieCache.getStats())}")
 
 def lambda_handler(event, context):
+    try:
+        return handleEvent(event, context)
+    finally:
+        logTrieCacheStats()
+
+def handleEvent(event, context):
+
+    # Background jobs delivered by an SQS event source mapping
+    if 'Records' in event:
+        from DatabaseUtility.workQueueUtility import handleWorkQueueRecords
+        return handleWorkQueueRecords(event['Records'], getDynamoDBClient())
 
     # Check for browser visit
     if 'body' not in event or event['body'] is None:
@@ -38,28 +72,22 @@ def lambda_handler(event, context):
     try:
         eventBody = json.loads(event['body'])
     except Exception:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Invalid JSON body"}),
-            "headers": CORS_HEADERS
-        }
+        return buildJsonResponse(400, {"error": "Invalid JSON body"}, event, CORS_HEADERS)
+
+    dynamodb = getDynamoDBClient()
     
     if eventBody['type'] == "getBrawlerList":
+        from DatabaseUtility.brawlerListUtility import getCachedBrawlerList
+
         cachedBrawlerList = getCachedBrawlerList(dynamodb)
 
         if cachedBrawlerList is None:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'message': 'Failed to fetch brawler list.'}),
-                'headers': CORS_HEADERS,
-            }
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'brawlers': cachedBrawlerList}),
-            'headers': CORS_HEADERS
-        }
+            return buildJsonResponse(500, {'message': 'Failed to fetch brawler list.'}, event, CORS_HEADERS)
+        return buildJsonResponse(200, {'brawlers': cachedBrawlerList}, event, CORS_HEADERS)
 
     elif eventBody['type'] == "getRecentGlobalScanInfo":
+        from DatabaseUtility.itemUtility import deserializeDynamoDbItem
+        from DatabaseUtility.trieUtility import BRAWL_TRIE_TABLE
 
         response = dynamodb.query(
             TableName=BRAWL_TRIE_TABLE,
@@ -73,59 +101,48 @@ def lambda_handler(event, context):
         )
 
         if len(response['Items']) == 0:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'message': 'Failed to fetch global stats object.'}),
-                'headers': CORS_HEADERS,
-            }
+            return buildJsonResponse(500, {'message': 'Failed to fetch global stats object.'}, event, CORS_HEADERS)
         
         rootGlobalStatObject = response['Items'][0]
         deserializedItem = deserializeDynamoDbItem(rootGlobalStatObject)
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps(deserializedItem, default=lambda x: decimalAndSetSerializer(x)),
-            'headers': CORS_HEADERS
-        }
+        return buildJsonResponse(200, deserializedItem, event, CORS_HEADERS)
+
+    elif eventBody['type'] == 'batch':
+        from DatabaseUtility.batchQueryUtility import MAX_BATCH_QUERIES, resolveBatchQueries
+
+        queries = eventBody.get('queries')
+        if not isinstance(queries, list) or len(queries) == 0 or len(queries) > MAX_BATCH_QUERIES:
+            return buildJsonResponse(400, {'message': f'queries must be a list of 1 to {MAX_BATCH_QUERIES} queries'}, event, CORS_HEADERS)
+
+        return buildJsonResponse(200, {'results': resolveBatchQueries(queries, dynamodb)}, event, CORS_HEADERS)
 
     elif eventBody['playerTag'] == "":
-        return {
-            'statusCode': 502,
-            'body': json.dumps({'message': 'Invalid playerTag'}),
-            'headers': CORS_HEADERS,
-        }
+        return buildJsonResponse(502, {'message': 'Invalid playerTag'}, event, CORS_HEADERS)
 
     elif eventBody['type'] == 'queryGames':
+        from DatabaseUtility.accountVerificationUtility import verifyToken
+        from DatabaseUtility.gamesUtility import queryGames
+
         playerTag = eventBody['playerTag'].upper()
         targetDatetime = eventBody['datetime']
         numBefore = eventBody.get('numBefore', 0)
         numAfter = eventBody.get('numAfter', 0)
 
         if not "token" in eventBody:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({ "error": "Missing token" }),
-                'headers': CORS_HEADERS
-            }
+            return buildJsonResponse(400, { "error": "Missing token" }, event, CORS_HEADERS)
         
         token = eventBody['token']
         verificationResult = verifyToken(token)
         if not verificationResult or verificationResult != playerTag:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({ "error": "Invalid or expired token" }),
-                'headers': CORS_HEADERS
-            }
+            return buildJsonResponse(401, { "error": "Invalid or expired token" }, event, CORS_HEADERS)
 
         games = queryGames(playerTag, targetDatetime, numBefore, numAfter, dynamodb)
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps(games, default=lambda x: decimalAndSetSerializer(x)),
-            'headers': CORS_HEADERS
-        }
+        return buildJsonResponse(200, games, event, CORS_HEADERS)
 
     elif eventBody['type'] == 'getTrieData':
+        from DatabaseUtility.trieCacheUtility import fetchTrieDataCached, getTrieVersionCached
 
         requestedType = eventBody.get('requestType')
         requestedMap = eventBody.get('requestMap')
@@ -139,8 +156,31 @@ def lambda_handler(event, context):
 
         isGlobal = eventBody['isGlobal']
 
+        # Freshness mode only applies to a player's "overall" trie, the one their uncached games are compiled into
+        fresh = eventBody.get('fresh', False) and not isGlobal and filterID == "overall"
+
         try:
-            fetchResult = fetchTrieData(
+            # Unchanged since the client's copy if the trie's version is the same (and, when fresh, so are the uncached games)
+            trieVersion = getTrieVersionCached(getTrieCache(), basePath, filterID, dynamodb)
+            etagParts = ["getTrieData", trieVersion, basePath, filterID, requestedType, requestedMode, requestedMap, requestedBrawler, targetAttribute, isGlobal]
+
+            if fresh:
+                from DatabaseUtility.freshnessUtility import applyFreshDeltasToTrieData, getFreshDeltas
+
+                pathIDUpdates, freshness = getFreshDeltas(basePath, dynamodb)
+
+                # Which games a partial merge includes depends on timing, so it has no ETag
+                if freshness["complete"]:
+                    etagParts += [freshness["compileCheckpoint"], freshness["latestBattleTime"], freshness["numGames"]]
+                else:
+                    etagParts = None
+
+            etag = None if etagParts is None else getETag(*etagParts)
+            if etag is not None and requestMatchesETag(event, eventBody, etag):
+                return buildNotModifiedResponse(etag, CORS_HEADERS)
+
+            fetchResult = fetchTrieDataCached(
+                cache=getTrieCache(),
                 basePath=basePath,
                 filterID=filterID,
                 type=requestedType,
@@ -149,22 +189,22 @@ def lambda_handler(event, context):
                 brawler=requestedBrawler,
                 targetAttribute=targetAttribute,
                 dynamodb=dynamodb,
-                isGlobal=isGlobal
+                isGlobal=isGlobal,
+                trieVersion=trieVersion
             )
+
+            if fresh:
+                fetchResult = applyFreshDeltasToTrieData(fetchResult, pathIDUpdates, basePath, requestedType, requestedMode, requestedMap, requestedBrawler, targetAttribute)
+                fetchResult = {**fetchResult, "fresh": freshness}
         except Exception as e:
-            return {
-                'statusCode': 502,
-                'body': json.dumps({'message': f'Error fetching trie data: {str(e)}'}),
-                'headers': CORS_HEADERS,
-            }
+            return buildJsonResponse(502, {'message': f'Error fetching trie data: {str(e)}'}, event, CORS_HEADERS)
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps(fetchResult, default=lambda x: decimalAndSetSerializer(x)),
-            'headers': CORS_HEADERS
-        }
+        return buildJsonResponse(200, fetchResult, event, CORS_HEADERS if etag is None else {**CORS_HEADERS, "ETag": etag})
 
     elif eventBody['type'] == 'getRecentTrieData':
+        from DatabaseUtility.trieCacheUtility import fetchRecentTrieDataCached
+        from DatabaseUtility.trieUtility import getRecentTrieVersions
+
         requestedType = eventBody.get('requestType')
         requestedMap = eventBody.get('requestMap')
         requestedMode = eventBody.get('requestMode')
@@ -178,107 +218,107 @@ def lambda_handler(event, context):
 
         numItems = min(int(eventBody.get('numItems', 1)), 20)
 
-        fetchResult = fetchRecentTrieData(
-            basePath=basePath,
-            numItems=numItems,
-            isGlobal=isGlobal,
-            type=requestedType,
-            mode=requestedMode,
-            map=requestedMap,
-            brawler=requestedBrawler,
-            targetAttribute=targetAttribute,
-            dynamodb=dynamodb
-        )
+        # The recent filterIDs and their versions in one query
+        try:
+            trieVersions = getRecentTrieVersions(basePath, numItems, dynamodb)
+        except Exception as e:
+            return buildJsonResponse(502, {'message': 'Error fetching trie data over time'}, event, CORS_HEADERS)
 
-        if fetchResult is None:
-            return {
-                'statusCode': 502,
-                'body': json.dumps({'message': 'Error fetching trie data over time'}),
-                'headers': CORS_HEADERS,
-            }
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps(fetchResult, default=lambda x: decimalAndSetSerializer(x)),
-            'headers': CORS_HEADERS
-        }
+        etag = getETag("getRecentTrieData", trieVersions, basePath, numItems, requestedType, requestedMode, requestedMap, requestedBrawler, targetAttribute, isGlobal)
+        if requestMatchesETag(event, eventBody, etag):
+            return buildNotModifiedResponse(etag, CORS_HEADERS)
+
+        try:
+            fetchResult = fetchRecentTrieDataCached(
+                cache=getTrieCache(),
+                basePath=basePath,
+                numItems=numItems,
+                isGlobal=isGlobal,
+                type=requestedType,
+                mode=requestedMode,
+                map=requestedMap,
+                brawler=requestedBrawler,
+                targetAttribute=targetAttribute,
+                dynamodb=dynamodb,
+                trieVersions=trieVersions
+            )
+        except ValueError as e:
+            return buildJsonResponse(400, {'message': str(e)}, event, CORS_HEADERS)
+        except Exception as e:
+            print(f"Error fetching trie data over time: {e}")
+            return buildJsonResponse(502, {'message': 'Error fetching trie data over time'}, event, CORS_HEADERS)
+
+        return buildJsonResponse(200, fetchResult, event, {**CORS_HEADERS, "ETag": etag})
         
     elif eventBody['type'] == 'getPlayerInfo':
+        from DatabaseUtility.playerUtility import beginOnboardingPlayer, getOnboardingStatusFromItem, getPlayerInfo, updateStatsLastAccessed
 
         playerTag = eventBody['playerTag'].upper()
 
         #Standard request 1
         response = getPlayerInfo(playerTag, dynamodb)
 
-        #Begin tracking this player
-        if len(response['Items']) == 0:
-            trackingResult = beginTrackingPlayer(playerTag, dynamodb)
-
-            if not trackingResult:
-                return {
-                    'statusCode': 502,
-                    'body': json.dumps({'message': "Tracking Initialization Failed: Player Doesn't Exist"}),
-                    'headers': CORS_HEADERS,
-                }
-            
-            # Always compile new games for new players
-            compileUncachedStats(playerTag, dynamodb)
-
-            response = getPlayerInfo(playerTag, dynamodb)
-
-            # If it is still zero, return error:
-            if len(response['Items']) == 0:
-                return {
-                    'statusCode': 502,
-                    'body': json.dumps({'message': 'Error Adding Player'}),
-                    'headers': CORS_HEADERS,
-                }
+        if len(response['Items']) > 0:
+            playerItem = response['Items'][0]
+        else:
+            # Begin tracking this player; their games are saved and compiled in the background
+            playerItem = beginOnboardingPlayer(playerTag, dynamodb)
+
+            if playerItem is None:
+                return buildJsonResponse(502, {'message': "Tracking Initialization Failed: Player Doesn't Exist"}, event, CORS_HEADERS)
         
-        #Standard request 2
-        updateStatsLastAccessed(playerTag, dynamodb)
+        #Standard request 2, skipped when the item was accessed recently
+        updateStatsLastAccessed(playerTag, dynamodb, playerItem.get("statsLastAccessed", {}).get("S"))
 
         resultBody = {
-            "playerInfo": {"name": response["Items"][0]["username"]["S"]},
+            "playerInfo": {"name": playerItem["username"]["S"]},
         }
 
-        resultBody["verified"] = "password" in response["Items"][0]
+        resultBody["verified"] = "password" in playerItem
+        resultBody["onboardingStatus"] = getOnboardingStatusFromItem(playerItem)
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps(resultBody),
-            'headers': CORS_HEADERS
-        }
+        return buildJsonResponse(200, resultBody, event, CORS_HEADERS)
+
+    elif eventBody['type'] == 'getOnboardingStatus':
+        from DatabaseUtility.playerUtility import getOnboardingStatus
+
+        onboardingStatus = getOnboardingStatus(eventBody['playerTag'].upper(), dynamodb)
+
+        if onboardingStatus is None:
+            return buildJsonResponse(502, {'message': 'Player not found'}, event, CORS_HEADERS)
+
+        return buildJsonResponse(200, {'onboardingStatus': onboardingStatus}, event, CORS_HEADERS)
     
     elif eventBody['type'] == 'getPlayerOverview':
+        from DatabaseUtility.playerUtility import getPlayerOverview
+
         playerTag = eventBody["playerTag"].upper()
 
         overview = getPlayerOverview(playerTag, dynamodb)
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps(overview, default=lambda x: decimalAndSetSerializer(x)),
-            'headers': CORS_HEADERS
-        }
+        # Favorites including the games the compiler hasn't reached yet
+        if eventBody.get('fresh', False):
+            from DatabaseUtility.freshnessUtility import applyFreshDeltasToOverview, getFreshDeadline, getFreshDeltas
+
+            # Reading the games and the favorites listings share one budget
+            deadline = getFreshDeadline()
+            pathIDUpdates, freshness = getFreshDeltas(playerTag, dynamodb, deadline=deadline)
+            overview, freshness = applyFreshDeltasToOverview(overview, playerTag, pathIDUpdates, freshness, getTrieCache(), deadline, dynamodb)
+            overview = {**overview, "fresh": freshness}
+
+        return buildJsonResponse(200, overview, event, CORS_HEADERS)
 
     elif eventBody['type'] == 'verifyAccount':
+        from DatabaseUtility.accountVerificationUtility import handleAccountVerificationRequest
+
         verificationResult = handleAccountVerificationRequest(eventBody, dynamodb)
-        return {
-            'statusCode': 200,
-            'body': json.dumps(verificationResult),
-            'headers': CORS_HEADERS
-        }
+        return buildJsonResponse(200, verificationResult, event, CORS_HEADERS)
 
     elif eventBody['type'] == 'verifyPassword':
+        from DatabaseUtility.accountVerificationUtility import handleLogin
+
         passwordVerificationResult = handleLogin(eventBody['playerTag'].upper(), eventBody['password'], dynamodb)
-        return {
-            'statusCode': 200,
-            'body': json.dumps(passwordVerificationResult),
-            'headers': CORS_HEADERS
-        }
+        return buildJsonResponse(200, passwordVerificationResult, event, CORS_HEADERS)
 
     else:
-        return {
-            'statusCode': 400,
-            'body': json.dumps({'message': 'Invalid request type'}),
-            'headers': CORS_HEADERS,
-        }
\ No newline at end of file
+        return buildJsonResponse(400, {'message': 'Invalid request type'}, event, CORS_HEADERS)
\ No newline at end of file
@@ -0,0 +1,124 @@
+import base64
+import gzip
+import hashlib
+import json
+from DatabaseUtility.itemUtility import decimalAndSetSerializer
+
+# Encodes Lambda responses: compact JSON, compressed when the client accepts it and the body is large enough to benefit
+# Lambda proxy integrations and function URLs pass binary bodies as base64 with isBase64Encoded set
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Small bodies gain little from compression and cost the client an extra decode
+RESPONSE_COMPRESSION_THRESHOLD_BYTES = 2048
+
+GZIP_COMPRESSION_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def encodeJsonBody(body):
+    # The C encoder handles everything except the sets left in trie items, which go through decimalAndSetSerializer
+    return json.dumps(body, separators=(",", ":"), default=decimalAndSetSerializer)
+
+def getRequestHeader(event, headerName):
+    headers = event.get("headers") or {}
+    for key, value in headers.items():
+        if key.lower() == headerName:
+            return value
+    return None
+
+# (accepted, refused) encodings from the request's Accept-Encoding; encodings with q=0 are refused
+def getAcceptedEncodings(event):
+    acceptEncoding = getRequestHeader(event, "accept-encoding")
+    if not acceptEncoding:
+        return set(), set()
+
+    acceptedEncodings = set()
+    refusedEncodings = set()
+    for part in acceptEncoding.split(","):
+        encoding, *parameters = [piece.strip() for piece in part.split(";")]
+
+        quality = 1.0
+        for parameter in parameters:
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+
+        if not encoding:
+            continue
+        if quality > 0:
+            acceptedEncodings.add(encoding.lower())
+        else:
+            refusedEncodings.add(encoding.lower())
+
+    return acceptedEncodings - refusedEncodings, refusedEncodings
+
+# "*" covers any encoding that isn't refused by name
+def isEncodingAccepted(encoding, acceptedEncodings, refusedEncodings):
+    if encoding in acceptedEncodings:
+        return True
+    return "*" in acceptedEncodings and encoding not in refusedEncodings
+
+# Brotli when it is installed and accepted, otherwise gzip, otherwise None
+def chooseContentEncoding(event):
+    acceptedEncodings, refusedEncodings = getAcceptedEncodings(event)
+
+    if brotli is not None and "br" in acceptedEncodings:
+        return "br"
+    if isEncodingAccepted("gzip", acceptedEncodings, refusedEncodings):
+        return "gzip"
+    return None
+
+def compressBody(bodyBytes, contentEncoding):
+    if contentEncoding == "br":
+        return brotli.compress(bodyBytes, quality=BROTLI_QUALITY)
+    return gzip.compress(bodyBytes, compresslevel=GZIP_COMPRESSION_LEVEL, mtime=0)
+
+# Every response varies by Accept-Encoding, since the same request can be answered compressed or not
+def buildJsonResponse(statusCode, body, event, headers):
+    encodedBody = encodeJsonBody(body)
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    response = {
+        "statusCode": statusCode,
+        "body": encodedBody,
+        "headers": headers
+    }
+
+    contentEncoding = chooseContentEncoding(event)
+    if contentEncoding is None:
+        return response
+
+    bodyBytes = encodedBody.encode("utf-8")
+    if len(bodyBytes) < RESPONSE_COMPRESSION_THRESHOLD_BYTES:
+        return response
+
+    response["body"] = base64.b64encode(compressBody(bodyBytes, contentEncoding)).decode("ascii")
+    response["isBase64Encoded"] = True
+    response["headers"] = {**headers, "Content-Encoding": contentEncoding}
+    return response
+
+# ETags identify a response by the trie versions it was read at and the request it answers
+# They are weak, since compressed and uncompressed bodies of the same response share one
+def getETag(*parts):
+    return 'W/"' + hashlib.sha1(json.dumps(parts, default=decimalAndSetSerializer).encode("utf-8")).hexdigest()[:24] + '"'
+
+# If-None-Match can be sent as a header or, for clients that can't set headers, as ifNoneMatch in the body
+def requestMatchesETag(event, eventBody, etag):
+    ifNoneMatch = getRequestHeader(event, "if-none-match") or eventBody.get("ifNoneMatch")
+    if not ifNoneMatch:
+        return False
+
+    # If-None-Match uses the weak comparison, which ignores W/ on either side
+    etag = etag.removeprefix("W/")
+    return etag in [candidate.strip().removeprefix("W/") for candidate in ifNoneMatch.split(",")]
+
+def buildNotModifiedResponse(etag, headers):
+    return {
+        "statusCode": 304,
+        "body": "",
+        "headers": {**headers, "ETag": etag, "Vary": "Accept-Encoding"}
+    }
@@ -0,0 +1,376 @@
+import copy
+import re
+import threading
+from decimal import Decimal
+
+# In-memory stand-in for the parts of the boto3 DynamoDB client this repository uses
+# Items are kept in wire format ({"S": ...}, {"N": ...}, {"M": ...}) and the expression subset the modules write is evaluated:
+# SET/ADD/REMOVE/DELETE updates, if_not_exists, comparisons, attribute_(not_)exists, AND/OR/NOT, BETWEEN key conditions
+# Scans ignore segments, and eventually consistent reads are always consistent
+
+TABLE_KEYS = {
+    "BrawlStarsTrieData3": ("pathID", "filterID"),
+    "BrawlStarsPlayersInfo": ("playerTag", None),
+    "BrawlStarsGames": ("playerTag", "battleTime"),
+    "BrawlStarsUncachedGames": ("playerTag", "battleTime"),
+    "BrawlStarsBrawlers": ("id", None),
+}
+
+class StubClientError(Exception):
+    def __init__(self, code, message="", extraResponse=None):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}, **(extraResponse or {})}
+
+class StubExceptions:
+    class ConditionalCheckFailedException(StubClientError):
+        def __init__(self):
+            super().__init__("ConditionalCheckFailedException", "The conditional request failed")
+
+    class TransactionCanceledException(StubClientError):
+        def __init__(self, cancellationReasons):
+            super().__init__("TransactionCanceledException", "Transaction cancelled", {"CancellationReasons": cancellationReasons})
+
+    class ValidationException(StubClientError):
+        def __init__(self, message=""):
+            super().__init__("ValidationException", message)
+
+def formatNumber(value):
+    return str(int(value)) if value == value.to_integral_value() else str(value)
+
+class StubDynamoDB:
+    exceptions = StubExceptions
+
+    def __init__(self):
+        self.tables = {name: {} for name in TABLE_KEYS}
+        self.calls = {}
+        self.lock = threading.RLock()
+
+    def countCall(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def getKey(self, tableName, item):
+        partitionKey, sortKey = TABLE_KEYS[tableName]
+        return (item[partitionKey]["S"], item[sortKey]["S"] if sortKey else None)
+
+    def getItem(self, tableName, key):
+        return self.tables[tableName].get(self.getKey(tableName, key))
+
+    # Expressions
+
+    def parsePath(self, expression, names):
+        parts = []
+        for part in expression.strip().split("."):
+            parts.append(names.get(part, part) if part.startswith("#") else part)
+        return parts
+
+    def resolvePath(self, item, parts):
+        value = {"M": item}
+        for part in parts:
+            if "M" not in value or part not in value["M"]:
+                return None
+            value = value["M"][part]
+        return value
+
+    # Like DynamoDB, every map above the target must already exist
+    def resolveParent(self, item, parts):
+        value = {"M": item}
+        for part in parts[:-1]:
+            if "M" not in value or part not in value["M"]:
+                raise StubExceptions.ValidationException("The document path provided in the update expression is invalid for update")
+            value = value["M"][part]
+        return value["M"]
+
+    def evaluateOperand(self, expression, item, values, names):
+        expression = expression.strip()
+
+        match = re.match(r"if_not_exists\((.*?),\s*(.*)\)$", expression)
+        if match:
+            current = self.resolvePath(item, self.parsePath(match.group(1), names))
+            return current if current is not None else self.evaluateOperand(match.group(2), item, values, names)
+
+        match = re.match(r"(.+?)\s+([+-])\s+(.+)$", expression)
+        if match:
+            left = self.evaluateOperand(match.group(1), item, values, names)
+            right = self.evaluateOperand(match.group(3), item, values, names)
+            if left is None or right is None:
+                raise StubExceptions.ValidationException("An operand in the update expression has an incorrect data type")
+            total = Decimal(left["N"]) + Decimal(right["N"]) if match.group(2) == "+" else Decimal(left["N"]) - Decimal(right["N"])
+            return {"N": formatNumber(total)}
+
+        if expression.startswith(":"):
+            return copy.deepcopy(values[expression])
+        return copy.deepcopy(self.resolvePath(item, self.parsePath(expression, names)))
+
+    def splitTopLevel(self, expression, separator):
+        parts, depth, start, i = [], 0, 0, 0
+        while i < len(expression):
+            if expression[i] == "(":
+                depth += 1
+            elif expression[i] == ")":
+                depth -= 1
+            elif depth == 0 and expression.startswith(separator, i):
+                parts.append(expression[start:i])
+                i += len(separator)
+                start = i
+                continue
+            i += 1
+        parts.append(expression[start:])
+        return parts
+
+    def isWrapped(self, expression):
+        if not (expression.startswith("(") and expression.endswith(")")):
+            return False
+        depth = 0
+        for character in expression[1:-1]:
+            depth += character == "("
+            depth -= character == ")"
+            if depth < 0:
+                return False
+        return depth == 0
+
+    def evaluateCondition(self, item, condition, values, names):
+        condition = condition.strip()
+        while self.isWrapped(condition):
+            condition = condition[1:-1].strip()
+
+        for operator in (" OR ", " AND "):
+            parts = self.splitTopLevel(condition, operator)
+            if len(parts) > 1:
+                results = [self.evaluateCondition(item, part, values, names) for part in parts]
+                return any(results) if operator == " OR " else all(results)
+
+        if condition.startswith("NOT "):
+            return not self.evaluateCondition(item, condition[4:], values, names)
+
+        match = re.match(r"attribute_(not_)?exists\((.*)\)$", condition)
+        if match:
+            exists = item is not None and self.resolvePath(item, self.parsePath(match.group(2), names)) is not None
+            return exists != bool(match.group(1))
+
+        match = re.match(r"(.+?)\s*(<=|>=|<>|<|>|=)\s*(.+)$", condition)
+        left = self.evaluateOperand(match.group(1), item or {}, values, names)
+        right = self.evaluateOperand(match.group(3), item or {}, values, names)
+        if left is None or right is None:
+            return False
+
+        (leftType, leftValue), = left.items()
+        (_, rightValue), = right.items()
+        if leftType == "N":
+            leftValue, rightValue = Decimal(leftValue), Decimal(rightValue)
+        return {
+            "<": leftValue < rightValue, ">": leftValue > rightValue, "<=": leftValue <= rightValue,
+            ">=": leftValue >= rightValue, "=": leftValue == rightValue, "<>": leftValue != rightValue
+        }[match.group(2)]
+
+    def checkCondition(self, item, condition, values, names):
+        if condition and not self.evaluateCondition(item, condition, values or {}, names or {}):
+            raise StubExceptions.ConditionalCheckFailedException()
+
+    def applyUpdate(self, item, expression, values, names):
+        sections = re.split(r"\b(SET|ADD|REMOVE|DELETE)\b", expression)
+        for action, body in zip(sections[1::2], sections[2::2]):
+            for clause in self.splitTopLevel(body, ","):
+                clause = clause.strip()
+                if not clause:
+                    continue
+
+                if action == "SET":
+                    target, operand = clause.split("=", 1)
+                    parts = self.parsePath(target, names)
+                    value = self.evaluateOperand(operand, item, values, names)
+                    self.resolveParent(item, parts)[parts[-1]] = value
+                    continue
+
+                if action == "REMOVE":
+                    parts = self.parsePath(clause, names)
+                    try:
+                        self.resolveParent(item, parts).pop(parts[-1], None)
+                    except StubExceptions.ValidationException:
+                        pass
+                    continue
+
+                target, operand = clause.split()
+                parts = self.parsePath(target, names)
+                value = values[operand]
+                parent = self.resolveParent(item, parts)
+                current = parent.get(parts[-1])
+
+                if "N" in value:
+                    if action == "ADD":
+                        parent[parts[-1]] = {"N": formatNumber(Decimal(current["N"] if current else 0) + Decimal(value["N"]))}
+                    continue
+
+                (setType, members), = value.items()
+                existing = set(current[setType]) if current else set()
+                if action == "ADD":
+                    parent[parts[-1]] = {setType: sorted(existing | set(members))}
+                elif existing - set(members):
+                    parent[parts[-1]] = {setType: sorted(existing - set(members))}
+                else:
+                    parent.pop(parts[-1], None)
+
+    def project(self, item, projectionExpression, names=None):
+        if not projectionExpression:
+            return copy.deepcopy(item)
+
+        projected = {}
+        for expression in projectionExpression.split(","):
+            parts = self.parsePath(expression, names or {})
+            value = self.resolvePath(item, parts)
+            if value is None:
+                continue
+
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {"M": {}})["M"]
+            target[parts[-1]] = copy.deepcopy(value)
+        return projected
+
+    def getUpdatedItem(self, TableName, Key, UpdateExpression, ExpressionAttributeValues=None, ExpressionAttributeNames=None, ConditionExpression=None, **kwargs):
+        current = self.getItem(TableName, Key)
+        self.checkCondition(current, ConditionExpression, ExpressionAttributeValues, ExpressionAttributeNames)
+
+        item = copy.deepcopy(current) if current is not None else copy.deepcopy(Key)
+        self.applyUpdate(item, UpdateExpression, ExpressionAttributeValues or {}, ExpressionAttributeNames or {})
+        return item
+
+    # Client methods
+
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, ConsistentRead=False):
+        self.countCall("get_item")
+        with self.lock:
+            item = self.getItem(TableName, Key)
+            return {"Item": self.project(item, ProjectionExpression, ExpressionAttributeNames)} if item is not None else {}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeValues=None, ExpressionAttributeNames=None):
+        self.countCall("put_item")
+        with self.lock:
+            self.checkCondition(self.getItem(TableName, Item), ConditionExpression, ExpressionAttributeValues, ExpressionAttributeNames)
+            self.tables[TableName][self.getKey(TableName, Item)] = copy.deepcopy(Item)
+        return {}
+
+    def update_item(self, **kwargs):
+        self.countCall("update_item")
+        with self.lock:
+            item = self.getUpdatedItem(**kwargs)
+            self.tables[kwargs["TableName"]][self.getKey(kwargs["TableName"], kwargs["Key"])] = item
+            return {"Attributes": copy.deepcopy(item)} if kwargs.get("ReturnValues") else {}
+
+    def delete_item(self, TableName, Key):
+        self.countCall("delete_item")
+        with self.lock:
+            self.tables[TableName].pop(self.getKey(TableName, Key), None)
+        return {}
+
+    # Any failed condition or invalid update cancels every action, with a reason per action
+    def transact_write_items(self, TransactItems, **kwargs):
+        self.countCall("transact_write_items")
+        assert len(TransactItems) <= 100
+
+        with self.lock:
+            staged = []
+            cancellationReasons = []
+            for transactItem in TransactItems:
+                (action, request), = transactItem.items()
+                try:
+                    if action == "Update":
+                        staged.append((request["TableName"], request["Key"], self.getUpdatedItem(**request)))
+                    elif action == "Put":
+                        current = self.getItem(request["TableName"], request["Item"])
+                        self.checkCondition(current, request.get("ConditionExpression"), request.get("ExpressionAttributeValues"), request.get("ExpressionAttributeNames"))
+                        staged.append((request["TableName"], request["Item"], copy.deepcopy(request["Item"])))
+                    else:
+                        raise NotImplementedError(action)
+                    cancellationReasons.append({"Code": "None"})
+                except StubExceptions.ConditionalCheckFailedException:
+                    cancellationReasons.append({"Code": "ConditionalCheckFailed"})
+                except StubExceptions.ValidationException as e:
+                    cancellationReasons.append({"Code": "ValidationError", "Message": str(e)})
+
+            if any(reason["Code"] != "None" for reason in cancellationReasons):
+                raise StubExceptions.TransactionCanceledException(cancellationReasons)
+
+            for tableName, key, item in staged:
+                self.tables[tableName][self.getKey(tableName, key)] = item
+        return {}
+
+    def batch_get_item(self, RequestItems):
+        self.countCall("batch_get_item")
+        assert sum(len(request["Keys"]) for request in RequestItems.values()) <= 100
+
+        responses = {}
+        with self.lock:
+            for tableName, request in RequestItems.items():
+                items = [self.getItem(tableName, key) for key in request["Keys"]]
+                responses[tableName] = [
+                    self.project(item, request.get("ProjectionExpression"), request.get("ExpressionAttributeNames"))
+                    for item in items if item is not None
+                ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems):
+        self.countCall("batch_write_item")
+        assert sum(len(requests) for requests in RequestItems.values()) <= 25
+
+        with self.lock:
+            for tableName, requests in RequestItems.items():
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        self.tables[tableName][self.getKey(tableName, item)] = copy.deepcopy(item)
+                    else:
+                        self.tables[tableName].pop(self.getKey(tableName, request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
+
+    def query(self, TableName, KeyConditionExpression, ExpressionAttributeValues, ScanIndexForward=True, Limit=None,
+              ProjectionExpression=None, ExclusiveStartKey=None, IndexName=None, ExpressionAttributeNames=None, ConsistentRead=False, Select=None):
+        self.countCall("query")
+        names = ExpressionAttributeNames or {}
+
+        # "a = :a AND b BETWEEN :x AND :y" or "a = :a AND b <op> :b"
+        match = re.match(r"\s*(#?\w+)\s*=\s*(:\w+)(?:\s+AND\s+(#?\w+)\s+(?:BETWEEN\s+(:\w+)\s+AND\s+(:\w+)|(<=|>=|<|>|=)\s*(:\w+)))?\s*$", KeyConditionExpression)
+        partitionName = names.get(match.group(1), match.group(1))
+        partitionValue = ExpressionAttributeValues[match.group(2)]
+
+        with self.lock:
+            items = [item for item in self.tables[TableName].values() if item.get(partitionName) == partitionValue]
+
+        sortName = None
+        if match.group(3):
+            sortName = names.get(match.group(3), match.group(3))
+            if match.group(4):
+                low, high = ExpressionAttributeValues[match.group(4)]["S"], ExpressionAttributeValues[match.group(5)]["S"]
+                items = [item for item in items if low <= item[sortName]["S"] <= high]
+            else:
+                bound = ExpressionAttributeValues[match.group(7)]
+                items = [item for item in items if self.evaluateCondition(item, f"{sortName} {match.group(6)} :bound", {":bound": bound}, {})]
+
+        if IndexName is None:
+            sortName = TABLE_KEYS[TableName][1]
+        if sortName:
+            items.sort(key=lambda item: item[sortName]["S"], reverse=not ScanIndexForward)
+
+        keyNames = set(TABLE_KEYS[TableName]) - {None}
+        if ExclusiveStartKey:
+            startKey = {name: value for name, value in ExclusiveStartKey.items() if name in keyNames}
+            for index, item in enumerate(items):
+                if all(item.get(name) == value for name, value in startKey.items()):
+                    items = items[index + 1:]
+                    break
+
+        response = {}
+        if Limit is not None and len(items) > Limit:
+            items = items[:Limit]
+            response["LastEvaluatedKey"] = {name: items[-1][name] for name in keyNames | ({sortName} - {None})}
+
+        response["Count"] = len(items)
+        if Select != "COUNT":
+            response["Items"] = [self.project(item, ProjectionExpression, ExpressionAttributeNames) for item in items]
+        return response
+
+    def scan(self, TableName, ProjectionExpression=None, ExpressionAttributeNames=None, Segment=0, TotalSegments=1, ExclusiveStartKey=None, **kwargs):
+        self.countCall("scan")
+        with self.lock:
+            items = [] if Segment else list(self.tables[TableName].values())
+            return {"Items": [self.project(item, ProjectionExpression, ExpressionAttributeNames) for item in items]}
@@ -0,0 +1,90 @@
+import unittest
+from DatabaseUtility.batchQueryUtility import resolveBatchQueries
+from DatabaseUtility.brawlerListUtility import BRAWLER_LIST_TABLE
+from DatabaseUtility.overviewUtility import PLAYER_INFO_TABLE
+from DatabaseUtility.trieUtility import fetchTrieData
+from dynamoDBStub import StubDynamoDB
+from test_compile import PLAYER_TAG, getGames
+from test_trie import updateTrie
+
+# Resolves batch requests against a stub DynamoDB client
+# Run from the repository root: python -m pytest tests
+
+def getTrieDataQuery(targetAttribute, requestType="regular", requestMode=None):
+    return {
+        "type": "getTrieData",
+        "playerTag": PLAYER_TAG,
+        "filterID": "overall",
+        "isGlobal": False,
+        "requestType": requestType,
+        "requestMode": requestMode,
+        "targetAttribute": targetAttribute
+    }
+
+def getFetchTrieDataResult(query, dynamodb):
+    return fetchTrieData(
+        query["playerTag"], query["filterID"], query["requestType"], query["requestMode"], None, None, query["targetAttribute"], query["isGlobal"], dynamodb
+    )
+
+def sortTrieData(result):
+    return {**result, "trieData": sorted(result["trieData"], key=lambda node: node["pathID"]), "potentialMaps": sorted(result["potentialMaps"])}
+
+# Records every key read with batch_get_item, and fails the requests that include failingTableName
+class RecordingDynamoDB(StubDynamoDB):
+    def __init__(self):
+        super().__init__()
+        self.readKeys = []
+        self.failingTableName = None
+
+    def batch_get_item(self, RequestItems):
+        if self.failingTableName in RequestItems:
+            raise RuntimeError("ProvisionedThroughputExceededException")
+
+        with self.lock:
+            for tableName, request in RequestItems.items():
+                self.readKeys.extend((tableName, tuple(sorted((name, value["S"]) for name, value in key.items()))) for key in request["Keys"])
+        return super().batch_get_item(RequestItems)
+
+class BatchQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.dynamodb = RecordingDynamoDB()
+        updateTrie(getGames(0, 40), self.dynamodb)
+        self.dynamodb.put_item(TableName=BRAWLER_LIST_TABLE, Item={"id": {"S": "main"}, "brawlerNames": {"SS": ["COLT", "SHELLY"]}})
+        self.dynamodb.readKeys.clear()
+
+    def test_shared_keys_are_read_once(self):
+        queries = [
+            getTrieDataQuery("brawler"),
+            getTrieDataQuery("brawler"),
+            getTrieDataQuery("mode"),
+            getTrieDataQuery("type", requestType=None, requestMode="gemGrab"),
+            {"type": "getBrawlerList"},
+            {"type": "getBrawlerList"}
+        ]
+
+        results = resolveBatchQueries(queries, self.dynamodb)
+
+        self.assertEqual([result["statusCode"] for result in results], [200] * len(queries))
+        self.assertEqual(len(self.dynamodb.readKeys), len(set(self.dynamodb.readKeys)))
+
+        for query, result in zip(queries[:4], results):
+            self.assertEqual(sortTrieData(result["body"]), sortTrieData(getFetchTrieDataResult(query, self.dynamodb)))
+        self.assertEqual(sorted(results[4]["body"]["brawlers"]), ["COLT", "SHELLY"])
+
+    def test_failed_reads_only_fail_their_queries(self):
+        self.dynamodb.failingTableName = PLAYER_INFO_TABLE
+        queries = [
+            getTrieDataQuery("brawler"),
+            {"type": "getPlayerOverview", "playerTag": PLAYER_TAG},
+            {"type": "getBrawlerList"},
+            {"type": "unknown"}
+        ]
+
+        results = resolveBatchQueries(queries, self.dynamodb)
+
+        self.assertEqual([result["statusCode"] for result in results], [200, 502, 200, 400])
+        self.assertEqual(sortTrieData(results[0]["body"]), sortTrieData(getFetchTrieDataResult(queries[0], self.dynamodb)))
+        self.assertIn("ProvisionedThroughputExceededException", results[1]["body"]["message"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+import DatabaseUtility.playerUtility as playerUtility
+import DatabaseUtility.trieUtility as trieUtility
+from DatabaseUtility.gamesUtility import GAMES_TABLE_NAME, UNCACHED_GAMES_TABLE_NAME
+from DatabaseUtility.itemUtility import prepareItemForDB
+from dynamoDBStub import StubDynamoDB
+
+# Compiles generated games into the trie of a stub DynamoDB client and compares the result against an uninterrupted compile
+# Run from the repository root: python -m pytest tests
+
+PLAYER_TAG = "ABC"
+FIRST_BATTLE_TIME = datetime(2026, 1, 1)
+BRAWLERS = ["SHELLY", "COLT", "BULL", "BROCK", "RICO", "SPIKE", "CROW", "POCO"]
+MAPS = [("gemGrab", "Hard Rock Mine"), ("brawlBall", "Backyard Bowl"), ("knockout", "Belle's Rock"), ("heist", "Safe Zone")]
+
+def getBattleTime(index):
+    return (FIRST_BATTLE_TIME + timedelta(minutes=5 * index)).strftime("%Y%m%dT%H%M%S.000Z")
+
+def getGame(index):
+    generator = random.Random(index)
+    mode, mapName = generator.choice(MAPS)
+    teams = [
+        [
+            {
+                "tag": f"#{PLAYER_TAG}" if team == 0 and player == 0 else f"#P{index}{team}{player}",
+                "name": "x",
+                "brawler": {"id": 1, "name": generator.choice(BRAWLERS), "power": 11, "trophies": generator.randint(300, 1000)}
+            }
+            for player in range(3)
+        ]
+        for team in range(2)
+    ]
+    return {
+        "battleTime": getBattleTime(index),
+        "event": {"id": 1, "mode": mode, "map": mapName},
+        "battle": {
+            "mode": mode,
+            "type": "ranked",
+            "result": generator.choice(["victory", "defeat", "draw"]),
+            "duration": generator.randint(60, 200),
+            "trophyChange": generator.choice([8, -6, 0]),
+            "starPlayer": {"tag": teams[generator.randint(0, 1)][generator.randint(0, 2)]["tag"]},
+            "teams": teams
+        }
+    }
+
+def getGames(start, end):
+    return [getGame(index) for index in range(start, end)]
+
+def getStubWithPlayer():
+    dynamodb = StubDynamoDB()
+    dynamodb.put_item(TableName=playerUtility.PLAYER_INFO_TABLE, Item={"playerTag": {"S": PLAYER_TAG}, "username": {"S": "x"}})
+    return dynamodb
+
+def getPlayerItem(dynamodb):
+    return dynamodb.getItem(playerUtility.PLAYER_INFO_TABLE, {"playerTag": {"S": PLAYER_TAG}})
+
+def saveUncachedGames(games, dynamodb):
+    for game in games:
+        dynamodb.put_item(TableName=UNCACHED_GAMES_TABLE_NAME, Item=prepareItemForDB({**game, "playerTag": PLAYER_TAG}))
+
+def getBattleTimes(tableName, dynamodb):
+    return sorted(key[1] for key in dynamodb.tables[tableName])
+
+def normalize(value):
+    (valueType, content), = value.items()
+    if valueType == "M":
+        return {key: normalize(item) for key, item in content.items()}
+    if valueType == "N":
+        return float(content)
+    if valueType == "SS":
+        return sorted(content)
+    return content
+
+# Counters and child listings of every trie node, without the bookkeeping that depends on how the compile ran
+def getTrie(dynamodb):
+    return {
+        key: {name: normalize(value) for name, value in item.items() if name in ("resultCompiler", "childrenPathIDs")}
+        for key, item in dynamodb.tables[trieUtility.BRAWL_TRIE_TABLE].items()
+    }
+
+# Fails every trie transaction after the first numTransactions, like a Lambda timing out partway through a compile
+class InterruptedDynamoDB(StubDynamoDB):
+    def __init__(self):
+        super().__init__()
+        self.numTransactionsLeft = None
+
+    def transact_write_items(self, **kwargs):
+        if self.numTransactionsLeft is not None:
+            if self.numTransactionsLeft == 0:
+                raise RuntimeError("Task timed out")
+            self.numTransactionsLeft -= 1
+        return super().transact_write_items(**kwargs)
+
+def getInterruptedStubWithPlayer():
+    dynamodb = InterruptedDynamoDB()
+    dynamodb.put_item(TableName=playerUtility.PLAYER_INFO_TABLE, Item={"playerTag": {"S": PLAYER_TAG}, "username": {"S": "x"}})
+    return dynamodb
+
+class CompileTest(unittest.TestCase):
+    def setUp(self):
+        # Small transactions, so an interrupted update has reached some paths and not others
+        self.originalTransactionSize = trieUtility.TRIE_TRANSACTION_SIZE
+        trieUtility.TRIE_TRANSACTION_SIZE = 10
+
+    def tearDown(self):
+        trieUtility.TRIE_TRANSACTION_SIZE = self.originalTransactionSize
+
+    def compileInterrupted(self, dynamodb, games, numTransactions):
+        dynamodb.numTransactionsLeft = numTransactions
+        with self.assertRaises(RuntimeError):
+            playerUtility.compileStreamedGames(PLAYER_TAG, games, dynamodb)
+        dynamodb.numTransactionsLeft = None
+
+    def test_interrupted_streamed_compile_is_finished_once(self):
+        expected = getStubWithPlayer()
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(0, 60), expected)
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(60, 100), expected)
+
+        dynamodb = getInterruptedStubWithPlayer()
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(0, 60), dynamodb)
+        self.compileInterrupted(dynamodb, getGames(60, 100), 2)
+
+        self.assertEqual(getPlayerItem(dynamodb)["pendingCompileFrom"]["S"], getBattleTime(60))
+        self.assertEqual(getPlayerItem(dynamodb)["pendingCompileCheckpoint"]["S"], getBattleTime(99))
+
+        # The redelivered job finishes the interrupted update and skips its games
+        self.assertEqual(playerUtility.compileStreamedGames(PLAYER_TAG, getGames(60, 100), dynamodb), 0)
+
+        self.assertEqual(getTrie(dynamodb), getTrie(expected))
+        self.assertEqual(getPlayerItem(dynamodb)["compileCheckpoint"]["S"], getBattleTime(99))
+        self.assertNotIn("pendingCompileCheckpoint", getPlayerItem(dynamodb))
+        self.assertNotIn("pendingCompileFrom", getPlayerItem(dynamodb))
+
+    def test_interrupted_compile_of_a_player_without_a_checkpoint_reads_only_its_games(self):
+        # Players compiled before the checkpoint existed have cached games and a trie, but no compileCheckpoint
+        def compileLegacyHistory(dynamodb):
+            playerUtility.compileStreamedGames(PLAYER_TAG, getGames(0, 60), dynamodb)
+            dynamodb.update_item(
+                TableName=playerUtility.PLAYER_INFO_TABLE,
+                Key={"playerTag": {"S": PLAYER_TAG}},
+                UpdateExpression="REMOVE compileCheckpoint"
+            )
+
+        expected = getStubWithPlayer()
+        compileLegacyHistory(expected)
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(60, 100), expected)
+
+        dynamodb = getInterruptedStubWithPlayer()
+        compileLegacyHistory(dynamodb)
+        self.compileInterrupted(dynamodb, getGames(60, 100), 2)
+
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(100, 110), dynamodb)
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(100, 110), expected)
+
+        self.assertEqual(getTrie(dynamodb), getTrie(expected))
+
+class UncachedCompileTest(unittest.TestCase):
+    def setUp(self):
+        # Small pages, chunks and transactions, so a few dozen games span several of each
+        self.originals = (playerUtility.UNCACHED_GAMES_PAGE_SIZE, playerUtility.COMPILE_CHUNK_SIZE, trieUtility.TRIE_TRANSACTION_SIZE)
+        playerUtility.UNCACHED_GAMES_PAGE_SIZE, playerUtility.COMPILE_CHUNK_SIZE, trieUtility.TRIE_TRANSACTION_SIZE = 10, 10, 10
+
+    def tearDown(self):
+        playerUtility.UNCACHED_GAMES_PAGE_SIZE, playerUtility.COMPILE_CHUNK_SIZE, trieUtility.TRIE_TRANSACTION_SIZE = self.originals
+
+    def getExpected(self, games):
+        expected = getStubWithPlayer()
+        playerUtility.compileStreamedGames(PLAYER_TAG, games, expected)
+        return expected
+
+    def assertCompiled(self, dynamodb, games):
+        self.assertEqual(getTrie(dynamodb), getTrie(self.getExpected(games)))
+        self.assertEqual(getBattleTimes(GAMES_TABLE_NAME, dynamodb), [game["battleTime"] for game in games])
+        self.assertEqual(getBattleTimes(UNCACHED_GAMES_TABLE_NAME, dynamodb), [])
+
+        playerItem = getPlayerItem(dynamodb)
+        self.assertEqual(playerItem["compileCheckpoint"]["S"], games[-1]["battleTime"])
+        for name in ("pendingCompileCheckpoint", "pendingCompileFrom", "compilingUntil", "compileLeaseOwner"):
+            self.assertNotIn(name, playerItem)
+
+    def test_games_are_flushed_in_chunks(self):
+        dynamodb = getStubWithPlayer()
+        saveUncachedGames(getGames(0, 45), dynamodb)
+
+        compileCheckpoints = []
+        originalUpdate = dynamodb.update_item
+
+        def recordUpdate(**kwargs):
+            if kwargs["UpdateExpression"].startswith("SET compileCheckpoint"):
+                compileCheckpoints.append(kwargs["ExpressionAttributeValues"][":compileCheckpoint"]["S"])
+            return originalUpdate(**kwargs)
+        dynamodb.update_item = recordUpdate
+
+        self.assertEqual(playerUtility.compileUncachedStats(PLAYER_TAG, dynamodb), 45)
+
+        self.assertEqual(compileCheckpoints, [getBattleTime(index) for index in (9, 19, 29, 39, 44)])
+        self.assertCompiled(dynamodb, getGames(0, 45))
+
+    def test_interrupted_compile_is_resumed(self):
+        dynamodb = getInterruptedStubWithPlayer()
+        saveUncachedGames(getGames(0, 45), dynamodb)
+
+        # Stops partway through the trie update of a later chunk
+        dynamodb.numTransactionsLeft = 12
+        with self.assertRaises(RuntimeError):
+            playerUtility.compileUncachedStats(PLAYER_TAG, dynamodb)
+        dynamodb.numTransactionsLeft = None
+
+        playerItem = getPlayerItem(dynamodb)
+        self.assertIn("pendingCompileCheckpoint", playerItem)
+        self.assertGreater(playerItem["pendingCompileCheckpoint"]["S"], playerItem["compileCheckpoint"]["S"])
+
+        # The interrupted chunk's games are copied to the cached table but still uncached, and are compiled once
+        numGamesLeft = sum(battleTime > playerItem["pendingCompileCheckpoint"]["S"] for battleTime in getBattleTimes(UNCACHED_GAMES_TABLE_NAME, dynamodb))
+        self.assertEqual(playerUtility.compileUncachedStats(PLAYER_TAG, dynamodb), numGamesLeft)
+        self.assertCompiled(dynamodb, getGames(0, 45))
+
+    def test_uncached_games_before_the_checkpoint_are_removed_without_compiling(self):
+        # Games 10-19 were compiled, but the compile stopped before removing them from the uncached table
+        dynamodb = getStubWithPlayer()
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(0, 20), dynamodb)
+        saveUncachedGames(getGames(10, 30), dynamodb)
+
+        self.assertEqual(playerUtility.compileUncachedStats(PLAYER_TAG, dynamodb), 10)
+        self.assertCompiled(dynamodb, getGames(0, 30))
+
+    def test_compiles_wait_for_the_lease(self):
+        dynamodb = getStubWithPlayer()
+        saveUncachedGames(getGames(0, 20), dynamodb)
+        self.assertIsNotNone(playerUtility.acquireCompileLease(PLAYER_TAG, dynamodb))
+
+        with self.assertRaises(RuntimeError):
+            playerUtility.compileUncachedStats(PLAYER_TAG, dynamodb)
+        with self.assertRaises(RuntimeError):
+            playerUtility.compileStreamedGames(PLAYER_TAG, getGames(20, 30), dynamodb)
+
+        self.assertEqual(getTrie(dynamodb), {})
+        self.assertEqual(len(getBattleTimes(UNCACHED_GAMES_TABLE_NAME, dynamodb)), 20)
+
+        # A lease whose holder died lapses
+        dynamodb.update_item(
+            TableName=playerUtility.PLAYER_INFO_TABLE,
+            Key={"playerTag": {"S": PLAYER_TAG}},
+            UpdateExpression="SET compilingUntil = :compilingUntil",
+            ExpressionAttributeValues={":compilingUntil": {"S": (datetime.utcnow() - timedelta(seconds=1)).isoformat()}}
+        )
+
+        self.assertEqual(playerUtility.compileStreamedGames(PLAYER_TAG, getGames(20, 30), dynamodb), 10)
+        self.assertCompiled(dynamodb, getGames(0, 30))
+
+if __name__ == "__main__":
+    unittest.main()
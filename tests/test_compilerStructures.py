@@ -0,0 +1,72 @@
+import unittest
+from CompilerStructuresModule.CompilerStructures.frequencyCompiler import FrequencyCompiler
+from CompilerStructuresModule.CompilerStructures.matchColumns import MatchColumns
+from CompilerStructuresModule.CompilerStructures.matchData import MatchData
+from CompilerStructuresModule.CompilerStructures.resultCompiler import ResultCompiler
+
+# Run from the repository root: python -m pytest tests
+
+def getFrequencyCompiler(frequencies):
+    return FrequencyCompiler.from_frequencies({str(bucket): count for bucket, count in frequencies.items()})
+
+def getMatchData(duration):
+    return MatchData("Hard Rock Mine", "gemGrab", "SHELLY", "wins", False, True, duration, 8, "regular")
+
+class FrequencyCompilerTest(unittest.TestCase):
+    def test_percentile_is_the_smallest_bucket_covering_it(self):
+        compiler = getFrequencyCompiler({1: 2, 3: 5, 4: 3})
+
+        self.assertEqual(compiler.get_percentile_entry(0), 1)
+        self.assertEqual(compiler.get_percentile_entry(20), 1)
+        self.assertEqual(compiler.get_percentile_entry(21), 3)
+        self.assertEqual(compiler.get_percentile_entry(70), 3)
+        self.assertEqual(compiler.get_percentile_entry(71), 4)
+        self.assertEqual(compiler.get_percentile_entry(100), 4)
+
+    def test_median(self):
+        self.assertEqual(getFrequencyCompiler({2: 1, 5: 1, 9: 1}).get_median_entry(), 5)
+        self.assertEqual(getFrequencyCompiler({2: 1, 5: 1}).get_median_entry(), 2)
+        self.assertEqual(FrequencyCompiler().get_median_entry(), 0)
+
+    def test_merge_adds_counts_of_different_lengths(self):
+        shorter = getFrequencyCompiler({0: 1, 2: 4})
+        longer = getFrequencyCompiler({2: 1, 6: 2})
+
+        self.assertEqual(shorter.merge(longer).frequencies, {"0": 1, "2": 5, "6": 2})
+        self.assertEqual(longer.merge(shorter).frequencies, shorter.merge(longer).frequencies)
+        self.assertEqual(shorter.merge(FrequencyCompiler()).frequencies, shorter.frequencies)
+
+        # Neither side is modified
+        self.assertEqual(shorter.frequencies, {"0": 1, "2": 4})
+        self.assertEqual(longer.frequencies, {"2": 1, "6": 2})
+
+    def test_negative_buckets_are_not_counted(self):
+        compiler = FrequencyCompiler.from_frequencies({"-1": 3, "4": 2})
+        compiler.add_entry(-2)
+
+        self.assertEqual(compiler.frequencies, {"4": 2})
+        self.assertEqual(compiler.get_total(), 2)
+
+class DurationTest(unittest.TestCase):
+    def test_duration_buckets(self):
+        self.assertEqual(ResultCompiler.get_duration_bucket(29), 0)
+        self.assertEqual(ResultCompiler.get_duration_bucket(95), 3)
+        for duration in (None, 0, -45, "unknown"):
+            self.assertIsNone(ResultCompiler.get_duration_bucket(duration))
+
+    # The dict and columnar engines count the same durations
+    def test_engines_skip_the_same_durations(self):
+        matches = [getMatchData(duration) for duration in (95, None, 0, -45, "unknown", 125)]
+
+        compiler = ResultCompiler()
+        for match in matches:
+            compiler.handle_battle_result(match)
+
+        pathIDUpdates = {}
+        MatchColumns(matches).add_grouped_compilers(("type",), lambda attributeValues: "path", pathIDUpdates)
+
+        self.assertEqual(compiler.duration_frequencies.frequencies, {"3": 1, "4": 1})
+        self.assertEqual(pathIDUpdates["path"].to_dict(), compiler.to_dict())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import time
+import unittest
+import lambda_function
+import DatabaseUtility.playerUtility as playerUtility
+from DatabaseUtility.freshnessUtility import getFreshDeltas
+from test_compile import PLAYER_TAG, getBattleTime, getGames, getStubWithPlayer, saveUncachedGames
+from test_trie import getPathIDUpdates
+
+# Merges uncached games into trie reads against a stub DynamoDB client
+# Run from the repository root: python -m pytest tests
+
+def setPendingCompileCheckpoint(pendingCompileCheckpoint, dynamodb):
+    dynamodb.update_item(
+        TableName=playerUtility.PLAYER_INFO_TABLE,
+        Key={"playerTag": {"S": PLAYER_TAG}},
+        UpdateExpression="SET pendingCompileCheckpoint = :pendingCompileCheckpoint",
+        ExpressionAttributeValues={":pendingCompileCheckpoint": {"S": pendingCompileCheckpoint}}
+    )
+
+def getFreshTrieDataEvent(ifNoneMatch=None):
+    return {
+        "headers": {} if ifNoneMatch is None else {"If-None-Match": ifNoneMatch},
+        "body": json.dumps({
+            "type": "getTrieData",
+            "playerTag": PLAYER_TAG,
+            "filterID": "overall",
+            "isGlobal": False,
+            "fresh": True,
+            "requestType": "regular",
+            "targetAttribute": "brawler"
+        })
+    }
+
+class FreshDeltasTest(unittest.TestCase):
+    def setUp(self):
+        # Games 0-19 are compiled; 20-29 wait in the uncached table, along with game 19, which a compile hasn't removed yet
+        self.dynamodb = getStubWithPlayer()
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(0, 20), self.dynamodb)
+        saveUncachedGames(getGames(19, 30), self.dynamodb)
+
+    def assertDeltasMatchGames(self, pathIDUpdates, games):
+        expected = getPathIDUpdates(games)
+        self.assertEqual(set(pathIDUpdates), set(expected))
+        for pathID, resultCompiler in expected.items():
+            self.assertEqual(pathIDUpdates[pathID].to_dict(), resultCompiler.to_dict())
+
+    def test_uncached_games_after_the_checkpoint_are_merged(self):
+        pathIDUpdates, freshness = getFreshDeltas(PLAYER_TAG, self.dynamodb)
+
+        self.assertEqual(freshness, {"numGames": 10, "complete": True, "latestBattleTime": getBattleTime(29), "compileCheckpoint": getBattleTime(19)})
+        self.assertDeltasMatchGames(pathIDUpdates, getGames(20, 30))
+
+    def test_cap_leaves_out_the_oldest_games(self):
+        pathIDUpdates, freshness = getFreshDeltas(PLAYER_TAG, self.dynamodb, maxGames=4)
+
+        self.assertEqual(freshness["numGames"], 4)
+        self.assertFalse(freshness["complete"])
+        self.assertEqual(freshness["latestBattleTime"], getBattleTime(29))
+        self.assertDeltasMatchGames(pathIDUpdates, getGames(26, 30))
+
+    def test_passed_deadline_merges_nothing(self):
+        numQueries = self.dynamodb.calls.get("query", 0)
+        pathIDUpdates, freshness = getFreshDeltas(PLAYER_TAG, self.dynamodb, deadline=time.monotonic() - 1)
+
+        self.assertEqual(pathIDUpdates, {})
+        self.assertEqual(freshness["numGames"], 0)
+        self.assertFalse(freshness["complete"])
+        self.assertEqual(self.dynamodb.calls.get("query", 0), numQueries)
+
+    def test_deadline_passing_during_the_read_stops_it(self):
+        originalQuery = self.dynamodb.query
+
+        def slowQuery(**kwargs):
+            time.sleep(0.05)
+            return originalQuery(**kwargs)
+        self.dynamodb.query = slowQuery
+
+        _, freshness = getFreshDeltas(PLAYER_TAG, self.dynamodb, deadline=time.monotonic() + 0.01)
+
+        self.assertEqual(freshness["numGames"], 0)
+        self.assertFalse(freshness["complete"])
+
+    def test_games_of_an_update_in_progress_are_left_out(self):
+        setPendingCompileCheckpoint(getBattleTime(24), self.dynamodb)
+
+        pathIDUpdates, freshness = getFreshDeltas(PLAYER_TAG, self.dynamodb)
+
+        self.assertEqual(freshness["numGames"], 5)
+        self.assertFalse(freshness["complete"])
+        self.assertDeltasMatchGames(pathIDUpdates, getGames(25, 30))
+
+class FreshETagTest(unittest.TestCase):
+    def setUp(self):
+        self.dynamodb = getStubWithPlayer()
+        playerUtility.compileStreamedGames(PLAYER_TAG, getGames(0, 20), self.dynamodb)
+        saveUncachedGames(getGames(20, 30), self.dynamodb)
+
+        self.originalClient, self.originalCache = lambda_function.dynamodbClient, lambda_function.trieCache
+        lambda_function.dynamodbClient, lambda_function.trieCache = self.dynamodb, None
+
+    def tearDown(self):
+        lambda_function.dynamodbClient, lambda_function.trieCache = self.originalClient, self.originalCache
+
+    def getFreshTrieData(self, ifNoneMatch=None):
+        return lambda_function.lambda_handler(getFreshTrieDataEvent(ifNoneMatch), None)
+
+    def test_etag_is_stable_until_the_uncached_games_change(self):
+        response = self.getFreshTrieData()
+        self.assertEqual(response["statusCode"], 200)
+        etag = response["headers"]["ETag"]
+
+        self.assertEqual(self.getFreshTrieData()["headers"]["ETag"], etag)
+        self.assertEqual(self.getFreshTrieData(etag)["statusCode"], 304)
+
+        saveUncachedGames(getGames(30, 31), self.dynamodb)
+        response = self.getFreshTrieData(etag)
+        self.assertEqual(response["statusCode"], 200)
+        self.assertNotEqual(response["headers"]["ETag"], etag)
+
+    def test_incomplete_merge_has_no_etag(self):
+        etag = self.getFreshTrieData()["headers"]["ETag"]
+        setPendingCompileCheckpoint(getBattleTime(24), self.dynamodb)
+
+        response = self.getFreshTrieData(etag)
+        self.assertEqual(response["statusCode"], 200)
+        self.assertNotIn("ETag", response["headers"])
+        self.assertFalse(json.loads(response["body"])["fresh"]["complete"])
+
+if __name__ == "__main__":
+    unittest.main()
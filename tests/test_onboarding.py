@@ -0,0 +1,116 @@
+import unittest
+from datetime import datetime, timedelta
+import DatabaseUtility.playerUtility as playerUtility
+from dynamoDBStub import StubDynamoDB
+from test_compile import PLAYER_TAG, getGames, getPlayerItem, saveUncachedGames
+
+# Runs onboarding against a stub DynamoDB client, with the API and the work queue replaced by recorders
+# Run from the repository root: python -m pytest tests
+
+class OnboardingTest(unittest.TestCase):
+    def setUp(self):
+        self.dynamodb = StubDynamoDB()
+        self.enqueuedJobs = []
+        self.saveFails = False
+
+        def saveGamesFromApi(playerTag, useProxy, dynamodb):
+            if self.saveFails:
+                raise RuntimeError("Brawl Stars API unavailable")
+            saveUncachedGames(getGames(0, 10), dynamodb)
+
+        self.originals = (playerUtility.getApiProxyPlayerInfo, playerUtility.enqueueJob, playerUtility.saveGamesFromApiToUncachedDB)
+        playerUtility.getApiProxyPlayerInfo = lambda playerTag: {"name": "x"} if playerTag == PLAYER_TAG else None
+        playerUtility.enqueueJob = lambda queueName, job, dynamodb: self.enqueuedJobs.append((queueName, job))
+        playerUtility.saveGamesFromApiToUncachedDB = saveGamesFromApi
+
+    def tearDown(self):
+        playerUtility.getApiProxyPlayerInfo, playerUtility.enqueueJob, playerUtility.saveGamesFromApiToUncachedDB = self.originals
+
+    def setOnboarding(self, onboardingStatus, startedAgo, numRetries=0):
+        self.dynamodb.update_item(
+            TableName=playerUtility.PLAYER_INFO_TABLE,
+            Key={"playerTag": {"S": PLAYER_TAG}},
+            UpdateExpression="SET onboardingStatus = :onboardingStatus, onboardingStartedAt = :startedAt, onboardingRetries = :numRetries",
+            ExpressionAttributeValues={
+                ":onboardingStatus": {"S": onboardingStatus},
+                ":startedAt": {"S": (datetime.utcnow() - startedAgo).isoformat()},
+                ":numRetries": {"N": str(numRetries)}
+            }
+        )
+
+    def test_new_player_is_added_compiling_and_queued_once(self):
+        item = playerUtility.beginOnboardingPlayer(PLAYER_TAG, self.dynamodb)
+
+        self.assertEqual(item["onboardingStatus"]["S"], playerUtility.ONBOARDING_COMPILING)
+        startedAt = datetime.fromisoformat(item["onboardingStartedAt"]["S"])
+        self.assertLess(abs(datetime.utcnow() - startedAt), timedelta(minutes=1))
+        self.assertEqual(self.enqueuedJobs, [("onboarding", {"job": "onboardPlayer", "playerTag": PLAYER_TAG})])
+
+        # A concurrent request gets the same player without queueing another job
+        self.assertEqual(playerUtility.beginOnboardingPlayer(PLAYER_TAG, self.dynamodb), getPlayerItem(self.dynamodb))
+        self.assertEqual(len(self.enqueuedJobs), 1)
+
+        self.assertIsNone(playerUtility.beginOnboardingPlayer("UNKNOWN", self.dynamodb))
+
+    def test_job_marks_the_player_ready(self):
+        playerUtility.beginOnboardingPlayer(PLAYER_TAG, self.dynamodb)
+        playerUtility.onboardPlayer(PLAYER_TAG, self.dynamodb)
+
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_READY)
+        self.assertEqual(getPlayerItem(self.dynamodb)["compileCheckpoint"]["S"], getGames(9, 10)[0]["battleTime"])
+
+    def test_failed_job_stays_compiling_until_its_last_attempt(self):
+        playerUtility.beginOnboardingPlayer(PLAYER_TAG, self.dynamodb)
+        self.saveFails = True
+
+        with self.assertRaises(RuntimeError):
+            playerUtility.onboardPlayer(PLAYER_TAG, self.dynamodb, isFinalAttempt=False)
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_COMPILING)
+
+        with self.assertRaises(RuntimeError):
+            playerUtility.onboardPlayer(PLAYER_TAG, self.dynamodb, isFinalAttempt=True)
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_FAILED)
+
+    def test_lost_job_is_queued_again_after_the_timeout(self):
+        playerUtility.beginOnboardingPlayer(PLAYER_TAG, self.dynamodb)
+
+        self.setOnboarding(playerUtility.ONBOARDING_COMPILING, playerUtility.ONBOARDING_TIMEOUT - timedelta(minutes=1))
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_COMPILING)
+        self.assertEqual(len(self.enqueuedJobs), 1)
+
+        self.setOnboarding(playerUtility.ONBOARDING_COMPILING, playerUtility.ONBOARDING_TIMEOUT + timedelta(minutes=1))
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_COMPILING)
+        self.assertEqual(len(self.enqueuedJobs), 2)
+
+        # The retry moved onboardingStartedAt forward, so the next check doesn't queue it again
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_COMPILING)
+        self.assertEqual(len(self.enqueuedJobs), 2)
+        self.assertEqual(getPlayerItem(self.dynamodb)["onboardingRetries"]["N"], "1")
+
+    def test_failed_job_is_queued_again_after_the_backoff(self):
+        playerUtility.beginOnboardingPlayer(PLAYER_TAG, self.dynamodb)
+        backoff = playerUtility.getOnboardingRetryBackoff(2)
+
+        self.setOnboarding(playerUtility.ONBOARDING_FAILED, backoff - timedelta(minutes=1), numRetries=2)
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_FAILED)
+        self.assertEqual(len(self.enqueuedJobs), 1)
+
+        self.setOnboarding(playerUtility.ONBOARDING_FAILED, backoff + timedelta(minutes=1), numRetries=2)
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_COMPILING)
+        self.assertEqual(len(self.enqueuedJobs), 2)
+        self.assertEqual(getPlayerItem(self.dynamodb)["onboardingRetries"]["N"], "3")
+
+    def test_retry_backoff_doubles_up_to_its_cap(self):
+        self.assertEqual(playerUtility.getOnboardingRetryBackoff(0), playerUtility.ONBOARDING_RETRY_BACKOFF)
+        self.assertEqual(playerUtility.getOnboardingRetryBackoff(1), playerUtility.ONBOARDING_RETRY_BACKOFF * 2)
+        self.assertEqual(playerUtility.getOnboardingRetryBackoff(3), playerUtility.ONBOARDING_RETRY_BACKOFF * 8)
+        self.assertEqual(playerUtility.getOnboardingRetryBackoff(20), playerUtility.ONBOARDING_MAX_RETRY_BACKOFF)
+
+    def test_players_without_onboarding_are_ready(self):
+        self.assertIsNone(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb))
+
+        self.dynamodb.put_item(TableName=playerUtility.PLAYER_INFO_TABLE, Item={"playerTag": {"S": PLAYER_TAG}})
+        self.assertEqual(playerUtility.getOnboardingStatus(PLAYER_TAG, self.dynamodb), playerUtility.ONBOARDING_READY)
+
+if __name__ == "__main__":
+    unittest.main()
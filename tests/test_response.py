@@ -0,0 +1,86 @@
+import base64
+import gzip
+import json
+import unittest
+import responseUtility
+from responseUtility import RESPONSE_COMPRESSION_THRESHOLD_BYTES, buildJsonResponse, chooseContentEncoding, getAcceptedEncodings
+
+# Run from the repository root: python -m pytest tests
+
+def getEvent(acceptEncoding):
+    return {"headers": {} if acceptEncoding is None else {"Accept-Encoding": acceptEncoding}}
+
+# Stands in for the brotli module, which is optional
+class StubBrotli:
+    @staticmethod
+    def compress(bodyBytes, quality):
+        return b"br:" + bodyBytes
+
+class AcceptEncodingTest(unittest.TestCase):
+    def setUp(self):
+        self.originalBrotli = responseUtility.brotli
+        responseUtility.brotli = None
+
+    def tearDown(self):
+        responseUtility.brotli = self.originalBrotli
+
+    def test_quality_values(self):
+        self.assertEqual(getAcceptedEncodings(getEvent("gzip;q=0.5, br;q=1.0, deflate")), ({"gzip", "br", "deflate"}, set()))
+        self.assertEqual(getAcceptedEncodings(getEvent("GZIP ; q=0, br;q=0.0, identity;q=bad")), (set(), {"gzip", "br", "identity"}))
+        self.assertEqual(getAcceptedEncodings(getEvent(None)), (set(), set()))
+        self.assertEqual(getAcceptedEncodings(getEvent(" , ")), (set(), set()))
+
+    def test_refusal_overrides_acceptance(self):
+        self.assertEqual(getAcceptedEncodings(getEvent("gzip, gzip;q=0")), (set(), {"gzip"}))
+        self.assertIsNone(chooseContentEncoding(getEvent("gzip, gzip;q=0")))
+
+    def test_wildcard_covers_encodings_not_refused_by_name(self):
+        self.assertEqual(chooseContentEncoding(getEvent("*")), "gzip")
+        self.assertIsNone(chooseContentEncoding(getEvent("*, gzip;q=0")))
+        self.assertIsNone(chooseContentEncoding(getEvent("*;q=0")))
+        self.assertIsNone(chooseContentEncoding(getEvent("identity")))
+
+    def test_brotli_only_when_installed_and_named(self):
+        self.assertEqual(chooseContentEncoding(getEvent("br, gzip")), "gzip")
+
+        responseUtility.brotli = StubBrotli
+        self.assertEqual(chooseContentEncoding(getEvent("br, gzip")), "br")
+        self.assertEqual(chooseContentEncoding(getEvent("*")), "gzip")
+        self.assertEqual(chooseContentEncoding(getEvent("br;q=0, gzip")), "gzip")
+
+class CompressionTest(unittest.TestCase):
+    def setUp(self):
+        self.originalBrotli = responseUtility.brotli
+        responseUtility.brotli = None
+
+    def tearDown(self):
+        responseUtility.brotli = self.originalBrotli
+
+    def test_small_bodies_are_not_compressed(self):
+        body = {"value": "x" * 100}
+        response = buildJsonResponse(200, body, getEvent("gzip"), {})
+
+        self.assertNotIn("isBase64Encoded", response)
+        self.assertNotIn("Content-Encoding", response["headers"])
+        self.assertEqual(response["headers"]["Vary"], "Accept-Encoding")
+        self.assertEqual(json.loads(response["body"]), body)
+
+    def test_bodies_over_the_threshold_are_compressed(self):
+        body = {"value": "x" * RESPONSE_COMPRESSION_THRESHOLD_BYTES}
+        response = buildJsonResponse(200, body, getEvent("gzip"), {})
+
+        self.assertTrue(response["isBase64Encoded"])
+        self.assertEqual(response["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(response["headers"]["Vary"], "Accept-Encoding")
+        self.assertEqual(json.loads(gzip.decompress(base64.b64decode(response["body"]))), body)
+
+    def test_large_bodies_stay_uncompressed_when_refused(self):
+        body = {"value": "x" * RESPONSE_COMPRESSION_THRESHOLD_BYTES}
+        response = buildJsonResponse(200, body, getEvent("gzip;q=0"), {})
+
+        self.assertNotIn("isBase64Encoded", response)
+        self.assertEqual(response["headers"]["Vary"], "Accept-Encoding")
+        self.assertEqual(json.loads(response["body"]), body)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import apiUtility
+from tracker import getPlayersPerSecond, trackPlayers
+
+# Runs trackPlayers against an in-process stub of the Brawl Stars API and a stub DynamoDB client
+# Run from the repository root: python -m pytest tests
+
+GAMES_PER_BATTLELOG = 3
+
+def getStubGame(playerTag, index):
+    return {
+        "battleTime": f"20250101T00{index:02d}00.000Z",
+        "event": {"id": 1, "mode": "gemGrab", "map": "Hard Rock Mine"},
+        "battle": {
+            "mode": "gemGrab",
+            "type": "ranked",
+            "result": "victory",
+            "duration": 120,
+            "trophyChange": 8,
+            "teams": [
+                [{"tag": f"#{playerTag}", "name": "x", "brawler": {"id": 1, "name": "SHELLY", "power": 11, "trophies": 500}}],
+                [{"tag": "#OTHER", "name": "y", "brawler": {"id": 2, "name": "COLT", "power": 11, "trophies": 500}}]
+            ]
+        }
+    }
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    requestTimes = []
+    requestTimesLock = threading.Lock()
+
+    def do_GET(self):
+        with self.requestTimesLock:
+            self.requestTimes.append(time.monotonic())
+
+        # /players/%23<tag>/battlelog
+        playerTag = self.path.split("/")[-2].replace("%23", "")
+        body = json.dumps({"items": [getStubGame(playerTag, index) for index in reversed(range(GAMES_PER_BATTLELOG))]}).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# Records the writes the tracker makes; every conditional update succeeds
+class StubDynamoDB:
+    class exceptions:
+        class ConditionalCheckFailedException(Exception):
+            pass
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writtenGames = []
+        self.updatedPlayerTags = []
+
+    # Players without a watermark look up their most recent saved game; these have none
+    def query(self, **kwargs):
+        return {"Items": []}
+
+    def batch_write_item(self, RequestItems):
+        with self.lock:
+            for requests in RequestItems.values():
+                self.writtenGames.extend(request["PutRequest"]["Item"] for request in requests)
+        return {}
+
+    def update_item(self, **kwargs):
+        with self.lock:
+            self.updatedPlayerTags.append(kwargs["Key"]["playerTag"]["S"])
+        return {}
+
+class TrackerTest(unittest.TestCase):
+    def setUp(self):
+        StubApiHandler.requestTimes = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubApiHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.originalBaseUrl = apiUtility.BRAWL_API_BASE_URL
+        apiUtility.BRAWL_API_BASE_URL = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        apiUtility.BRAWL_API_BASE_URL = self.originalBaseUrl
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_tracks_every_player_within_the_rate_limit(self):
+        requestsPerSecond = 20
+        players = {f"PLAYER{index}": None for index in range(50)}
+        dynamodb = StubDynamoDB()
+
+        numGamesTracked, elapsedSeconds = trackPlayers(players, dynamodb, numWorkers=8, requestsPerSecond=requestsPerSecond)
+
+        self.assertEqual(numGamesTracked, len(players) * GAMES_PER_BATTLELOG)
+        self.assertEqual(len(dynamodb.writtenGames), len(players) * GAMES_PER_BATTLELOG)
+        self.assertEqual(len(StubApiHandler.requestTimes), len(players))
+
+        # The bucket starts full, so at most requestsPerSecond requests go out immediately and the rest at the refill rate
+        # Arrival times at the stub lag token grants by a varying amount, which the slack allows for
+        jitterSeconds = 0.25
+        requestTimes = sorted(StubApiHandler.requestTimes)
+        for start in range(len(requestTimes)):
+            for end in range(start, len(requestTimes)):
+                window = requestTimes[end] - requestTimes[start]
+                self.assertLessEqual(end - start + 1, requestsPerSecond + (window + jitterSeconds) * requestsPerSecond)
+
+        minimumSeconds = (len(players) - requestsPerSecond) / requestsPerSecond
+        self.assertGreaterEqual(elapsedSeconds, minimumSeconds * 0.9)
+
+        playersPerSecond = getPlayersPerSecond(len(players), elapsedSeconds)
+        self.assertAlmostEqual(playersPerSecond, len(players) / elapsedSeconds)
+        self.assertLessEqual(playersPerSecond, len(players) / (minimumSeconds * 0.9))
+
+    def test_rate_limiter_spaces_requests_after_the_burst(self):
+        limiter = apiUtility.ApiRateLimiter(50, burstSize=5)
+
+        startTime = time.monotonic()
+        for _ in range(30):
+            limiter.acquire()
+        elapsedSeconds = time.monotonic() - startTime
+
+        # 5 from the burst, then 25 at 50 per second
+        self.assertGreaterEqual(elapsedSeconds, 25 / 50 * 0.9)
+        self.assertLess(elapsedSeconds, 25 / 50 * 2)
+
+    def test_throughput_of_an_empty_run(self):
+        self.assertEqual(getPlayersPerSecond(0, 0), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,329 @@
+import unittest
+import DatabaseUtility.trieUtility as trieUtility
+from CompilerStructuresModule.CompilerStructures.matchData import getMatchDataObjectsFromGame
+from DatabaseUtility.itemUtility import deserializeDynamoDbItem
+from dynamoDBStub import StubDynamoDB, StubExceptions
+from test_compile import PLAYER_TAG, getGame, getGames, getTrie
+
+# Applies trie updates to a stub DynamoDB client
+# Run from the repository root: python -m pytest tests
+
+def getPathIDUpdates(games):
+    pathIDUpdates = {}
+    for game in games:
+        trieUtility.getCompilersToUpdate(getMatchDataObjectsFromGame(game, "#" + PLAYER_TAG, False), PLAYER_TAG, False, pathIDUpdates)
+    return pathIDUpdates
+
+def updateTrie(games, dynamodb):
+    return trieUtility.updateDatabaseTrie(PLAYER_TAG, None, "overall", dynamodb, False, getPathIDUpdates(games))
+
+# The existence index reports every node missing, as if each had been created by another compile after it was read
+class StaleExistenceDynamoDB(StubDynamoDB):
+    def batch_get_item(self, RequestItems):
+        if RequestItems.get(trieUtility.BRAWL_TRIE_TABLE, {}).get("ProjectionExpression") == "pathID":
+            return {"Responses": {}, "UnprocessedKeys": {}}
+        return super().batch_get_item(RequestItems)
+
+# Before the first childSummaries write, applies another update, as if it ran between this update's reads and its write
+class ConcurrentSummariesDynamoDB(StubDynamoDB):
+    def __init__(self):
+        super().__init__()
+        self.concurrentGames = None
+
+    def update_item(self, **kwargs):
+        if self.concurrentGames and kwargs["UpdateExpression"].startswith("SET childSummaries"):
+            concurrentGames, self.concurrentGames = self.concurrentGames, None
+            updateTrie(concurrentGames, self)
+        return super().update_item(**kwargs)
+
+# Fails every childSummaries write, as for a parent whose summaries no longer fit in an item
+class FailingSummariesDynamoDB(StubDynamoDB):
+    def __init__(self):
+        super().__init__()
+        self.failSummaries = False
+
+    def update_item(self, **kwargs):
+        if self.failSummaries and kwargs["UpdateExpression"].startswith("SET childSummaries"):
+            raise StubExceptions.ValidationException("Item size has exceeded the maximum allowed size")
+        return super().update_item(**kwargs)
+
+# The existence index reports every node present, as if each had been removed after it was read
+class VanishedNodesDynamoDB(StubDynamoDB):
+    def batch_get_item(self, RequestItems):
+        request = RequestItems.get(trieUtility.BRAWL_TRIE_TABLE, {})
+        if request.get("ProjectionExpression") == "pathID":
+            return {"Responses": {trieUtility.BRAWL_TRIE_TABLE: [{"pathID": key["pathID"]} for key in request["Keys"]]}, "UnprocessedKeys": {}}
+        return super().batch_get_item(RequestItems)
+
+# Every trie transaction is cancelled by a conflicting write, so updates fall back to one update_item per path
+class ConflictingTransactionsDynamoDB(StubDynamoDB):
+    def transact_write_items(self, TransactItems, **kwargs):
+        self.countCall("transact_write_items")
+        raise StubExceptions.TransactionCanceledException([{"Code": "TransactionConflict"} for _ in TransactItems])
+
+# Records the parents linked with ADD childrenPathIDs and the trie nodes created with put_item
+class RecordingWritesDynamoDB(StubDynamoDB):
+    def __init__(self):
+        super().__init__()
+        self.childLinks = []
+        self.createdPathIDs = []
+
+    def update_item(self, **kwargs):
+        if kwargs["UpdateExpression"].startswith("ADD childrenPathIDs"):
+            with self.lock:
+                self.childLinks.append(kwargs["Key"]["pathID"]["S"])
+        return super().update_item(**kwargs)
+
+    def put_item(self, TableName, Item, **kwargs):
+        if TableName == trieUtility.BRAWL_TRIE_TABLE:
+            with self.lock:
+                self.createdPathIDs.append(Item["pathID"]["S"])
+        return super().put_item(TableName, Item, **kwargs)
+
+def getTrieNodes(dynamodb):
+    return {key[0]: deserializeDynamoDbItem(item) for key, item in dynamodb.tables[trieUtility.BRAWL_TRIE_TABLE].items()}
+
+# Each parent's children as listed by readers, with the summaries that were used, or None if they were read from the children
+def getChildListings(dynamodb):
+    nodes = getTrieNodes(dynamodb)
+    parents = {(pathID, "overall"): node for pathID, node in nodes.items() if node.get("childrenPathIDs")}
+    listings = trieUtility.fetchChildrenNodesAcrossFilterIDs(parents, list(parents), dynamodb)
+    return {
+        parentKey[0]: ({child["pathID"]: child["resultCompiler"] for child in children}, trieUtility.getSummarizedChildren(parents[parentKey]))
+        for parentKey, children in listings.items()
+    }
+
+# Replaces time in trieUtility, so that retry backoffs don't sleep
+class StubTime:
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+class TrieUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.originalTime = trieUtility.time
+        trieUtility.time = StubTime
+
+    def tearDown(self):
+        trieUtility.time = self.originalTime
+
+    # Every updated node holds the sum of its games' compilers
+    def assertCountersMatchGames(self, dynamodb, games):
+        nodes = getTrieNodes(dynamodb)
+        for pathID, resultCompiler in getPathIDUpdates(games).items():
+            self.assertEqual(nodes[pathID]["resultCompiler"], resultCompiler.to_dict(), pathID)
+
+    # Every listing matches the children, and the parents of updated paths are listed from their summaries
+    def assertSummariesMatchChildren(self, dynamodb, updatedPathIDs=()):
+        nodes = getTrieNodes(dynamodb)
+        summarizedParentPathIDs = set()
+        for parentPathID, (children, summarizedChildren) in getChildListings(dynamodb).items():
+            self.assertEqual(children, {childPathID: nodes[childPathID]["resultCompiler"] for childPathID in nodes[parentPathID]["childrenPathIDs"]})
+            if summarizedChildren is not None:
+                summarizedParentPathIDs.add(parentPathID)
+
+        self.assertTrue({trieUtility.getParentPathID(pathID) for pathID in updatedPathIDs} - {None} <= summarizedParentPathIDs)
+        return summarizedParentPathIDs
+
+    def test_child_summaries_follow_the_children(self):
+        dynamodb = StubDynamoDB()
+        for start, end in ((0, 30), (30, 40), (40, 41)):
+            updateTrie(getGames(start, end), dynamodb)
+
+        self.assertSummariesMatchChildren(dynamodb, getPathIDUpdates(getGames(0, 41)))
+
+    def test_summaries_read_only_the_updated_children(self):
+        dynamodb = StubDynamoDB()
+        updateTrie(getGames(0, 40), dynamodb)
+
+        childReads = []
+        originalBatchGet = dynamodb.batch_get_item
+
+        def recordBatchGet(RequestItems):
+            request = RequestItems[trieUtility.BRAWL_TRIE_TABLE]
+            if request.get("ProjectionExpression") == "pathID, resultCompiler":
+                childReads.extend(key["pathID"]["S"] for key in request["Keys"])
+            return originalBatchGet(RequestItems)
+        dynamodb.batch_get_item = recordBatchGet
+
+        pathIDUpdates = getPathIDUpdates(getGames(40, 41))
+        trieUtility.updateDatabaseTrie(PLAYER_TAG, None, "overall", dynamodb, False, pathIDUpdates)
+
+        self.assertTrue(set(childReads) <= set(pathIDUpdates))
+        self.assertEqual(len(childReads), len(set(childReads)))
+        self.assertSummariesMatchChildren(dynamodb, pathIDUpdates)
+
+    def test_summaries_written_from_outdated_reads_are_retried(self):
+        expected = StubDynamoDB()
+        updateTrie(getGames(0, 50), expected)
+
+        dynamodb = ConcurrentSummariesDynamoDB()
+        updateTrie(getGames(0, 30), dynamodb)
+
+        # The concurrent update writes newer summaries first, so this update's tickets are outdated
+        dynamodb.concurrentGames = getGames(40, 50)
+        updateTrie(getGames(30, 40), dynamodb)
+        self.assertIsNone(dynamodb.concurrentGames)
+
+        self.assertEqual(getTrie(dynamodb), getTrie(expected))
+        self.assertSummariesMatchChildren(dynamodb, getPathIDUpdates(getGames(0, 50)))
+
+    def test_failed_summary_writes_remove_them(self):
+        dynamodb = FailingSummariesDynamoDB()
+        updateTrie(getGames(0, 30), dynamodb)
+        summarizedBefore = self.assertSummariesMatchChildren(dynamodb)
+
+        dynamodb.failSummaries = True
+        pathIDUpdates = getPathIDUpdates(getGames(30, 40))
+        trieUtility.updateDatabaseTrie(PLAYER_TAG, None, "overall", dynamodb, False, pathIDUpdates)
+
+        # Readers list the touched parents from their children instead of from stale summaries
+        touchedParentPathIDs = {trieUtility.getParentPathID(pathID) for pathID in pathIDUpdates} - {None}
+        self.assertTrue(touchedParentPathIDs & summarizedBefore)
+        for parentPathID, (_, summarized) in getChildListings(dynamodb).items():
+            if parentPathID in touchedParentPathIDs:
+                self.assertIsNone(summarized)
+        self.assertSummariesMatchChildren(dynamodb)
+    def test_existence_index_reads_are_consistent(self):
+        dynamodb = StubDynamoDB()
+        readRequests = []
+        originalBatchGet = dynamodb.batch_get_item
+
+        def recordBatchGet(RequestItems):
+            readRequests.append(RequestItems[trieUtility.BRAWL_TRIE_TABLE])
+            return originalBatchGet(RequestItems)
+        dynamodb.batch_get_item = recordBatchGet
+
+        trieUtility.fetchExistingPathIDs({PLAYER_TAG}, "overall", dynamodb)
+
+        self.assertTrue(all(request.get("ConsistentRead") for request in readRequests))
+
+    def test_nodes_created_since_the_existence_check_are_kept(self):
+        expected = StubDynamoDB()
+        updateTrie(getGames(0, 40), expected)
+
+        dynamodb = StaleExistenceDynamoDB()
+        updateTrie(getGames(0, 30), dynamodb)
+
+        # Every node of the next update already exists, with counts and children that a blind put would replace
+        updateTrie(getGames(30, 40), dynamodb)
+
+        self.assertEqual(getTrie(dynamodb), getTrie(expected))
+
+    def test_transactions_leave_the_same_counters_as_per_path_updates(self):
+        dynamodb = StubDynamoDB()
+        for start, end in ((0, 30), (30, 40)):
+            updateTrie(getGames(start, end), dynamodb)
+
+        perPath = ConflictingTransactionsDynamoDB()
+        for start, end in ((0, 30), (30, 40)):
+            updateTrie(getGames(start, end), perPath)
+
+        self.assertGreater(perPath.calls["transact_write_items"], 0)
+        self.assertEqual(getTrie(dynamodb), getTrie(perPath))
+        self.assertCountersMatchGames(dynamodb, getGames(0, 40))
+
+    def test_cancelled_transactions_fall_back_to_per_path_updates(self):
+        dynamodb = ConflictingTransactionsDynamoDB()
+        pathIDUpdates = getPathIDUpdates(getGames(0, 30))
+
+        self.assertEqual(trieUtility.updateDatabaseTrie(PLAYER_TAG, None, "overall", dynamodb, False, pathIDUpdates, compileID="1"), len(pathIDUpdates))
+
+        numTransactions = -(-len(pathIDUpdates) // trieUtility.TRIE_TRANSACTION_SIZE)
+        self.assertEqual(dynamodb.calls["transact_write_items"], numTransactions * trieUtility.MAX_TRANSACTION_ATTEMPTS)
+
+        # Repeating the compile after the fallback applies nothing twice
+        trieUtility.updateDatabaseTrie(PLAYER_TAG, None, "overall", dynamodb, False, pathIDUpdates, compileID="1")
+        self.assertCountersMatchGames(dynamodb, getGames(0, 30))
+
+    def test_nodes_missing_from_a_transaction_are_added_and_retried(self):
+        expected = StubDynamoDB()
+        updateTrie(getGames(0, 30), expected)
+
+        dynamodb = VanishedNodesDynamoDB()
+        updateTrie(getGames(0, 30), dynamodb)
+
+        self.assertEqual(getTrie(dynamodb), getTrie(expected))
+        self.assertCountersMatchGames(dynamodb, getGames(0, 30))
+
+    def test_missing_nodes_are_created_before_the_transactions(self):
+        dynamodb = RecordingWritesDynamoDB()
+        updateTrie(getGames(0, 30), dynamodb)
+        existingPathIDs = set(getTrieNodes(dynamodb))
+        dynamodb.childLinks.clear()
+        dynamodb.createdPathIDs.clear()
+        numTransactions = dynamodb.calls["transact_write_items"]
+
+        pathIDUpdates = getPathIDUpdates(getGames(30, 40))
+        updateTrie(getGames(30, 40), dynamodb)
+
+        # Each missing node is created once, and no transaction is cancelled by a node that doesn't exist yet
+        missingPathIDs = trieUtility.getPathIDsWithAncestors(pathIDUpdates) - existingPathIDs
+        self.assertTrue(missingPathIDs)
+        self.assertEqual(sorted(dynamodb.createdPathIDs), sorted(missingPathIDs))
+        self.assertEqual(dynamodb.calls["transact_write_items"] - numTransactions, -(-len(pathIDUpdates) // trieUtility.TRIE_TRANSACTION_SIZE))
+
+        # New subtrees are linked with one ADD per existing parent, however many new children it gets
+        newSubtreeParentPathIDs = {trieUtility.getParentPathID(pathID) for pathID in missingPathIDs} - missingPathIDs
+        self.assertEqual(sorted(dynamodb.childLinks), sorted(newSubtreeParentPathIDs))
+        self.assertTrue(any(
+            len({pathID for pathID in missingPathIDs if trieUtility.getParentPathID(pathID) == parentPathID}) > 1
+            for parentPathID in newSubtreeParentPathIDs
+        ))
+
+        expected = StubDynamoDB()
+        updateTrie(getGames(0, 40), expected)
+        self.assertEqual(getTrie(dynamodb), getTrie(expected))
+
+# Regular games, plus the kinds of games that leave durations or star players out
+def getVariedGames():
+    games = getGames(0, 40)
+
+    for game in games[0:40:5]:
+        game["battle"]["duration"] = None
+    for game in games[1:40:5]:
+        game["battle"]["starPlayer"] = None
+    for game in games[2:40:5]:
+        game["battle"]["type"] = "soloRanked"
+    for game in games[2:40:10]:
+        game["battle"]["teams"][1][0]["brawler"]["trophies"] = 18
+
+    showdown = getGame(40)
+    showdown["event"] = {"id": 2, "mode": "soloShowdown", "map": "Skull Creek"}
+    showdown["battle"] = {"mode": "soloShowdown", "type": "ranked", "rank": 2, "trophyChange": 6, "players": [
+        {"tag": f"#{PLAYER_TAG}" if index == 0 else f"#S{index}", "name": "x", "brawler": {"id": 1, "name": "CROW", "power": 11, "trophies": 500}}
+        for index in range(10)
+    ]}
+
+    duels = getGame(41)
+    duels["event"] = {"id": 3, "mode": "duels", "map": "Ring of Fire"}
+    duels["battle"] = {"mode": "duels", "type": "ranked", "result": "victory", "duration": 120, "players": [
+        {"tag": f"#{PLAYER_TAG}" if index == 0 else "#D1", "name": "x", "brawlers": [
+            {"id": 1, "name": name, "power": 11, "trophies": 500, "trophyChange": 4} for name in ("SHELLY", "BULL", "POCO")
+        ]}
+        for index in range(2)
+    ]}
+
+    return games + [showdown, duels]
+
+class ColumnarCompilersTest(unittest.TestCase):
+    def assertEnginesMatch(self, basePath, isGlobal, includeAllPlayers):
+        matchDataObjects = [
+            matchData for game in getVariedGames() for matchData in getMatchDataObjectsFromGame(game, "#" + PLAYER_TAG, includeAllPlayers)
+        ]
+
+        expected = trieUtility.getCompilersToUpdate(matchDataObjects, basePath, isGlobal, {})
+        pathIDUpdates = trieUtility.getCompilersToUpdateColumnar(matchDataObjects, basePath, isGlobal, {})
+
+        self.assertEqual(set(pathIDUpdates), set(expected))
+        for pathID, resultCompiler in expected.items():
+            self.assertEqual(pathIDUpdates[pathID].to_dict(), resultCompiler.to_dict(), pathID)
+
+    def test_player_templates(self):
+        self.assertEnginesMatch(PLAYER_TAG, False, False)
+
+    def test_global_templates(self):
+        self.assertEnginesMatch("global", True, True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import json
+import unittest
+import lambda_function
+import DatabaseUtility.trieCacheUtility as trieCacheUtility
+from DatabaseUtility.trieCacheUtility import TrieReadCache
+
+# Run from the repository root: python -m pytest tests
+
+# Replaces time.monotonic in trieCacheUtility, so that expiry doesn't depend on sleeping
+class StubClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class TrieReadCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.originalTime = trieCacheUtility.time
+        self.clock = StubClock()
+        trieCacheUtility.time = self.clock
+
+    def tearDown(self):
+        trieCacheUtility.time = self.originalTime
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TrieReadCache(maxEntries=2)
+        cache.put("a", 1, float("inf"))
+        cache.put("b", 2, float("inf"))
+
+        # Reading "a" makes "b" the least recently used
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3, float("inf"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.getStats(), {"hits": 3, "misses": 1, "evictions": 1, "size": 2})
+
+    def test_replacing_an_entry_does_not_evict(self):
+        cache = TrieReadCache(maxEntries=2)
+        cache.put("a", 1, float("inf"))
+        cache.put("b", 2, float("inf"))
+        cache.put("a", 3, float("inf"))
+
+        self.assertEqual(cache.get("a"), 3)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.getStats()["evictions"], 0)
+
+    def test_entries_expire_after_their_ttl(self):
+        cache = TrieReadCache()
+        cache.put("mutable", 1, 60)
+        cache.put("historical", 2, float("inf"))
+
+        self.clock.now += 59
+        self.assertEqual(cache.get("mutable"), 1)
+
+        self.clock.now += 1
+        self.assertIsNone(cache.get("mutable"))
+        self.assertEqual(cache.get("historical"), 2)
+
+        # The expired entry is dropped rather than evicted
+        self.assertEqual(cache.getStats(), {"hits": 2, "misses": 1, "evictions": 0, "size": 1})
+
+class TrieCacheStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.originalCache = lambda_function.trieCache
+        lambda_function.trieCache = None
+
+    def tearDown(self):
+        lambda_function.trieCache = self.originalCache
+
+    def invoke(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            response = lambda_function.lambda_handler({"headers": {}}, None)
+        return response, output.getvalue()
+
+    def test_stats_are_logged_once_the_cache_exists(self):
+        response, output = self.invoke()
+        self.assertEqual(response["statusCode"], 302)
+        self.assertEqual(output, "")
+
+        lambda_function.getTrieCache().get("missing")
+        _, output = self.invoke()
+
+        self.assertEqual(output.count("Trie cache: "), 1)
+        self.assertEqual(json.loads(output.split("Trie cache: ")[1]), {"hits": 0, "misses": 1, "evictions": 0, "size": 0})
+
+if __name__ == "__main__":
+    unittest.main()
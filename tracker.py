@@ -1,16 +1,77 @@
+import argparse
+import os
+import time
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from apiUtility import ApiRateLimiter
 from DatabaseUtility.gamesUtility import saveGamesFromApiToUncachedDB
-from DatabaseUtility.playerUtility import getAllPlayerTagsSetInRecentDays
+from DatabaseUtility.playerUtility import getPlayersDueForPoll
+from DatabaseUtility.workQueueUtility import getQueueUrl, waitForLocalJobs
 from datetime import datetime
 
+# Each tracked player costs one battlelog request
+# Kept below the key's quota so that other scripts sharing the key still get through
+API_REQUESTS_PER_SECOND = 20
+DEFAULT_NUM_WORKERS = 16
+
+# players maps each playerTag to its lastSavedBattleTime watermark (or None if unknown)
+# With streamCompile, new games are queued for compilation instead of waiting in the uncached table for compiler.py
+def trackPlayers(players, dynamodb, numWorkers=1, requestsPerSecond=API_REQUESTS_PER_SECOND, streamCompile=False):
+    rateLimiter = ApiRateLimiter(requestsPerSecond)
+
+    def trackPlayer(player):
+        playerTag, lastSavedBattleTime = player
+        rateLimiter.acquire()
+        try:
+            return saveGamesFromApiToUncachedDB(playerTag, False, dynamodb, lastSavedBattleTime, streamCompile)
+        except Exception as e:
+            print(f"Error tracking {playerTag}: {e}")
+            return 0
+
+    startTime = time.monotonic()
+
+    if numWorkers <= 1:
+        numGamesTracked = sum(trackPlayer(player) for player in players.items())
+    else:
+        # boto3 clients are thread safe, so every worker shares the same client
+        with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+            numGamesTracked = sum(executor.map(trackPlayer, players.items()))
+
+    return numGamesTracked, time.monotonic() - startTime
+
+def getPlayersPerSecond(numPlayers, elapsedSeconds):
+    return numPlayers / elapsedSeconds if elapsedSeconds > 0 else 0
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=DEFAULT_NUM_WORKERS)
+    parser.add_argument("--rate", type=float, default=API_REQUESTS_PER_SECOND, help="Maximum Brawl Stars API requests per second")
+    parser.add_argument("--stream-compile", action="store_true", help="Queue new games for compilation (COMPILE_QUEUE_URL, or a local worker if unset)")
+    args = parser.parse_args()
+
+    # Fails before any player is polled if COMPILE_QUEUE_URL isn't a FIFO queue
+    if args.stream_compile:
+        getQueueUrl("compile")
+
     DYNAMODB_REGION = 'us-west-1'
-    dynamodb = boto3.client("dynamodb", region_name=DYNAMODB_REGION)
 
-    playerTags = getAllPlayerTagsSetInRecentDays(dynamodb, numDays=30)
+    # Together with BRAWL_API_BASE_URL, DYNAMODB_ENDPOINT_URL lets the tracker run against local stubs
+    dynamodb = boto3.client(
+        "dynamodb",
+        region_name=DYNAMODB_REGION,
+        endpoint_url=os.environ.get("DYNAMODB_ENDPOINT_URL"),
+        config=Config(max_pool_connections=max(10, args.workers))
+    )
+
+    # Each player's next poll time is set from their play rate whenever their battlelog is fetched
+    # The watermark is read with the player list, so no per-player lookups are needed
+    players = getPlayersDueForPoll(dynamodb, numDays=30)
+
+    numGamesTracked, elapsedSeconds = trackPlayers(players, dynamodb, args.workers, args.rate, args.stream_compile)
+
+    # Without COMPILE_QUEUE_URL the games are compiled by this process, which has to stay up until they are
+    waitForLocalJobs()
 
-    numGamesTracked = 0
-    for playerTag in playerTags:
-        numGamesTracked += saveGamesFromApiToUncachedDB(playerTag, False, dynamodb)
-    
-    print(f"{datetime.now().strftime('%m/%d/%y %I %p')}: {len(playerTags)} players tracked and {numGamesTracked} games saved.")
\ No newline at end of file
+    playersPerSecond = getPlayersPerSecond(len(players), elapsedSeconds)
+    print(f"{datetime.now().strftime('%m/%d/%y %I %p')}: {len(players)} players tracked and {numGamesTracked} games saved in {elapsedSeconds:.1f}s ({playersPerSecond:.2f} players/s).")